@@ -1,17 +1,100 @@
 import requests
-from fastapi import APIRouter, Depends
-from services.get_state_census import get_state_census_data as service_state_census_data
-from db import connection_scope
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from services.get_state_census import get_census_metrics as service_census_metrics, get_state_census_data as service_state_census_data
+from services.get_state_census import get_county_metrics as service_county_metrics, get_county_rollups as service_county_rollups
+from services.get_cpi_data import get_annual_inflation as service_annual_inflation, get_inflation as service_inflation, get_real_income as service_real_income
+from db import connection_scope, READ
 from auth import verify_token
 from helper import translate_state
+from schemas import AnnualInflation, CensusMetrics, CensusRows, CountyMetricsPage, CountyRollups, InflationSeries, RealIncome, StructResponse, returns
 app = APIRouter()
 
-@app.get("/get_census_data/{state}")
+@app.get("/get_census_data/{state}", **returns(CensusRows))
 async def get_census_data_endpoint(state: str, token: str = Depends(verify_token)):
     try:
-        with connection_scope() as conn:
+        with connection_scope(READ) as conn:
             state = translate_state(state)
-            return service_state_census_data(conn, state)
+            return StructResponse(service_state_census_data(conn, state))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
-__all__ = ["app"]
\ No newline at end of file
+
+@app.get("/get_real_income", **returns(RealIncome))
+async def get_real_income_endpoint(base_year: Optional[int] = None, token: str = Depends(verify_token)):
+    try:
+        with connection_scope(READ) as conn:
+            return StructResponse(service_real_income(conn, base_year))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/get_inflation", **returns(InflationSeries))
+async def get_inflation_endpoint(start_year: Optional[int] = None, end_year: Optional[int] = None, token: str = Depends(verify_token)):
+    try:
+        with connection_scope(READ) as conn:
+            return StructResponse(service_inflation(conn, start_year, end_year))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/get_annual_inflation", **returns(AnnualInflation))
+async def get_annual_inflation_endpoint(start_year: Optional[int] = None, end_year: Optional[int] = None, token: str = Depends(verify_token)):
+    try:
+        with connection_scope(READ) as conn:
+            return StructResponse(service_annual_inflation(conn, start_year, end_year))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/census_metrics", **returns(CensusMetrics))
+async def get_census_metrics_endpoint(
+    variables: str,
+    state: Optional[str] = None,
+    start_year: Optional[int] = None,
+    end_year: Optional[int] = None,
+    token: str = Depends(verify_token),
+):
+    # variables is a comma-separated list of ACS codes; each row carries their
+    # values in that order. state is a postal code, or US for the national row.
+    if state is not None:
+        try:
+            state = translate_state(state.upper())
+        except KeyError:
+            raise HTTPException(status_code=400, detail=f"Unknown state: {state}")
+    try:
+        with connection_scope(READ) as conn:
+            return StructResponse(service_census_metrics(conn, variables.split(","), state, start_year, end_year))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/get_county_census/{state}", **returns(CountyMetricsPage))
+async def get_county_census_endpoint(
+    state: str,
+    variables: str,
+    year: int,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=500),
+    token: str = Depends(verify_token),
+):
+    state = translate_state(state)
+    try:
+        with connection_scope(READ) as conn:
+            return StructResponse(service_county_metrics(conn, state, variables.split(","), year, cursor, limit))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/get_county_rollups/{state}", **returns(CountyRollups))
+async def get_county_rollups_endpoint(state: str, variables: str, token: str = Depends(verify_token)):
+    state = translate_state(state)
+    try:
+        with connection_scope(READ) as conn:
+            return StructResponse(service_county_rollups(conn, state, variables.split(",")))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+__all__ = ["app"]
@@ -0,0 +1,25 @@
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException
+from services.get_correlations import get_correlation_matrix as service_correlation_matrix
+from services.get_correlations import get_metric_correlation as service_metric_correlation
+from db import connection_scope, READ
+from auth import verify_token
+from schemas import CorrelationMatrix, MetricCorrelation, StructResponse, returns
+app = APIRouter()
+
+@app.get("/get_correlations", **returns(CorrelationMatrix))
+async def get_correlations_endpoint(year: Optional[int] = None, token: str = Depends(verify_token)):
+    try:
+        with connection_scope(READ) as conn:
+            return StructResponse(service_correlation_matrix(conn, year))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/get_correlation", **returns(MetricCorrelation))
+async def get_correlation_endpoint(x: str, y: str, year: Optional[int] = None, token: str = Depends(verify_token)):
+    try:
+        with connection_scope(READ) as conn:
+            return StructResponse(service_metric_correlation(conn, x, y, year))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+__all__ = ["app"]
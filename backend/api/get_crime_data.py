@@ -1,22 +1,56 @@
 import requests
-from fastapi import APIRouter, Depends
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
 from services.get_state_crime import get_crime_data as service_get_crime_data
 from services.get_state_crime import get_all_state_crime as service_get_all_state_crime
-from db import connection_scope
+from services.get_state_crime import get_crime_trends as service_get_crime_trends
+from services.get_state_crime import get_agency_crime as service_get_agency_crime
+from services.get_state_crime import get_agency_crime_rollups as service_get_agency_crime_rollups
+from db import connection_scope, READ
 from auth import verify_token
 from helper import translate_state
+from schemas import AgencyCrimePage, AgencyCrimeRollups, CrimeRows, CrimeTrends, StructResponse, returns
 app = APIRouter()
 
-@app.get("/get_crime_data/{state}/{crime_type}")
+@app.get("/get_crime_data/{state}/{crime_type}", **returns(CrimeRows))
 async def get_crime_data_endpoint(state: str, crime_type: str, token: str = Depends(verify_token)):
     state = translate_state(state)
-    with connection_scope() as conn:
-        return service_get_crime_data(conn, state, crime_type)
+    with connection_scope(READ) as conn:
+        return StructResponse(service_get_crime_data(conn, state, crime_type))
 
-@app.get("/get_all_state_crime/{state}")
+@app.get("/get_all_state_crime/{state}", **returns(CrimeRows))
 async def get_all_state_crime_endpoint(state: str, token: str = Depends(verify_token)):
     state = translate_state(state)
-    with connection_scope() as conn:
-        return service_get_all_state_crime(conn, state)
+    with connection_scope(READ) as conn:
+        return StructResponse(service_get_all_state_crime(conn, state))
+
+@app.get("/get_crime_trends", **returns(CrimeTrends))
+async def get_crime_trends_endpoint(state: Optional[str] = None, crime_type: Optional[str] = None, token: str = Depends(verify_token)):
+    if state is not None:
+        state = translate_state(state)
+    with connection_scope(READ) as conn:
+        return StructResponse(service_get_crime_trends(conn, state, crime_type))
+
+@app.get("/get_agency_crime/{state}/{crime_type}", **returns(AgencyCrimePage))
+async def get_agency_crime_endpoint(
+    state: str,
+    crime_type: str,
+    year: int,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=500),
+    token: str = Depends(verify_token),
+):
+    state = translate_state(state)
+    try:
+        with connection_scope(READ) as conn:
+            return StructResponse(service_get_agency_crime(conn, state, crime_type, year, cursor, limit))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/get_agency_crime_rollups/{state}", **returns(AgencyCrimeRollups))
+async def get_agency_crime_rollups_endpoint(state: str, token: str = Depends(verify_token)):
+    state = translate_state(state)
+    with connection_scope(READ) as conn:
+        return StructResponse(service_get_agency_crime_rollups(conn, state))
 
 __all__ = ["app"]
\ No newline at end of file
@@ -0,0 +1,24 @@
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+from services.exports import FORMATS, stream_export, validate_export
+from auth import verify_token
+app = APIRouter()
+
+@app.get(
+    "/export/{dataset}",
+    response_class=StreamingResponse,
+    responses={200: {"content": {media_type: {"schema": {"type": "string", "format": "binary"}} for media_type in FORMATS.values()}}},
+)
+async def export_endpoint(dataset: str, format: str = "ndjson", token: str = Depends(verify_token)):
+    try:
+        media_type = validate_export(dataset, format)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    # The generator is synchronous, so Starlette iterates it in the threadpool;
+    # it takes a pooled connection on the first chunk and returns it at the end
+    return StreamingResponse(
+        stream_export(dataset, format),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{dataset}.{format}"'},
+    )
+__all__ = ["app"]
@@ -0,0 +1,23 @@
+from fastapi import APIRouter, Depends, HTTPException
+from services.user_interests import fetch_user_interests
+from services.feed import get_feed
+from db import connection_scope, READ
+from auth import verify_token
+from schemas import Feed, StructResponse, returns
+
+app = APIRouter()
+
+@app.get("/get_feed", **returns(Feed))
+async def get_feed_endpoint(user_id: str = Depends(verify_token)):
+    try:
+        # Interests are read from the primary, bypassing the interests cache, so
+        # a save is visible straight away; the bundles are shared data and may
+        # come from a replica
+        with connection_scope() as conn:
+            interests = fetch_user_interests(conn, user_id, fresh=True) or []
+        with connection_scope(READ) as conn:
+            feed = get_feed(conn, interests)
+        return StructResponse(Feed(interests=interests, **feed))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+__all__ = ["app"]
@@ -1,39 +1,40 @@
 import requests
-from fastapi import APIRouter, Depends
-from services.get_federal_spending import get_agency_data, get_budget_functions, get_federal_economic_data, get_federal_debt, get_treasury_statements, get_federal_fpl
-from db import connection_scope
+from fastapi import APIRouter, Depends, Path
+from services.get_federal_spending import get_agency_data, get_budget_functions, get_federal_economic_data, get_federal_debt, get_treasury_statements, get_federal_fpl_async, MAX_HOUSEHOLD_SIZE
+from db import connection_scope, READ
 from auth import verify_token
 from helper import translate_state
+from schemas import AgencySpending, FederalDebt, FederalEconomicData, FederalFpl, StructResponse, returns
 
 app = APIRouter()
 
-@app.get("/get_agency_spending")
+@app.get("/get_agency_spending", **returns(AgencySpending))
 async def get_agency_spending(token: str = Depends(verify_token)):
-    with connection_scope() as conn:
+    with connection_scope(READ) as conn:
         agency_data = get_agency_data(conn)
         budget_functions_data = get_budget_functions(conn)
-        return {"agency_data": agency_data, "budget_functions_data": budget_functions_data}
+        return StructResponse(AgencySpending(agency_data=agency_data, budget_functions_data=budget_functions_data))
 
-@app.get("/get_federal_economic_data")
+@app.get("/get_federal_economic_data", **returns(FederalEconomicData))
 async def get_federal_economic_data_endpoint(token: str = Depends(verify_token)):
-    with connection_scope() as conn:
+    with connection_scope(READ) as conn:
         economic_data = get_federal_economic_data(conn)
-        return {"economic_data": economic_data}
+        return StructResponse(FederalEconomicData(economic_data=economic_data))
 
-@app.get("/get_federal_debt")
+@app.get("/get_federal_debt", **returns(FederalDebt))
 async def get_federal_debt_endpoint(token: str = Depends(verify_token)):
-    with connection_scope() as conn:
+    with connection_scope(READ) as conn:
         federal_debt = get_federal_debt(conn)
         treasury_statements = get_treasury_statements(conn)
-        return {"federal_debt": federal_debt, "treasury_statements": treasury_statements}
+        return StructResponse(FederalDebt(federal_debt=federal_debt, treasury_statements=treasury_statements))
 
-@app.get("/get_federal_fpl/{household_size}")
-async def get_federal_fpl_endpoint(household_size: int, token: str = Depends(verify_token)):
+@app.get("/get_federal_fpl/{household_size}", **returns(FederalFpl))
+async def get_federal_fpl_endpoint(household_size: int = Path(ge=1, le=MAX_HOUSEHOLD_SIZE), token: str = Depends(verify_token)):
     try:
-        fpl = get_federal_fpl(household_size)
-        return {"fpl": fpl}
+        fpl = await get_federal_fpl_async(household_size)
+        return StructResponse(FederalFpl(fpl=fpl))
     except Exception as e:
         print("Error with getting federal fpl", e)
-        return {"error": str(e)}
+        return StructResponse(FederalFpl(error=str(e)))
 
 __all__ = ["app"]
\ No newline at end of file
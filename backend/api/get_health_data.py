@@ -1,15 +1,16 @@
 import requests
 from fastapi import APIRouter, Depends
 from services.get_health_data import get_health_data_states as service_health_data_states
-from db import connection_scope
+from db import connection_scope, READ
 from auth import verify_token
+from schemas import HealthRows, StructResponse, returns
 app = APIRouter()
 
-@app.get("/get_health_data/{state}/{name}")
+@app.get("/get_health_data/{state}/{name}", **returns(HealthRows))
 async def get_health_data_endpoint(state: str, name: str, token: str = Depends(verify_token)):
     try:
-        with connection_scope() as conn:
-            return service_health_data_states(conn, state, name)
+        with connection_scope(READ) as conn:
+            return StructResponse(service_health_data_states(conn, state, name))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 __all__ = ["app"]
\ No newline at end of file
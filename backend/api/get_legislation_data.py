@@ -1,14 +1,37 @@
 import requests
-from fastapi import APIRouter, Depends, HTTPException
-from services.get_legislation_data import get_recent_legislation as service_recent_legislation_data
-from db import connection_scope
+from datetime import date
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from services.get_legislation_data import get_recent_legislation_async as service_recent_legislation_data
+from services.get_legislation_data import search_bills as service_search_bills
+from db import connection_scope, READ
 from auth import verify_token
+from schemas import BillSearchPage, RecentBill, StructResponse, returns
 app = APIRouter()
 
-@app.get("/get_recent_legislation")
+@app.get("/get_recent_legislation", **returns(list[RecentBill]))
 async def get_recent_legislation_endpoint(token: str = Depends(verify_token)):
     try:
-        return service_recent_legislation_data()
+        return StructResponse(await service_recent_legislation_data())
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/search_legislation", **returns(BillSearchPage))
+async def search_legislation_endpoint(
+    q: Optional[str] = None,
+    chamber: Optional[str] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    status: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    token: str = Depends(verify_token),
+):
+    try:
+        with connection_scope(READ) as conn:
+            return StructResponse(service_search_bills(conn, q, chamber, date_from, date_to, status, cursor, limit))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 __all__ = ["app"]
\ No newline at end of file
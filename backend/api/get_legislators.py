@@ -1,61 +1,73 @@
 import os
 import dotenv
-from fastapi import APIRouter, Depends
-from geocodio import Geocodio
-from db import connection_scope
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from db import connection_scope, READ
 from auth import verify_token
+import upstream
 from services.get_legislator_data import get_senator_state, get_representative_state
+from services.legislator_search import search_legislators
+from schemas import Legislator, LegislatorMatches, Legislators, StructResponse, returns
 
 # Load environment variables
 dotenv.load_dotenv()
 
 app = APIRouter()
 
-@app.get("/legislators/{address}")
+GEOCODIO_URL = "https://api.geocod.io/v1.7/geocode"
+
+
+def format_legislator(legislator, role):
+    # legislator is a queries.LegislatorRecord, the same shape for both chambers
+    return Legislator(
+        id=legislator.id,
+        name=legislator.name,
+        state=legislator.state,
+        party=legislator.party,
+        gender=legislator.gender,
+        url=legislator.url,
+        address=legislator.address,
+        phone=legislator.phone,
+        role=role,
+        nominate_score=legislator.nominate_score,
+    )
+
+@app.get("/legislators/{address}", **returns(Legislators))
 async def get_legislators(address: str, token: str = Depends(verify_token)):
-    geo_client = Geocodio(os.getenv("GEOCODIO_API_KEY"))
-    response = geo_client.geocode(address, fields=["cd"])
-    state = response.results[0].address_components.state
-    cd = response.results[0].fields.congressional_districts[0].district_number
+    # Plain REST through the shared session, so it is pooled, measured and replayable
+    response = upstream.get(GEOCODIO_URL, params={"q": address, "fields": "cd", "api_key": os.getenv("GEOCODIO_API_KEY")})
+    response.raise_for_status()
+    result = response.json()["results"][0]
+    state = result["address_components"]["state"]
+    cd = result["fields"]["congressional_districts"][0]["district_number"]
 
     try:
-        with connection_scope() as conn:
+        with connection_scope(READ) as conn:
             senators = get_senator_state(conn, state)
             representatives = get_representative_state(conn, state, cd)
-            # Format senators for the state
-            formatted_legislators = []
-            for senator in senators:
-                formatted_senator = {
-                    "id": senator[0],
-                    "name": senator[1],
-                    "state": senator[2],
-                    "party": senator[3],
-                    "gender": senator[4],
-                    "url": senator[5],
-                    "address": senator[6],
-                    "phone": senator[7],
-                    "Role": "Senator",
-                    "Nominate_Score": senator[9]
-                }
-                formatted_legislators.append(formatted_senator)
-            # Format representatives for the state
-            for representative in representatives:
-                formatted_representative = {
-                    "id": representative[0],
-                    "name": representative[1],
-                    "state": representative[2],
-                    "party": representative[4],
-                    "gender": representative[5],
-                    "url": representative[6],
-                    "address": representative[7],
-                    "phone": representative[8],
-                    "Role": "Representative",
-                    "Nominate_Score": representative[10]
-                }
-                formatted_legislators.append(formatted_representative)
-
-            return {"legislators": formatted_legislators}
+            formatted_legislators = [
+                format_legislator(legislator, role)
+                for role, legislators in (("Senator", senators), ("Representative", representatives))
+                for legislator in legislators
+            ]
+            return StructResponse(Legislators(legislators=formatted_legislators))
     except Exception as e:
-        return {"error": f"Database error: {str(e)}"}
+        return StructResponse(Legislators(error=f"Database error: {str(e)}"))
+
+@app.get("/search_legislators", **returns(LegislatorMatches))
+async def search_legislators_endpoint(
+    q: Optional[str] = None,
+    party: Optional[str] = None,
+    state: Optional[str] = None,
+    chamber: Optional[str] = None,
+    min_nominate: Optional[float] = None,
+    max_nominate: Optional[float] = None,
+    limit: int = Query(10, ge=1, le=50),
+    token: str = Depends(verify_token),
+):
+    try:
+        return StructResponse(LegislatorMatches(legislators=search_legislators(q, party, state, chamber, min_nominate, max_nominate, limit)))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 __all__ = ["app"]
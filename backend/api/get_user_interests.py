@@ -3,6 +3,7 @@ from fastapi import APIRouter, Depends, HTTPException
 from services.user_interests import fetch_user_interests, save_user_interests
 from db import connection_scope
 from auth import verify_token
+from schemas import InterestList, SavedInterests, StructResponse, returns
 from pydantic import BaseModel
 from typing import List
 
@@ -11,24 +12,27 @@ app = APIRouter()
 class UserInterests(BaseModel):
     interests: List[str]
 
-@app.post("/save_user_interests")
-async def save_user_interests_endpoint(interests: UserInterests, user_id: str = Depends(verify_token)):
+@app.post("/save_user_interests", **returns(SavedInterests))
+async def save_user_interests_endpoint(interests: UserInterests, coalesce: bool = False, user_id: str = Depends(verify_token)):
+    # coalesce=true lets rapid onboarding saves be batched when the server has
+    # a USER_INTERESTS_COALESCE_MS window; such a save can be lost if the
+    # worker dies before the batch is written
     try:
         with connection_scope() as conn:
-            save_user_interests(conn, user_id, interests.interests)
-        return {"status": "success", "message": "User interests saved successfully"}
+            save_user_interests(conn, user_id, interests.interests, coalesce)
+        return StructResponse(SavedInterests(status="success", message="User interests saved successfully"))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.get("/get_user_interests")
+@app.get("/get_user_interests", **returns(InterestList))
 async def get_user_interests_endpoint(user_id: str = Depends(verify_token)):
     try:
         with connection_scope() as conn:
             interests = fetch_user_interests(conn, user_id)
             if interests:
-                return {"interests": interests}
+                return StructResponse(InterestList(interests=interests))
             else:
-                return {"interests": [], "message": "No interests found"}
+                return StructResponse(InterestList(interests=[], message="No interests found"))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 __all__ = ["app"]
\ No newline at end of file
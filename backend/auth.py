@@ -1,17 +1,22 @@
 from fastapi import Depends, HTTPException, status, Query
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 import jwt
-import requests
+import upstream
+import timing
 import os 
 import dotenv
 
 dotenv.load_dotenv()
 
 def get_cognito_public_keys():
-    response = requests.get(os.getenv("AWS_SIGNING_KEY_URL"))
+    response = upstream.get(os.getenv("AWS_SIGNING_KEY_URL"))
     return response.json()
 
 def verify_token(credentials: HTTPAuthorizationCredentials = Depends(HTTPBearer())):
+    with timing.phase("auth"):
+        return _verify_token(credentials)
+
+def _verify_token(credentials):
     try:
         token = credentials.credentials
         header = jwt.get_unverified_header(token)
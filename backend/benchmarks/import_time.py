@@ -0,0 +1,82 @@
+# Guard the API's cold-start budget: import main.app in fresh interpreters,
+# report the median wall time and fail if it exceeds the budget or if any
+# ingestion-only dependency leaks into the request path.
+#
+#   python benchmarks/import_time.py --runs 5 --budget-ms 800 --top 15
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules only the ingestion jobs are allowed to load
+FORBIDDEN_MODULES = ["pandas", "matplotlib", "numpy"]
+
+PROBE = """
+import sys, time
+start = time.perf_counter()
+import main
+elapsed = time.perf_counter() - start
+leaked = sorted(m for m in {forbidden!r} if m in sys.modules)
+print(elapsed)
+print(",".join(leaked))
+"""
+
+
+def measure_once():
+    probe = PROBE.format(forbidden=FORBIDDEN_MODULES)
+    result = subprocess.run([sys.executable, "-c", probe], cwd=BACKEND_DIR, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing main failed:\n{result.stderr}")
+    lines = result.stdout.strip().split("\n")
+    leaked = lines[1].split(",") if len(lines) > 1 else []
+    return float(lines[0]), [m for m in leaked if m]
+
+
+def top_imports(count):
+    # -X importtime writes "self | cumulative | module" lines to stderr
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import main"], cwd=BACKEND_DIR, capture_output=True, text=True)
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, self_us, cumulative_us, module = [part.strip() for part in line.replace("import time:", "|", 1).split("|")]
+        rows.append((int(cumulative_us), int(self_us), module))
+    return sorted(rows, reverse=True)[:count]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the import time of the API app")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=float(os.getenv("STARTUP_BUDGET_MS", "800")))
+    parser.add_argument("--top", type=int, default=0, help="Show the N slowest imports by cumulative time")
+    args = parser.parse_args()
+
+    timings = []
+    leaked = set()
+    for _ in range(args.runs):
+        elapsed, run_leaked = measure_once()
+        timings.append(elapsed * 1000)
+        leaked.update(run_leaked)
+
+    median_ms = statistics.median(timings)
+    print(f"import main: median {median_ms:.1f} ms, min {min(timings):.1f} ms, max {max(timings):.1f} ms over {args.runs} runs (budget {args.budget_ms:.0f} ms)")
+
+    if args.top:
+        for cumulative_us, self_us, module in top_imports(args.top):
+            print(f"  {cumulative_us / 1000:8.1f} ms cumulative  {self_us / 1000:8.1f} ms self  {module}")
+
+    failed = False
+    if leaked:
+        print(f"FAIL: ingestion-only modules imported on the request path: {', '.join(sorted(leaked))}")
+        failed = True
+    if median_ms > args.budget_ms:
+        print(f"FAIL: import time exceeds the {args.budget_ms:.0f} ms budget")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,325 @@
+# Concurrent load scenarios against main.app, served in-process over ASGI.
+#
+# The app runs against a throwaway schema in the Postgres configured by the
+# usual DB_* variables (or BENCH_DB_* overrides). The schema is seeded with
+# realistic rows through the ingestion insert functions, so table layouts
+# match production. Token verification, geocoding and the upstream HTTP APIs
+# are replaced with local fakes that answer after a configurable delay.
+# Recorded real responses can be replayed instead; see cassette.py.
+#
+#   python benchmarks/load_test.py --concurrency 16 --requests 500 --output bench/HEAD.json
+#   python benchmarks/load_test.py --compare bench/main.json --scenario crime
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+SCHEMA = f"bench_{os.getpid()}"
+
+# Every router gets at least one scenario; paths are filled from the seeded data
+SCENARIOS = {
+    "crime": ["/get_crime_data/{state}/Assault", "/get_all_state_crime/{state}", "/get_crime_trends", "/get_crime_trends?state={state}&crime_type=Burglary", "/get_agency_crime/{state}/Assault?year=2023&limit=50", "/get_agency_crime_rollups/{state}"],
+    "census": ["/get_census_data/{state}", "/get_real_income", "/get_inflation?start_year=2020", "/get_annual_inflation", "/census_metrics?variables=DP03_0062E,DP03_0119PE,DP05_0001E&state={state}", "/census_metrics?variables=DP03_0009PE,DP04_0134E&start_year=2022", "/get_county_census/{state}?variables=DP03_0062E,DP05_0001E&year=2023&limit=25", "/get_county_rollups/{state}?variables=DP05_0001E"],
+    "health": ["/get_health_data/{state}/Diabetes"],
+    "spending": ["/get_agency_spending", "/get_federal_economic_data", "/get_federal_debt", "/get_federal_fpl/{household_size}"],
+    "legislation": ["/get_recent_legislation"],
+    "legislators": ["/legislators/{address}", "/search_legislators?q={prefix}", "/search_legislators?state={state}&party=D"],
+    "user_interests": ["/get_user_interests"],
+    "feed": ["/get_feed"],
+    "correlations": ["/get_correlations", "/get_correlation?x=health.Diabetes&y=census.poverty_rate", "/get_correlation?x=crime.Homicide&y=census.income_median&year=2022"],
+}
+
+# Keystroke-sized queries for the legislator autocomplete scenario
+NAME_PREFIXES = ["s", "jo", "mar", "smi", "warr", "schum", "gonz", "mc", "lee"]
+
+
+def configure_database():
+    import db
+    for key in ("host", "database", "user", "password", "port"):
+        override = os.getenv(f"BENCH_DB_{key.upper()}")
+        if override:
+            db.DB_CONFIG[key] = override
+    db.DB_CONFIG["options"] = f"-c search_path={SCHEMA}"
+
+
+def seed(conn, rng):
+    import pandas as pd
+    from ingestion import acs, census, cpi, crime, federal_spending, health, legislators, states
+    from ingestion.jobs import ACS_VARIABLES, CRIME_TYPES, HEALTH_MEASURES
+    from helper import STATES
+    from services.user_interests import save_user_interests
+
+    cur = conn.cursor()
+    cur.execute(f"CREATE SCHEMA IF NOT EXISTS {SCHEMA}")
+    conn.commit()
+    cur.close()
+    # As the "states" job does before every per-state job
+    states.backfill_state_keys(conn)
+
+    years = range(2021, 2025)
+    for full_state in list(STATES.values()) + ["United States"]:
+        for crime_type in CRIME_TYPES:
+            base = rng.uniform(2, 400)
+            crime.insert_crime_data(conn, full_state, {year: round(base * rng.uniform(0.85, 1.15), 2) for year in years}, crime_type)
+
+    for year in range(2021, 2024):
+        data = {
+            full_state: [rng.uniform(6, 20), rng.uniform(25, 50), rng.uniform(75000, 130000), rng.uniform(55000, 95000)]
+            for full_state in list(STATES.values()) + ["United States"]
+        }
+        census.insert_state_census_data(conn, data, year)
+    acs.insert_acs_data(conn, [
+        (full_state, year, variable, round(rng.uniform(1, 100000), 1))
+        for full_state in list(STATES.values()) + ["United States"]
+        for year in range(2021, 2024)
+        for variable in ACS_VARIABLES
+    ])
+    # Roughly the real spread: 3,100 counties and 18,000 agencies over the states
+    acs.insert_county_data(conn, [
+        (full_state, f"{state_idx:02d}{county:03d}", f"County {county}", year, variable, round(rng.uniform(1, 100000), 1))
+        for state_idx, full_state in enumerate(STATES.values(), start=1)
+        for county in range(1, 63)
+        for year in range(2021, 2024)
+        for variable in ACS_VARIABLES
+    ])
+    agencies = [
+        (full_state, f"{state}{agency:07d}", f"Agency {agency}", "City", f"County {agency % 62 + 1}")
+        for state, full_state in STATES.items()
+        for agency in range(360)
+    ]
+    crime.insert_agency_crime_data(conn, agencies, [
+        (full_state, ori, year, crime_type, rng.randint(0, 500))
+        for full_state, ori, _, _, _ in agencies
+        for year in years
+        for crime_type in CRIME_TYPES
+    ])
+
+    level = 240.0
+    cpi_rows = []
+    for year in range(2015, 2025):
+        for month in range(1, 13):
+            level *= 1 + rng.uniform(0.0005, 0.006)
+            cpi_rows.append(("CUUR0000SA0", year, month, round(level, 3)))
+    cpi.insert_cpi_data(conn, cpi_rows)
+
+    for state in STATES:
+        for name in HEALTH_MEASURES:
+            items = [{"state": state, "dateLabel": str(year), "rank": rng.randint(1, 50), "value": round(rng.uniform(1, 30), 1)} for year in range(2020, 2025)]
+            health.insert_health_data(conn, items, name)
+
+    agencies = pd.DataFrame({"agency_name": [f"Agency {i}" for i in range(100)], "outlay_amount": [rng.uniform(1e8, 1e12) for _ in range(100)]})
+    agencies["percent_budget"] = agencies["outlay_amount"] / agencies["outlay_amount"].sum() * 100
+    federal_spending.insert_agency_data(conn, agencies)
+    functions = pd.DataFrame({"name": [f"Function {i}" for i in range(20)], "amount": [rng.uniform(1e9, 1e12) for _ in range(20)]})
+    functions["percent_budget"] = functions["amount"] / functions["amount"].sum() * 100
+    federal_spending.insert_federal_budget_functions(conn, functions)
+    federal_spending.insert_federal_economic_data(conn, [
+        {"date": year, "pce_price_index": rng.uniform(100, 150), "gdp": rng.uniform(2e4, 4e4), "wages_and_salaries": rng.uniform(9e3, 2e4)}
+        for year in range(2020, 2031)
+    ])
+    federal_spending.insert_federal_debt(conn, [
+        {"record_fiscal_year": str(year), "debt_outstanding_amt": rng.uniform(2.3e13, 3.7e13)} for year in range(2020, 2026)
+    ])
+    statements = pd.DataFrame({
+        "Period": pd.date_range("2020-01-01", periods=68, freq="MS"),
+        "Receipts": [rng.randint(200_000, 500_000) for _ in range(68)],
+        "Outlays": [rng.randint(300_000, 700_000) for _ in range(68)],
+    })
+    statements["Deficit/Surplus (-)"] = statements["Receipts"] - statements["Outlays"]
+    federal_spending.insert_treasury_statements(conn, statements)
+
+    legislators.sync_roster(conn)
+    legislators.attach_nominate_scores(conn)
+
+    save_user_interests(conn, "bench-user", ["Crime", "Health", "Legislation"])
+
+
+def drop_schema(conn):
+    cur = conn.cursor()
+    cur.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+    conn.commit()
+    cur.close()
+
+
+class FakeResponse:
+    def __init__(self, payload):
+        self._payload = payload
+        self.status_code = 200
+
+    def json(self):
+        return self._payload
+
+    def raise_for_status(self):
+        pass
+
+
+def install_fakes(app, upstream_latency):
+    # Local stand-ins for everything outside the process
+    import types
+    import upstream
+    from auth import verify_token
+
+    app.dependency_overrides[verify_token] = lambda: "bench-user"
+
+    bills = {"bills": [
+        {"number": str(1000 + i), "title": f"Bill {i}", "originChamber": "House" if i % 2 else "Senate",
+         "latestAction": {"actionDate": "2025-06-01", "text": "Referred to committee."}}
+        for i in range(10)
+    ]}
+
+    def fake_request(method, url, **kwargs):
+        time.sleep(upstream_latency)
+        if "poverty-guidelines" in url:
+            return FakeResponse({"data": {"income": 15650 + 5500 * (int(url.rstrip("/").rsplit("/", 1)[-1]) - 1)}})
+        if "geocod.io" in url:
+            # Addresses are "ST-district" so the fake can answer without a geocoder
+            state, district = kwargs["params"]["q"].split("-")
+            return FakeResponse({"results": [{
+                "address_components": {"state": state},
+                "fields": {"congressional_districts": [{"district_number": int(district)}]},
+            }]})
+        return FakeResponse(bills)
+
+    # Swapping the shared session keeps the upstream metrics in the measured path
+    upstream._session = types.SimpleNamespace(request=fake_request)
+
+
+def expand(template, rng, states, districts):
+    state = rng.choice(states)
+    return template.format(
+        state=state,
+        household_size=rng.randint(1, 8),
+        address=f"{state}-{rng.choice(districts.get(state, [0]))}",
+        prefix=rng.choice(NAME_PREFIXES),
+    )
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    idx = min(len(sorted_values) - 1, max(0, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[idx]
+
+
+async def run_scenario(client, templates, concurrency, total, rng, states, districts):
+    latencies = []
+    errors = 0
+    issued = 0
+
+    async def worker():
+        nonlocal errors, issued
+        while issued < total:
+            issued += 1
+            path = expand(rng.choice(templates), rng, states, districts)
+            start = time.perf_counter()
+            response = await client.get(path)
+            latencies.append((time.perf_counter() - start) * 1000)
+            if response.status_code >= 400 or (isinstance(response.json(), dict) and "error" in response.json()):
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "seconds": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "mean_ms": round(statistics.fmean(latencies), 2) if latencies else 0.0,
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p90_ms": round(percentile(latencies, 90), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+    }
+
+
+def print_report(report, baseline=None):
+    print(f"{'scenario':<16} {'req':>6} {'err':>5} {'rps':>9} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9}")
+    for name, stats in report["scenarios"].items():
+        line = f"{name:<16} {stats['requests']:>6} {stats['errors']:>5} {stats['throughput_rps']:>9.1f} {stats['p50_ms']:>9.2f} {stats['p90_ms']:>9.2f} {stats['p99_ms']:>9.2f}"
+        previous = (baseline or {}).get("scenarios", {}).get(name)
+        if previous:
+            def delta(key):
+                return (stats[key] / previous[key] - 1) * 100 if previous[key] else 0.0
+            line += f"   vs baseline: rps {delta('throughput_rps'):+.0f}%, p50 {delta('p50_ms'):+.0f}%, p99 {delta('p99_ms'):+.0f}%"
+        print(line)
+
+
+async def main_async(args):
+    import httpx
+    import db
+    from main import app
+
+    rng = random.Random(args.seed)
+    install_fakes(app, args.upstream_latency_ms / 1000)
+
+    with db.connection_scope() as conn:
+        if not args.skip_seed:
+            seed(conn, rng)
+        cur = conn.cursor()
+        cur.execute("SELECT state, district FROM Representatives")
+        districts = {}
+        for state, district in cur.fetchall():
+            districts.setdefault(state, []).append(district)
+        cur.close()
+    from helper import STATES
+    states = sorted(state for state in districts if state in STATES) or ["FL"]
+
+    selected = args.scenario or list(SCENARIOS)
+    report = {"commit": os.getenv("GIT_COMMIT", ""), "concurrency": args.concurrency, "scenarios": {}}
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for name in selected:
+            # Warm caches and the pool before measuring
+            await run_scenario(client, SCENARIOS[name], args.concurrency, args.warmup, rng, states, districts)
+            report["scenarios"][name] = await run_scenario(client, SCENARIOS[name], args.concurrency, args.requests, rng, states, districts)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the API against a seeded fixture schema")
+    parser.add_argument("--scenario", action="append", choices=sorted(SCENARIOS), help="Run only this router's scenario (repeatable)")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=200, help="Measured requests per scenario")
+    parser.add_argument("--warmup", type=int, default=20, help="Unmeasured requests per scenario")
+    parser.add_argument("--upstream-latency-ms", type=float, default=50.0, help="Delay added by the fake upstream APIs")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--skip-seed", action="store_true", help="Reuse an already seeded schema (set BENCH_SCHEMA)")
+    parser.add_argument("--keep", action="store_true", help="Keep the fixture schema this run seeded")
+    parser.add_argument("--output", help="Write the JSON report here")
+    parser.add_argument("--compare", help="Baseline JSON report to compare against")
+    args = parser.parse_args()
+
+    global SCHEMA
+    SCHEMA = os.getenv("BENCH_SCHEMA", SCHEMA)
+    configure_database()
+    import db
+
+    try:
+        report = asyncio.run(main_async(args))
+    finally:
+        # A reused schema (--skip-seed) was not created by this run, so it is left alone
+        if not args.skip_seed and not args.keep:
+            with db.connection_scope() as conn:
+                drop_schema(conn)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+import json
+import threading
+
+from psycopg2 import Error
+
+from db import is_replica
+from metrics import CACHE_EVICTIONS, record_cache
+from singleflight import SingleFlight
+
+NOTIFY_CHANNEL = "data_versions"
+
+# Versions kept current by the invalidation listener; None while no listener
+# is connected, in which case every lookup reads data_versions instead
+_local_versions = None
+# Last versions any listener saw, kept across disconnects to spot missed bumps
+_last_seen_versions = None
+_local_lock = threading.Lock()
+_caches = []
+
+
+# Ingestion bumps a per-dataset version in the same transaction as its writes,
+# so any process can tell whether a cached result is still current with a
+# single primary-key lookup instead of rescanning the underlying tables.
+def bump_data_version(cur, dataset):
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS data_versions(
+            dataset VARCHAR(50) PRIMARY KEY,
+            version BIGINT NOT NULL DEFAULT 0,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cur.execute("""
+        INSERT INTO data_versions (dataset, version) VALUES (%s, 1)
+        ON CONFLICT (dataset) DO UPDATE SET version = data_versions.version + 1, updated_at = CURRENT_TIMESTAMP
+        RETURNING version
+    """, (dataset,))
+    version = cur.fetchone()[0]
+    # NOTIFY is transactional: listeners hear about the bump only once the
+    # ingestion commits, and never if it rolls back
+    cur.execute("SELECT pg_notify(%s, %s)", (NOTIFY_CHANNEL, json.dumps({"dataset": dataset, "version": version})))
+
+
+def local_data_versions(datasets):
+    local = _local_versions
+    if local is None:
+        return None
+    return tuple(local.get(dataset, 0) for dataset in datasets)
+
+
+def get_data_versions(conn, datasets):
+    # A replica may not have replayed a bump the listener already heard from
+    # the primary; its own versions are the ones that match the data it serves
+    versions = None if is_replica(conn) else local_data_versions(datasets)
+    if versions is not None:
+        return versions
+    cur = conn.cursor()
+    try:
+        cur.execute("SELECT dataset, version FROM data_versions WHERE dataset = ANY(%s)", (list(datasets),))
+        found = dict(cur.fetchall())
+    except Error:
+        # Nothing has been ingested through the versioned path yet
+        conn.rollback()
+        found = {}
+    finally:
+        cur.close()
+    return tuple(found.get(dataset, 0) for dataset in datasets)
+
+
+def set_local_versions(versions):
+    # A fresh snapshot from a (re)connected listener; anything that moved while
+    # it was disconnected is evicted as if its notification had arrived. On the
+    # first connect there is nothing to compare, and entries preloaded before
+    # the fork stay: they carry their own versions.
+    global _local_versions, _last_seen_versions
+    with _local_lock:
+        previous = _last_seen_versions
+        _local_versions = dict(versions)
+        _last_seen_versions = _local_versions
+    if previous is None:
+        return
+    for dataset in set(previous) | set(versions):
+        if previous.get(dataset, 0) != versions.get(dataset, 0):
+            evict_dataset(dataset)
+
+
+def apply_data_version(dataset, version):
+    global _local_versions, _last_seen_versions
+    with _local_lock:
+        if _local_versions is None or _local_versions.get(dataset, 0) >= version:
+            return
+        _local_versions = {**_local_versions, dataset: version}
+        _last_seen_versions = _local_versions
+    evict_dataset(dataset)
+
+
+def clear_local_versions():
+    global _local_versions
+    with _local_lock:
+        _local_versions = None
+
+
+def evict_dataset(dataset):
+    for cache in _caches:
+        cache.evict(dataset)
+
+
+class VersionedCache:
+    def __init__(self, name, datasets):
+        self.name = name
+        self.datasets = tuple(datasets)
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._flights = SingleFlight(name)
+        _caches.append(self)
+
+    def get(self, key, version):
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is not None and entry[0] == version:
+            return entry[1]
+        return None
+
+    def put(self, key, version, value, datasets=None):
+        # datasets overrides the cache-wide dependencies for entries such as
+        # feed bundles, which each depend on different tables
+        with self._lock:
+            self._entries[key] = (version, value, self.datasets if datasets is None else tuple(datasets))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def evict(self, dataset):
+        with self._lock:
+            stale = [key for key, entry in self._entries.items() if dataset in entry[2]]
+            for key in stale:
+                del self._entries[key]
+        if stale:
+            CACHE_EVICTIONS.labels(self.name, dataset).inc(len(stale))
+
+    def _build(self, key, version, compute, datasets):
+        # A leader that started just after another finished finds the fresh entry
+        value = self.get(key, version)
+        if value is None:
+            value = compute()
+            if value is not None:
+                self.put(key, version, value, datasets)
+        return value
+
+    def get_or_build(self, key, version, compute, datasets=None):
+        value = self.get(key, version)
+        record_cache(self.name, value is not None)
+        if value is None:
+            # Concurrent misses for the same entry wait on a single computation
+            value = self._flights.do((key, version), lambda: self._build(key, version, compute, datasets))
+        return value
+
+    async def get_or_build_async(self, key, version, compute, datasets=None):
+        value = self.get(key, version)
+        record_cache(self.name, value is not None)
+        if value is None:
+            value = await self._flights.do_async((key, version), lambda: self._build(key, version, compute, datasets))
+        return value
+
+    def get_or_compute(self, conn, key, compute):
+        return self.get_or_build(key, get_data_versions(conn, self.datasets), compute)
@@ -0,0 +1,227 @@
+# Record/replay transport for the shared upstream session.
+#
+# Every outbound call (FBI CDE, Census, BLS, USAspending, Treasury, AHR,
+# Congress, HHS ASPE, Geocodio, Cognito JWKS) goes through upstream._session,
+# so mounting this adapter on it covers ingestion and the request path alike:
+#
+#   UPSTREAM_CASSETTE_MODE=record python ingest.py --job cpi --job health
+#   UPSTREAM_CASSETTE_MODE=replay UPSTREAM_FAKE_LATENCY_MS=120 UPSTREAM_FAKE_ERROR_RATE=0.02 \
+#       python ingest.py --job cpi --job health --workers 4
+#
+# Cassettes are one JSON file per host under UPSTREAM_CASSETTE_DIR. API keys
+# and tokens are stripped from the recorded requests, so cassettes can be
+# shared. Replay is deterministic: identical requests get their recorded
+# responses in order (the last one repeats), and injected latency, errors and
+# throttling draw from a seeded RNG.
+import atexit
+import base64
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from requests import Response
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.exceptions import ConnectionError
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+CASSETTE_DIR = os.getenv("UPSTREAM_CASSETTE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "cassettes"))
+SECRET_NAME = re.compile(r"key|token|secret|password", re.IGNORECASE)
+RECORDED_HEADERS = ("content-type", "retry-after")
+# Recorded entries are kept in memory and a host's cassette is rewritten after
+# this many new ones, and once more when the adapter closes or the process exits
+FLUSH_EVERY = int(os.getenv("UPSTREAM_CASSETTE_FLUSH_EVERY", "500"))
+
+
+def _strip_secrets(pairs):
+    return [(name, value) for name, value in pairs if not SECRET_NAME.search(name)]
+
+
+def _scrubbed_url(url):
+    parts = urlsplit(url)
+    query = urlencode(sorted(_strip_secrets(parse_qsl(parts.query, keep_blank_values=True))))
+    return urlunsplit((parts.scheme, parts.netloc, parts.path, query, ""))
+
+
+def _scrubbed_body(body):
+    if not body:
+        return ""
+    if isinstance(body, bytes):
+        body = body.decode("utf-8", "replace")
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        return body
+    if isinstance(payload, dict):
+        payload = {name: value for name, value in payload.items() if not SECRET_NAME.search(name)}
+    return json.dumps(payload, sort_keys=True)
+
+
+def request_key(request):
+    # Method, URL without secrets and a digest of the (secret-free) body
+    key = f"{request.method} {_scrubbed_url(request.url)}"
+    body = _scrubbed_body(request.body)
+    if body:
+        key += " #" + hashlib.sha1(body.encode()).hexdigest()[:12]
+    return key
+
+
+class CassetteAdapter(BaseAdapter):
+    def __init__(self, mode, directory=CASSETTE_DIR, latency_ms=0.0, jitter_ms=0.0, error_rate=0.0, rate_limit=0.0, seed=0):
+        super().__init__()
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unknown cassette mode: {mode}")
+        self.mode = mode
+        self.directory = directory
+        self.latency = latency_ms / 1000
+        self.jitter = jitter_ms / 1000
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit
+        self._real = HTTPAdapter() if mode == "record" else None
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._cassettes = {}
+        self._positions = {}
+        # host -> entries recorded since its cassette was last written
+        self._unflushed = {}
+        # Held while writing, so two flushes of one host never share its .tmp file
+        self._flush_lock = threading.Lock()
+        if mode == "record":
+            atexit.register(self.flush)
+        # host -> (tokens, last refill); a token bucket of rate_limit requests per second
+        self._buckets = {}
+
+    def _path(self, host):
+        return os.path.join(self.directory, f"{host}.json")
+
+    def _cassette(self, host):
+        cassette = self._cassettes.get(host)
+        if cassette is None:
+            try:
+                with open(self._path(host)) as f:
+                    cassette = json.load(f)
+            except FileNotFoundError:
+                cassette = {}
+            self._cassettes[host] = cassette
+        return cassette
+
+    def _record(self, host, key, response):
+        entry = {
+            "status": response.status_code,
+            "reason": response.reason,
+            "headers": {name: value for name, value in response.headers.items() if name.lower() in RECORDED_HEADERS},
+        }
+        # Text bodies stay readable in the cassette; anything else is base64
+        try:
+            entry["body"] = response.content.decode("utf-8")
+        except UnicodeDecodeError:
+            entry["body_base64"] = base64.b64encode(response.content).decode()
+        with self._lock:
+            self._cassette(host).setdefault(key, []).append(entry)
+            self._unflushed[host] = self._unflushed.get(host, 0) + 1
+            due = self._unflushed[host] >= FLUSH_EVERY
+        if due:
+            self.flush(host)
+
+    def flush(self, host=None):
+        # Writes the cassettes of every host (or just host) with unwritten
+        # entries. Fetchers keep recording meanwhile: only the copy of each
+        # cassette is taken under the request lock, not the serialisation.
+        with self._flush_lock:
+            with self._lock:
+                hosts = [name for name, count in self._unflushed.items() if count and (host is None or name == host)]
+                snapshots = {name: {key: list(entries) for key, entries in self._cassettes[name].items()} for name in hosts}
+                for name in hosts:
+                    self._unflushed[name] = 0
+            if snapshots:
+                os.makedirs(self.directory, exist_ok=True)
+            for name, cassette in snapshots.items():
+                temporary = self._path(name) + ".tmp"
+                with open(temporary, "w") as f:
+                    json.dump(cassette, f, indent=1, sort_keys=True)
+                os.replace(temporary, self._path(name))
+
+    def _replay(self, host, key):
+        with self._lock:
+            entries = self._cassette(host).get(key)
+            if not entries:
+                return None
+            position = self._positions.get(key, 0)
+            self._positions[key] = position + 1
+            return entries[min(position, len(entries) - 1)]
+
+    def _throttled(self, host):
+        if self.rate_limit <= 0:
+            return False
+        with self._lock:
+            now = time.monotonic()
+            tokens, refilled = self._buckets.get(host, (self.rate_limit, now))
+            tokens = min(self.rate_limit, tokens + (now - refilled) * self.rate_limit)
+            if tokens < 1:
+                self._buckets[host] = (tokens, now)
+                return True
+            self._buckets[host] = (tokens - 1, now)
+            return False
+
+    def _inject(self, host):
+        # Simulated network conditions; returns a synthetic failure, if any
+        with self._lock:
+            delay = self.latency + (self._rng.uniform(-self.jitter, self.jitter) if self.jitter else 0.0)
+            failed = self.error_rate > 0 and self._rng.random() < self.error_rate
+        if delay > 0:
+            time.sleep(delay)
+        if self._throttled(host):
+            return {"status": 429, "reason": "Too Many Requests", "headers": {"Retry-After": "1"}, "body": ""}
+        if failed:
+            return {"status": 503, "reason": "Service Unavailable", "headers": {}, "body": ""}
+        return None
+
+    def _build_response(self, request, entry):
+        response = Response()
+        response.status_code = entry["status"]
+        response.reason = entry.get("reason", "")
+        response.headers = CaseInsensitiveDict(entry["headers"])
+        response.encoding = get_encoding_from_headers(response.headers)
+        response._content = base64.b64decode(entry["body_base64"]) if "body_base64" in entry else entry.get("body", "").encode("utf-8")
+        response.url = request.url
+        response.request = request
+        return response
+
+    def send(self, request, **kwargs):
+        host = urlsplit(request.url).hostname or "unknown"
+        key = request_key(request)
+        if self.mode == "record":
+            response = self._real.send(request, **kwargs)
+            self._record(host, key, response)
+            return response
+        entry = self._inject(host) or self._replay(host, key)
+        if entry is None:
+            raise ConnectionError(f"No recorded response for {key}", request=request)
+        return self._build_response(request, entry)
+
+    def close(self):
+        if self._real is not None:
+            self.flush()
+            self._real.close()
+
+
+def mount_from_env(session):
+    mode = os.getenv("UPSTREAM_CASSETTE_MODE")
+    if not mode:
+        return None
+    adapter = CassetteAdapter(
+        mode,
+        latency_ms=float(os.getenv("UPSTREAM_FAKE_LATENCY_MS", "0")),
+        jitter_ms=float(os.getenv("UPSTREAM_FAKE_JITTER_MS", "0")),
+        error_rate=float(os.getenv("UPSTREAM_FAKE_ERROR_RATE", "0")),
+        rate_limit=float(os.getenv("UPSTREAM_FAKE_RATE_LIMIT", "0")),
+        seed=int(os.getenv("UPSTREAM_FAKE_SEED", "0")),
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return adapter
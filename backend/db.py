@@ -1,10 +1,16 @@
+import itertools
 import os
+import threading
+import time
 from contextlib import contextmanager
 from typing import Generator
 
 from dotenv import load_dotenv
 import psycopg2
-from psycopg2.pool import SimpleConnectionPool
+from psycopg2.pool import PoolError, ThreadedConnectionPool
+
+from metrics import DB_POOL_IN_USE, DB_POOL_WAIT, DB_READ_ROUTING
+import timing
 
 
 load_dotenv()
@@ -19,28 +25,187 @@ DB_CONFIG = {
 }
 
 
-_pool: SimpleConnectionPool | None = None
-
-
-def _get_pool() -> SimpleConnectionPool:
-    global _pool
-    if _pool is None:
-        _pool = SimpleConnectionPool(minconn=1, maxconn=10, **DB_CONFIG)
-    return _pool
+# Under gunicorn this is derived per worker from DB_CONNECTION_BUDGET (see gunicorn.conf.py)
+POOL_MAXCONN = int(os.getenv("DB_POOL_MAX", "10"))
+POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+
+# Streaming replicas as a comma-separated host[:port] list; they share every
+# other DB_CONFIG setting. With none configured all traffic goes to DB_HOST.
+REPLICA_HOSTS = [host.strip() for host in os.getenv("DB_REPLICA_HOSTS", "").split(",") if host.strip()]
+# A replica further behind the primary than this serves no reads until it catches up
+REPLICA_MAX_LAG = float(os.getenv("DB_REPLICA_MAX_LAG", "5"))
+# How often each replica's lag is measured, on a connection that was being checked out anyway
+REPLICA_LAG_CHECK = float(os.getenv("DB_REPLICA_LAG_CHECK", "5"))
+
+READ = "read"
+WRITE = "write"
+
+
+class _Pool:
+    # psycopg2's pool raises as soon as it is exhausted; the semaphore makes
+    # callers queue for a free connection instead, which is the wait we measure
+    def __init__(self, name, host=None):
+        self.name = name
+        self.host = host
+        self.pool: ThreadedConnectionPool | None = None
+        self.slots = threading.BoundedSemaphore(POOL_MAXCONN)
+        # Replicas only: whether the last lag check passed, and when it ran
+        self.usable = True
+        self.checked_at = 0.0
+        self.check_lock = threading.Lock()
+
+    def config(self):
+        # Read at pool creation so overrides of DB_CONFIG (tests, benchmarks) apply to replicas too
+        if self.host is None:
+            return DB_CONFIG
+        host, _, port = self.host.partition(":")
+        return {**DB_CONFIG, "host": host, "port": port or DB_CONFIG["port"]}
+
+    def get(self):
+        start = time.perf_counter()
+        if not self.slots.acquire(timeout=POOL_TIMEOUT):
+            raise PoolError(f"Timed out after {POOL_TIMEOUT}s waiting for a database connection")
+        try:
+            if self.pool is None:
+                self.pool = ThreadedConnectionPool(minconn=1, maxconn=POOL_MAXCONN, **self.config())
+            conn = self.pool.getconn()
+            if self.host is not None and not conn.readonly:
+                # Writes sent to a replica by mistake fail instead of reaching a standby
+                conn.set_session(readonly=True)
+        except Exception:
+            self.slots.release()
+            raise
+        waited = time.perf_counter() - start
+        DB_POOL_WAIT.labels(self.name).observe(waited)
+        timing.record("pool", waited)
+        DB_POOL_IN_USE.labels(self.name).inc()
+        _owners[id(conn)] = self
+        return conn
+
+    def put(self, conn, close=False):
+        _owners.pop(id(conn), None)
+        self.pool.putconn(conn, close=close)
+        DB_POOL_IN_USE.labels(self.name).dec()
+        self.slots.release()
+
+    def reset(self):
+        self.pool = None
+        self.slots = threading.BoundedSemaphore(POOL_MAXCONN)
+        self.usable = True
+        self.checked_at = 0.0
+        DB_POOL_IN_USE.labels(self.name).set(0)
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.closeall()
+            self.pool = None
+
+
+_primary = _Pool("primary")
+_replicas = [_Pool(f"replica:{host}", host) for host in REPLICA_HOSTS]
+_next_replica = itertools.count()
+# Pool each checked-out connection came from, keyed by id(conn)
+_owners: dict[int, _Pool] = {}
+
+
+def reset_pool() -> None:
+    # Called in a freshly forked worker: connections inherited from the parent
+    # share its sockets, so they are dropped without being closed
+    for pool in (_primary, *_replicas):
+        pool.reset()
+
+
+def close_pool() -> None:
+    for pool in (_primary, *_replicas):
+        pool.close()
+
+
+def _replica_lag(conn):
+    # Seconds of replay lag; a replica that has replayed everything it received
+    # is current however long ago the primary last wrote
+    cur = conn.cursor()
+    try:
+        cur.execute("""
+            SELECT CASE
+                WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+                ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+            END
+        """)
+        lag = cur.fetchone()[0]
+    finally:
+        cur.close()
+        conn.rollback()
+    return float("inf") if lag is None else float(lag)
 
 
-def get_connection():
-    return _get_pool().getconn()
+def _replica_connection(replica):
+    # A connection from this replica, or None if it is unreachable or lagging.
+    # Only one caller at a time re-measures; the others go by the last result.
+    if time.monotonic() - replica.checked_at < REPLICA_LAG_CHECK or not replica.check_lock.acquire(blocking=False):
+        return replica.get() if replica.usable else None
+    try:
+        conn = replica.get()
+        try:
+            lag = _replica_lag(conn)
+        except psycopg2.Error as e:
+            print(f"Replica {replica.host} lag check failed", e)
+            replica.put(conn, close=True)
+            replica.usable = False
+            return None
+        replica.usable = lag <= REPLICA_MAX_LAG
+        if not replica.usable:
+            print(f"Replica {replica.host} is {lag:.1f}s behind, reading from the primary")
+            replica.put(conn)
+            return None
+        return conn
+    finally:
+        replica.checked_at = time.monotonic()
+        replica.check_lock.release()
+
+
+def _read_connection():
+    # Round-robin over the replicas, starting at a different one each time
+    start = next(_next_replica)
+    for i in range(len(_replicas)):
+        replica = _replicas[(start + i) % len(_replicas)]
+        try:
+            conn = _replica_connection(replica)
+        except psycopg2.OperationalError as e:
+            print(f"Replica {replica.host} unreachable, reading from the primary", e)
+            replica.usable = False
+            replica.checked_at = time.monotonic()
+            continue
+        if conn is not None:
+            DB_READ_ROUTING.labels(replica.name).inc()
+            return conn
+    DB_READ_ROUTING.labels(_primary.name).inc()
+    return _primary.get()
+
+
+def get_connection(intent=WRITE):
+    # intent=READ may be served by a replica, so it suits only reads that can
+    # tolerate up to REPLICA_MAX_LAG of staleness. Writes, and reads that must
+    # see a write the same user just made, use the primary.
+    if intent not in (READ, WRITE):
+        raise ValueError(f"Unknown connection intent: {intent}")
+    if intent == READ and _replicas:
+        return _read_connection()
+    return _primary.get()
 
 
 def release_connection(conn) -> None:
     if conn is not None:
-        _get_pool().putconn(conn)
+        _owners.get(id(conn), _primary).put(conn)
+
+
+def is_replica(conn) -> bool:
+    pool = _owners.get(id(conn))
+    return pool is not None and pool is not _primary
 
 
 @contextmanager
-def connection_scope():
-    conn = get_connection()
+def connection_scope(intent=WRITE):
+    conn = get_connection(intent)
     try:
         yield conn
     finally:
@@ -53,5 +218,3 @@ def db_dependency() -> Generator[psycopg2.extensions.connection, None, None]:
         yield conn
     finally:
         release_connection(conn)
-
-
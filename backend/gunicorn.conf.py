@@ -0,0 +1,120 @@
+# Production serving: gunicorn managing uvicorn workers.
+#
+#   cd backend && gunicorn -c gunicorn.conf.py
+#
+# The app is imported once in the master (preload_app), so SIGHUP re-forks
+# workers from the code already loaded and does NOT pick up a deploy. Deploy
+# with a full stop and start, or with SIGUSR2 (a new master on the new code)
+# followed by SIGTERM to the old master once the new one is serving.
+#
+# WEB_CONCURRENCY       worker processes (default: one per core)
+# DB_CONNECTION_BUDGET  Postgres connections all workers may hold together, their
+#                       invalidation listeners included; keep it below
+#                       max_connections minus ingestion and admin sessions.
+#                       The same budget applies to each server in DB_REPLICA_HOSTS
+# GRACEFUL_TIMEOUT      seconds a worker gets to finish in-flight requests on
+#                       SIGTERM or SIGHUP before it is killed
+# WORKER_GENERATIONS    sets of workers that may hold connections at once
+#                       (default 2). During a SIGHUP or SIGUSR2 restart the old
+#                       workers drain for up to GRACEFUL_TIMEOUT while the new
+#                       ones serve; set 1 only if deploys stop the old server
+#                       before starting the new one
+import os
+import shutil
+import tempfile
+
+workers = int(os.getenv("WEB_CONCURRENCY", os.cpu_count() or 1))
+DB_CONNECTION_BUDGET = int(os.getenv("DB_CONNECTION_BUDGET", "80"))
+WORKER_GENERATIONS = int(os.getenv("WORKER_GENERATIONS", "2"))
+# The budget is split as if old and new workers overlap, as they do across a
+# restart. Each worker also holds one connection outside its pool for the
+# cache invalidation listener (invalidation.py); the rest is shared equally
+# between the pools. This is set before the app is imported so
+# db.POOL_MAXCONN picks it up in the master and every worker.
+WORKER_SLOTS = workers * WORKER_GENERATIONS
+LISTENER_CONNECTIONS = WORKER_SLOTS if os.getenv("CACHE_LISTEN", "1") != "0" else 0
+os.environ.setdefault("DB_POOL_MAX", str((DB_CONNECTION_BUDGET - LISTENER_CONNECTIONS) // WORKER_SLOTS))
+# Refuse to start rather than quietly go over the budget, whether the split
+# leaves a pool no connection or DB_POOL_MAX was set too high
+if int(os.environ["DB_POOL_MAX"]) < 1 or WORKER_SLOTS * int(os.environ["DB_POOL_MAX"]) + LISTENER_CONNECTIONS > DB_CONNECTION_BUDGET:
+    raise SystemExit(
+        f"DB_CONNECTION_BUDGET={DB_CONNECTION_BUDGET} cannot cover {workers} workers x {WORKER_GENERATIONS} generations"
+        f" with DB_POOL_MAX={os.environ['DB_POOL_MAX']} and {LISTENER_CONNECTIONS} listener connections;"
+        " raise the budget or lower WEB_CONCURRENCY, WORKER_GENERATIONS or DB_POOL_MAX"
+    )
+
+# prometheus_client switches to file-backed metrics when this is set at import
+# time. A directory passed in by the deployment should be emptied before start.
+if workers > 1 and not os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = os.path.join(tempfile.gettempdir(), f"prometheus_{os.getpid()}")
+    os.makedirs(os.environ["PROMETHEUS_MULTIPROC_DIR"], exist_ok=True)
+
+wsgi_app = "main:app"
+bind = os.getenv("BIND", "0.0.0.0:8001")
+worker_class = "uvicorn.workers.UvicornWorker"
+# Import the app once in the master so workers share its pages copy-on-write.
+# Workers re-forked by SIGHUP get this same code; see the deploy note above.
+preload_app = True
+graceful_timeout = int(os.getenv("GRACEFUL_TIMEOUT", "30"))
+timeout = int(os.getenv("WORKER_TIMEOUT", "60"))
+keepalive = 5
+# Recycle workers now and then; the jitter keeps them from restarting together
+max_requests = int(os.getenv("MAX_REQUESTS", "0"))
+max_requests_jitter = max_requests // 10
+
+
+def when_ready(server):
+    # Runs in the master after the app is loaded and before the first fork.
+    # Database-backed caches warmed here are inherited by every worker; each
+    # is versioned, so a worker still rebuilds it once ingestion moves on.
+    import db
+    from services.get_correlations import get_correlation_matrix
+    from services.get_state_crime import get_crime_trends
+    from services.legislator_search import get_legislator_index
+
+    def with_connection(build):
+        def warm():
+            with db.connection_scope(db.READ) as conn:
+                build(conn)
+        return warm
+
+    try:
+        for name, warm in (
+            ("legislator index", get_legislator_index),
+            ("crime trends", with_connection(get_crime_trends)),
+            ("correlations", with_connection(get_correlation_matrix)),
+        ):
+            try:
+                warm()
+            except Exception as e:
+                server.log.warning(f"Skipping {name} preload: {e}")
+    finally:
+        # Workers must not inherit the master's connections
+        db.close_pool()
+
+
+def post_fork(server, worker):
+    import db
+    import upstream
+    db.reset_pool()
+    upstream.reset_session()
+
+
+def worker_exit(server, worker):
+    # The worker has drained its requests; hand its connections back to Postgres
+    import db
+    from services.user_interests import flush_pending_interests
+    flush_pending_interests()
+    db.close_pool()
+
+
+def child_exit(server, worker):
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
+
+
+def on_exit(server):
+    directory = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+    if directory and directory.startswith(os.path.join(tempfile.gettempdir(), "prometheus_")):
+        shutil.rmtree(directory, ignore_errors=True)
@@ -1,55 +1,83 @@
+# Canonical state identity, mirrored into the states table at ingestion (see
+# ingestion/states.py). Fact tables reference states.id, a smallint, so joins
+# and indexes across datasets never compare state names or postal codes.
+# Ids are fixed here rather than assigned by the database so every process
+# resolves them without a query; append new rows, never renumber.
+#
+# (id, postal code, FIPS code, name)
+STATE_ROWS = [
+    (1, 'AL', '01', 'Alabama'),
+    (2, 'AK', '02', 'Alaska'),
+    (3, 'AZ', '04', 'Arizona'),
+    (4, 'AR', '05', 'Arkansas'),
+    (5, 'CA', '06', 'California'),
+    (6, 'CO', '08', 'Colorado'),
+    (7, 'CT', '09', 'Connecticut'),
+    (8, 'DE', '10', 'Delaware'),
+    (9, 'FL', '12', 'Florida'),
+    (10, 'GA', '13', 'Georgia'),
+    (11, 'HI', '15', 'Hawaii'),
+    (12, 'ID', '16', 'Idaho'),
+    (13, 'IL', '17', 'Illinois'),
+    (14, 'IN', '18', 'Indiana'),
+    (15, 'IA', '19', 'Iowa'),
+    (16, 'KS', '20', 'Kansas'),
+    (17, 'KY', '21', 'Kentucky'),
+    (18, 'LA', '22', 'Louisiana'),
+    (19, 'ME', '23', 'Maine'),
+    (20, 'MD', '24', 'Maryland'),
+    (21, 'MA', '25', 'Massachusetts'),
+    (22, 'MI', '26', 'Michigan'),
+    (23, 'MN', '27', 'Minnesota'),
+    (24, 'MS', '28', 'Mississippi'),
+    (25, 'MO', '29', 'Missouri'),
+    (26, 'MT', '30', 'Montana'),
+    (27, 'NE', '31', 'Nebraska'),
+    (28, 'NV', '32', 'Nevada'),
+    (29, 'NH', '33', 'New Hampshire'),
+    (30, 'NJ', '34', 'New Jersey'),
+    (31, 'NM', '35', 'New Mexico'),
+    (32, 'NY', '36', 'New York'),
+    (33, 'NC', '37', 'North Carolina'),
+    (34, 'ND', '38', 'North Dakota'),
+    (35, 'OH', '39', 'Ohio'),
+    (36, 'OK', '40', 'Oklahoma'),
+    (37, 'OR', '41', 'Oregon'),
+    (38, 'PA', '42', 'Pennsylvania'),
+    (39, 'RI', '44', 'Rhode Island'),
+    (40, 'SC', '45', 'South Carolina'),
+    (41, 'SD', '46', 'South Dakota'),
+    (42, 'TN', '47', 'Tennessee'),
+    (43, 'TX', '48', 'Texas'),
+    (44, 'UT', '49', 'Utah'),
+    (45, 'VT', '50', 'Vermont'),
+    (46, 'VA', '51', 'Virginia'),
+    (47, 'WA', '53', 'Washington'),
+    (48, 'WV', '54', 'West Virginia'),
+    (49, 'WI', '55', 'Wisconsin'),
+    (50, 'WY', '56', 'Wyoming'),
+    (51, 'DC', '11', 'District of Columbia'),
+    (52, 'US', '00', 'United States'),
+    # Territories with a House delegate
+    (53, 'PR', '72', 'Puerto Rico'),
+    (54, 'GU', '66', 'Guam'),
+    (55, 'VI', '78', 'U.S. Virgin Islands'),
+    (56, 'AS', '60', 'American Samoa'),
+    (57, 'MP', '69', 'Northern Mariana Islands'),
+]
+
+NATIONAL = "United States"
+
+# Postal code -> name for the 50 states (ids 1-50), the set every per-state ingestion job walks
+STATES = {code: name for id, code, _, name in STATE_ROWS if id <= 50}
+# Postal code -> name for every row, DC, the national row and territories included
+STATE_NAMES = {code: name for _, code, _, name in STATE_ROWS}
+# Postal code or name -> id
+STATE_IDS = {**{code: id for id, code, _, _ in STATE_ROWS}, **{name: id for id, _, _, name in STATE_ROWS}}
+# id -> name
+STATE_NAMES_BY_ID = {id: name for id, _, _, name in STATE_ROWS}
+
+
 # Helper function to translate state code to state name
 def translate_state(state):
-    states = {
-        'AL': 'Alabama',
-        'AK': 'Alaska',
-        'AZ': 'Arizona',
-        'AR': 'Arkansas',
-        'CA': 'California',
-        'CO': 'Colorado',
-        'CT': 'Connecticut',
-        'DE': 'Delaware',
-        'FL': 'Florida',
-        'GA': 'Georgia',
-        'HI': 'Hawaii',
-        'ID': 'Idaho',
-        'IL': 'Illinois',
-        'IN': 'Indiana',
-        'IA': 'Iowa',
-        'KS': 'Kansas',
-        'KY': 'Kentucky',
-        'LA': 'Louisiana',
-        'ME': 'Maine',
-        'MD': 'Maryland',
-        'MA': 'Massachusetts',
-        'MI': 'Michigan',
-        'MN': 'Minnesota',
-        'MS': 'Mississippi',
-        'MO': 'Missouri',
-        'MT': 'Montana',
-        'NE': 'Nebraska',
-        'NV': 'Nevada',
-        'NH': 'New Hampshire',
-        'NJ': 'New Jersey',
-        'NM': 'New Mexico',
-        'NY': 'New York',
-        'NC': 'North Carolina',
-        'ND': 'North Dakota',
-        'OH': 'Ohio',
-        'OK': 'Oklahoma',
-        'OR': 'Oregon',
-        'PA': 'Pennsylvania',
-        'RI': 'Rhode Island',
-        'SC': 'South Carolina',
-        'SD': 'South Dakota',
-        'TN': 'Tennessee',
-        'TX': 'Texas',
-        'UT': 'Utah',
-        'VT': 'Vermont',
-        'VA': 'Virginia',
-        'WA': 'Washington',
-        'WV': 'West Virginia',
-        'WI': 'Wisconsin',
-        'WY': 'Wyoming',
-    }
-    return states[state]
\ No newline at end of file
+    return STATE_NAMES[state]
@@ -0,0 +1,50 @@
+# Single entry point for refreshing every dataset the API serves.
+#
+#   python ingest.py                          # full refresh
+#   python ingest.py --list
+#   python ingest.py --dry-run
+#   python ingest.py --job census --job cpi
+#   python ingest.py --job us_census_json --with-deps
+import argparse
+import sys
+import time
+
+from ingestion.jobs import JOBS
+from ingestion.runner import format_report, plan_waves, resolve, run_jobs
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run data ingestion jobs")
+    parser.add_argument("--job", action="append", default=[], help="Run only this job (repeatable)")
+    parser.add_argument("--with-deps", action="store_true", help="Also run the dependencies of the selected jobs")
+    parser.add_argument("--workers", type=int, default=4, help="Number of jobs to run in parallel")
+    parser.add_argument("--dry-run", action="store_true", help="Print the execution plan without running anything")
+    parser.add_argument("--list", action="store_true", help="List the available jobs")
+    args = parser.parse_args()
+
+    if args.list:
+        for name, job in JOBS.items():
+            deps = f" (after {', '.join(job.deps)})" if job.deps else ""
+            print(f"{name:<20} {job.description}{deps}")
+        return 0
+
+    try:
+        names = resolve(JOBS, args.job or list(JOBS), args.with_deps)
+        waves = plan_waves(JOBS, names)
+    except (KeyError, ValueError) as e:
+        print(e.args[0])
+        return 2
+
+    if args.dry_run:
+        for idx, wave in enumerate(waves, start=1):
+            print(f"wave {idx}: {', '.join(wave)}")
+        return 0
+
+    start = time.perf_counter()
+    results = run_jobs(JOBS, names, workers=args.workers)
+    print(format_report(results, time.perf_counter() - start))
+    return 0 if all(result.status == "ok" for result in results.values()) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
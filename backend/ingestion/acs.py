@@ -0,0 +1,269 @@
+import csv
+import io
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+from psycopg2 import Error
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from db import connection_scope
+import upstream
+from cache import bump_data_version
+from helper import STATE_IDS
+from ingestion.partitions import create_year_partitions
+from ingestion.states import index_state_key
+
+load_dotenv()
+
+ACS_URL = "https://api.census.gov/data/{year}/acs/{survey}{table}"
+# The API answers at most 50 variables per request, and NAME takes one of them
+MAX_VARIABLES = 49
+# Requests in flight at once across all years, variable chunks and geographies
+ACS_WORKERS = int(os.getenv("ACS_WORKERS", "8"))
+# Every state (and DC) in one response, and the national row in another
+GEOGRAPHIES = ("state:*", "us:*")
+# The 1-year survey only covers counties of 65,000 people or more; the 5-year
+# one covers all of them
+COUNTY_SURVEY = "acs5"
+PUERTO_RICO_FIPS = "72"
+# Estimates the Bureau suppresses or cannot compute are negative sentinels
+# (-111111111 through -999999999) rather than nulls
+SENTINEL_CEILING = -111111111
+
+
+def acs_table(variable):
+    # Data profile, subject and detailed tables are separate endpoints, and a
+    # request can only ask one of them
+    if variable.startswith("DP"):
+        return "/profile"
+    if variable.startswith("S"):
+        return "/subject"
+    return ""
+
+
+def chunk_variables(variables):
+    # (table, variables) requests covering every distinct variable
+    by_table = {}
+    for variable in dict.fromkeys(variables):
+        by_table.setdefault(acs_table(variable), []).append(variable)
+    return [
+        (table, names[start:start + MAX_VARIABLES])
+        for table, names in by_table.items()
+        for start in range(0, len(names), MAX_VARIABLES)
+    ]
+
+
+def parse_value(raw):
+    try:
+        value = float(raw)
+    except (TypeError, ValueError):
+        return None
+    return None if value <= SENTINEL_CEILING else value
+
+
+def get_acs_response(year, table, variables, geography, survey="acs1"):
+    params = {"get": ",".join(["NAME", *variables]), "for": geography}
+    if os.getenv("CENSUS_API_KEY"):
+        params["key"] = os.getenv("CENSUS_API_KEY")
+    response = upstream.get(ACS_URL.format(year=year, survey=survey, table=table), params=params)
+    response.raise_for_status()
+    return response
+
+
+def organize_acs_response(response, year, variables):
+    # (geo, year, variable, value) rows; the first row of the response is its header
+    rows = []
+    for item in response.json()[1:]:
+        if item[0] == "Puerto Rico":
+            continue
+        for variable, raw in zip(variables, item[1:]):
+            value = parse_value(raw)
+            if value is not None:
+                rows.append((item[0], year, variable, value))
+    return rows
+
+
+def organize_county_response(response, year, variables):
+    # (state, county_fips, county, year, variable, value) rows. NAME reads
+    # "Autauga County, Alabama"; the state and county FIPS codes close each row.
+    rows = []
+    for item in response.json()[1:]:
+        state_fips, county_fips = item[-2], item[-1]
+        if state_fips == PUERTO_RICO_FIPS:
+            continue
+        county, _, state = item[0].rpartition(", ")
+        for variable, raw in zip(variables, item[1:]):
+            value = parse_value(raw)
+            if value is not None:
+                rows.append((state, state_fips + county_fips, county, year, variable, value))
+    return rows
+
+
+def _fetch_all(variables, years, geographies, survey, organize, workers):
+    calls = [
+        (year, table, names, geography)
+        for year in years
+        for table, names in chunk_variables(variables)
+        for geography in geographies
+    ]
+
+    def fetch(call):
+        year, table, names, geography = call
+        return organize(get_acs_response(year, table, names, geography, survey), year, names)
+
+    # Requests share the upstream session, whose keep-alive connections are
+    # reused across threads; any failure fails the whole fetch
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return [row for rows in executor.map(fetch, calls) for row in rows]
+
+
+def fetch_acs(variables, years, workers=ACS_WORKERS):
+    return _fetch_all(variables, years, GEOGRAPHIES, "acs1", organize_acs_response, workers)
+
+
+def fetch_acs_counties(variables, years, workers=ACS_WORKERS):
+    # Every county in the country comes back in one response per variable chunk
+    return _fetch_all(variables, years, ("county:*",), COUNTY_SURVEY, organize_county_response, workers)
+
+
+def create_census_metrics_table(cur, years):
+    # One partition per ACS year: a year's re-ingest touches only its own
+    # partition, and a year range prunes the rest
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS census_metrics(
+            geo VARCHAR(30) NOT NULL,
+            state_id SMALLINT REFERENCES states(id),
+            year INT NOT NULL,
+            variable VARCHAR(20) NOT NULL,
+            value FLOAT NOT NULL,
+            PRIMARY KEY (variable, geo, year)
+        ) PARTITION BY LIST (year)
+    """)
+    create_year_partitions(cur, "census_metrics", years)
+    index_state_key(cur, "census_metrics")
+
+
+def insert_acs_data(conn, rows):
+    try:
+        cur = conn.cursor()
+        create_census_metrics_table(cur, [row[1] for row in rows])
+        cur.execute("CREATE TEMP TABLE census_metrics_stage (LIKE census_metrics) ON COMMIT DROP")
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows((geo, STATE_IDS.get(geo), *row) for geo, *row in rows)
+        buffer.seek(0)
+        cur.copy_expert("COPY census_metrics_stage (geo, state_id, year, variable, value) FROM STDIN WITH (FORMAT csv)", buffer)
+        # Unchanged values are left alone so a re-ingest writes only what moved
+        cur.execute("""
+            INSERT INTO census_metrics (geo, state_id, year, variable, value)
+            SELECT geo, state_id, year, variable, value FROM census_metrics_stage
+            ON CONFLICT (variable, geo, year) DO UPDATE SET value = EXCLUDED.value
+            WHERE census_metrics.value IS DISTINCT FROM EXCLUDED.value
+        """)
+        bump_data_version(cur, "census_metrics")
+        conn.commit()
+    except Error as error:
+        print("Error with inserting ACS data", error)
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+
+
+def create_county_tables(cur, years):
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS counties(
+            county_fips CHAR(5) PRIMARY KEY,
+            state VARCHAR(20) NOT NULL,
+            state_id SMALLINT REFERENCES states(id),
+            name VARCHAR(100) NOT NULL
+        )
+    """)
+    # Pages of a state's counties walk this index in FIPS order
+    index_state_key(cur, "counties")
+    # Keyed by state first so one state's counties, or one county, are a range of the key
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS county_metrics(
+            state VARCHAR(20) NOT NULL,
+            state_id SMALLINT REFERENCES states(id),
+            county_fips CHAR(5) NOT NULL,
+            year INT NOT NULL,
+            variable VARCHAR(20) NOT NULL,
+            value FLOAT NOT NULL,
+            PRIMARY KEY (state, county_fips, year, variable)
+        ) PARTITION BY LIST (year)
+    """)
+    create_year_partitions(cur, "county_metrics", years)
+    index_state_key(cur, "county_metrics")
+    # Computed at ingestion so state-level views never scan the county rows
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS county_metric_rollups(
+            state VARCHAR(20) NOT NULL,
+            state_id SMALLINT REFERENCES states(id),
+            year INT NOT NULL,
+            variable VARCHAR(20) NOT NULL,
+            counties INT NOT NULL,
+            min FLOAT NOT NULL,
+            max FLOAT NOT NULL,
+            mean FLOAT NOT NULL,
+            median FLOAT NOT NULL,
+            total FLOAT NOT NULL,
+            PRIMARY KEY (state, year, variable)
+        )
+    """)
+    index_state_key(cur, "county_metric_rollups")
+
+
+def insert_county_data(conn, rows):
+    years = sorted({row[3] for row in rows})
+    try:
+        cur = conn.cursor()
+        create_county_tables(cur, years)
+        cur.execute("""
+            CREATE TEMP TABLE county_stage(
+                state VARCHAR(20) NOT NULL,
+                state_id SMALLINT,
+                county_fips CHAR(5) NOT NULL,
+                county VARCHAR(100) NOT NULL,
+                year INT NOT NULL,
+                variable VARCHAR(20) NOT NULL,
+                value FLOAT NOT NULL
+            ) ON COMMIT DROP
+        """)
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows((state, STATE_IDS.get(state), *row) for state, *row in rows)
+        buffer.seek(0)
+        cur.copy_expert("COPY county_stage (state, state_id, county_fips, county, year, variable, value) FROM STDIN WITH (FORMAT csv)", buffer)
+        # The newest year's name wins for a county that was renamed
+        cur.execute("""
+            INSERT INTO counties (county_fips, state, state_id, name)
+            SELECT DISTINCT ON (county_fips) county_fips, state, state_id, county FROM county_stage
+            ORDER BY county_fips, year DESC
+            ON CONFLICT (county_fips) DO UPDATE SET state = EXCLUDED.state, state_id = EXCLUDED.state_id, name = EXCLUDED.name
+            WHERE (counties.state_id, counties.name) IS DISTINCT FROM (EXCLUDED.state_id, EXCLUDED.name)
+        """)
+        cur.execute("""
+            INSERT INTO county_metrics (state, state_id, county_fips, year, variable, value)
+            SELECT state, state_id, county_fips, year, variable, value FROM county_stage
+            ON CONFLICT (state, county_fips, year, variable) DO UPDATE SET value = EXCLUDED.value
+            WHERE county_metrics.value IS DISTINCT FROM EXCLUDED.value
+        """)
+        # Rebuilt from everything stored for the loaded years, not just this batch.
+        # total is only meaningful for counts such as population.
+        cur.execute("DELETE FROM county_metric_rollups WHERE year = ANY(%s)", (years,))
+        cur.execute("""
+            INSERT INTO county_metric_rollups (state, state_id, year, variable, counties, min, max, mean, median, total)
+            SELECT state, state_id, year, variable, COUNT(*), MIN(value), MAX(value), AVG(value),
+                   percentile_cont(0.5) WITHIN GROUP (ORDER BY value), SUM(value)
+            FROM county_metrics
+            WHERE year = ANY(%s)
+            GROUP BY state, state_id, year, variable
+        """, (years,))
+        bump_data_version(cur, "county_metrics")
+        conn.commit()
+    except Error as error:
+        print("Error with inserting county ACS data", error)
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
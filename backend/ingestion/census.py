@@ -0,0 +1,95 @@
+
+import json
+import os
+import sys
+from dotenv import load_dotenv
+import psycopg2
+from psycopg2 import Error
+import json
+import pandas as pd
+# Add parent directory to path to import db module
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from db import connection_scope
+import upstream
+from cache import bump_data_version
+from helper import STATE_IDS
+from ingestion.states import index_state_key
+
+load_dotenv()
+
+def get_state_census_response(year: int):
+
+    url = f"https://api.census.gov/data/{year}/acs/acs1/profile?get=NAME,DP03_0119PE,DP02_0067PE,DP03_0063E,DP03_0062E,DP03_0097PE,DP03_0098PE&for=state:*"
+    
+    response = upstream.get(url)
+    
+    return response
+    # cur = conn.cursor()
+def get_us_census_response(year: int):
+    url = f"https://api.census.gov/data/{year}/acs/acs1/profile?get=NAME,DP03_0119PE,DP02_0067PE,DP03_0063E,DP03_0062E,DP03_0097PE,DP03_0098PE&for=us:*"
+    response = upstream.get(url)
+    return response
+
+def organize_response_data(response):
+    result = {} 
+    idx = 0
+    for item in response.json():
+        if not idx == 0 and item[0] != 'Puerto Rico':
+            result[item[0]] = item[1:]
+        idx += 1
+    print(result)
+    return result
+
+def insert_state_census_data(conn, data, year: int):
+    try:
+        
+        cur = conn.cursor()
+        # Create table if not exists
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS StateCensus(
+                state VARCHAR(20) NOT NULL,
+                state_id SMALLINT REFERENCES states(id),
+                year INT NOT NULL,
+                poverty_rate FLOAT NOT NULL,
+                educational FLOAT NOT NULL,
+                income_mean FLOAT NOT NULL,
+                income_median FLOAT NOT NULL,
+                PRIMARY KEY (state, year)
+            )
+        """)
+        index_state_key(cur, "StateCensus")
+        #   Loop through state data and insert data into tables for each state
+        for key, value in data.items():
+            cur.execute("""
+                INSERT INTO StateCensus(state, state_id, poverty_rate, educational, income_mean, income_median, year) VALUES (%s, %s, %s, %s, %s, %s, %s)
+                ON CONFLICT (state, year) DO UPDATE SET poverty_rate = EXCLUDED.poverty_rate, educational = EXCLUDED.educational,
+                    income_mean = EXCLUDED.income_mean, income_median = EXCLUDED.income_median
+            """, (key, STATE_IDS.get(key), value[0], value[1], value[2], value[3], year))
+        bump_data_version(cur, "census")
+        conn.commit()
+    except Error as error:
+        print(error)
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+
+def write_us_census_json(rows, out_path: str = "us_census_data.json"):
+    try:
+        # Build a dictionary keyed by year (e.g., "2023")
+        by_year = {}
+        for row in rows:
+            # Expected row order from SELECT *: [state, year, poverty_rate, educational, income_mean, income_median]
+            year_key = str(int(row[1]))
+            by_year[year_key] = {
+                "poverty_rate": float(row[2]) if row[2] is not None else None,
+                "educational": float(row[3]) if row[3] is not None else None,
+                "income_mean": float(row[4]) if row[4] is not None else None,
+                "income_median": float(row[5]) if row[5] is not None else None,
+            }
+
+        with open(out_path, "w") as json_file:
+            json.dump(by_year, json_file, indent=4)
+        print(f"US census JSON successfully written to {out_path}")
+    except (IOError, ValueError, json.JSONDecodeError) as e:
+        print(f"Error preparing/writing US census JSON: {e}")
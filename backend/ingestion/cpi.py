@@ -0,0 +1,67 @@
+import json
+import os
+import sys
+from dotenv import load_dotenv
+from psycopg2 import Error
+from psycopg2.extras import execute_values
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from db import connection_scope
+import upstream
+from cache import bump_data_version
+from services.get_cpi_data import CPI_SERIES_ID
+
+load_dotenv()
+
+BLS_URL = "https://api.bls.gov/publicAPI/v2/timeseries/data/"
+
+
+# Get consumer price index data from BLS, split into the windows the API allows per request
+def fetch_cpi_series(start_year, end_year, series_id=CPI_SERIES_ID):
+    api_key = os.getenv("BLS_API_KEY")
+    window = 20 if api_key else 10
+    headers = {'Content-type': 'application/json'}
+    rows = []
+    for chunk_start in range(start_year, end_year + 1, window):
+        payload = {
+            "seriesid": [series_id],
+            "startyear": str(chunk_start),
+            "endyear": str(min(chunk_start + window - 1, end_year)),
+        }
+        if api_key:
+            payload["registrationkey"] = api_key
+        response = upstream.post(BLS_URL, data=json.dumps(payload), headers=headers)
+        response.raise_for_status()
+        for series in response.json()['Results']['series']:
+            for item in series['data']:
+                # M13 is the annual average, which is derived from the monthly values
+                if item['period'] == 'M13':
+                    continue
+                rows.append((series['seriesID'], int(item['year']), int(item['period'][1:]), float(item['value'])))
+    return rows
+
+
+def insert_cpi_data(conn, rows):
+    try:
+        cur = conn.cursor()
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS CPIData(
+                series_id VARCHAR(20) NOT NULL,
+                year INT NOT NULL,
+                month INT NOT NULL,
+                value FLOAT NOT NULL,
+                PRIMARY KEY (series_id, year, month)
+            )
+        """)
+        execute_values(cur, """
+            INSERT INTO CPIData (series_id, year, month, value) VALUES %s
+            ON CONFLICT (series_id, year, month) DO UPDATE SET value = EXCLUDED.value
+        """, rows)
+        bump_data_version(cur, "cpi")
+        conn.commit()
+    except Error as error:
+        print("Error with inserting CPI data", error)
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
@@ -0,0 +1,244 @@
+import csv
+import io
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+import psycopg2
+import requests
+from psycopg2 import Error
+from psycopg2.extras import execute_values
+import sys 
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from db import connection_scope
+import upstream
+from cache import bump_data_version
+from helper import STATE_IDS
+from ingestion.partitions import create_year_partitions
+from ingestion.states import index_state_key
+load_dotenv()
+
+CDE_URL = "https://api.usa.gov/crime/fbi/cde"
+# Agency requests in flight at once; there are about 18,000 agencies per offense
+AGENCY_WORKERS = int(os.getenv("CRIME_AGENCY_WORKERS", "8"))
+# api.data.gov allows 1,000 requests an hour per key unless a higher limit was
+# granted. Every CDE call in this process draws from one bucket, so the
+# agency fetch (about 54,000 calls) is paced to the key rather than to AGENCY_WORKERS.
+CDE_REQUESTS_PER_HOUR = float(os.getenv("CDE_REQUESTS_PER_HOUR", "1000"))
+CDE_TIMEOUT = float(os.getenv("CDE_TIMEOUT", "30"))
+CDE_LIMITER = upstream.RateLimiter(CDE_REQUESTS_PER_HOUR / 3600, burst=AGENCY_WORKERS)
+
+
+def cde_get(url):
+    return upstream.get_with_retry(url, limiter=CDE_LIMITER, timeout=CDE_TIMEOUT)
+
+def get_state_murder_counts(state, full_state, start_year, end_year):
+    # Get number of murders in florida
+
+    url = f"https://api.usa.gov/crime/fbi/cde/summarized/state/{state}/HOM?from=01-{start_year}&to=12-{end_year}&API_KEY={os.getenv('FBI_API_KEY')}"
+    response = cde_get(url)
+    data = response.json()
+    temp = data['offenses']['actuals'][full_state]
+    
+    year_total = {year: 0 for year in range(start_year, end_year + 1)}
+    for key, value in temp.items():
+        year_total[int(key[3:])] += value
+    return year_total
+
+def get_state_crime_rates(state, full_state, start_year, end_year, crime_type):
+    url = f"https://api.usa.gov/crime/fbi/cde/summarized/state/{state}/{crime_type}?from=01-{start_year}&to=12-{end_year}&API_KEY={os.getenv('FBI_API_KEY')}"
+    response = cde_get(url)
+    data = response.json()
+    temp = data['offenses']['rates'][full_state]
+    year_total = {year: 0.0 for year in range(start_year, end_year + 1)}
+    for key, value in temp.items():
+        year_total[int(key[3:])] += round(float(value)/12.0, 2)
+    return year_total
+
+def get_us_crime_rates(start_year, end_year, crime_type):
+    # Can get any state and pull national assault counts from api request
+    url = f"https://api.usa.gov/crime/fbi/cde/summarized/state/FL/{crime_type}?from=01-{start_year}&to=12-{end_year}&API_KEY={os.getenv('FBI_API_KEY')}"
+    response = cde_get(url)
+    data = response.json()
+    temp = data['offenses']['rates']['United States']
+    year_total = {year: 0.0 for year in range(start_year, end_year + 1)}
+    for key, value in temp.items():
+        year_total[int(key[3:])] += round(float(value)/12.0, 2)
+    return year_total
+
+
+def insert_crime_data(conn, state, crime_counts, crime_type):
+    try:
+        cur = conn.cursor()
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS CrimeData(
+                id SERIAL PRIMARY KEY,
+                state VARCHAR(20) NOT NULL,
+                state_id SMALLINT REFERENCES states(id),
+                crime_type VARCHAR(20) NOT NULL,
+                crime_counts FLOAT NOT NULL,
+                year INT NOT NULL,
+                UNIQUE(state, year, crime_type)  -- Prevent duplicate state and year
+            )
+        """)
+        index_state_key(cur, "CrimeData")
+        for key, value in crime_counts.items():
+            
+            cur.execute("""
+                INSERT INTO CrimeData (state, state_id, crime_type, crime_counts, year)
+                VALUES (%s, %s, %s, %s, %s)
+                ON CONFLICT (state, year, crime_type) DO UPDATE SET crime_counts = EXCLUDED.crime_counts
+            """, (state, STATE_IDS.get(state), crime_type, value, key))
+        bump_data_version(cur, "crime")
+        conn.commit()
+    except Error as error:
+        print(error)
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+
+
+def get_state_agencies(state):
+    # Agencies reporting in the state as (ori, name, agency_type, county); the
+    # API groups them by county, and an agency spanning several lists them all
+    url = f"{CDE_URL}/agency/byStateAbbr/{state}?API_KEY={os.getenv('FBI_API_KEY')}"
+    response = cde_get(url)
+    response.raise_for_status()
+    agencies = {}
+    for county, items in response.json().items():
+        for item in items:
+            agencies.setdefault(item["ori"], (item["ori"], item["agency_name"], item.get("agency_type_name"), item.get("counties") or county))
+    return list(agencies.values())
+
+
+def get_agency_crime_counts(ori, agency_name, start_year, end_year, crime_type):
+    url = f"{CDE_URL}/summarized/agency/{ori}/{crime_type}?from=01-{start_year}&to=12-{end_year}&API_KEY={os.getenv('FBI_API_KEY')}"
+    response = cde_get(url)
+    response.raise_for_status()
+    actuals = response.json()["offenses"]["actuals"]
+    # Next to the agency's own series come its clearances and the state and
+    # national totals; an agency that did not report has no series at all
+    months = next((values for key, values in actuals.items() if key.startswith(agency_name) and "Clearances" not in key), None)
+    if not months:
+        return {}
+    year_total = {}
+    for key, value in months.items():
+        if value is not None:
+            year_total[int(key[3:])] = year_total.get(int(key[3:]), 0) + value
+    return year_total
+
+
+def fetch_agency_crime(states, crime_types, start_year, end_year, workers=AGENCY_WORKERS):
+    # states maps postal code to name and crime_types stored label to CDE
+    # offense code, as in jobs.py. Returns the agencies as (state, ori, name,
+    # agency_type, county) and their counts as (state, ori, year, crime_type, count).
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        by_state = dict(zip(states, executor.map(get_state_agencies, states)))
+        agencies = [(states[state], *agency) for state, found in by_state.items() for agency in found]
+        calls = [(agency, label, code) for agency in agencies for label, code in crime_types.items()]
+
+        def fetch(call):
+            (full_state, ori, name, _, _), label, code = call
+            try:
+                counts = get_agency_crime_counts(ori, name, start_year, end_year, code)
+            except requests.RequestException as e:
+                # One agency the API cannot answer for, even after retrying,
+                # should not sink the other requests
+                print(f"No {label} data for {ori}", e)
+                return []
+            return [(full_state, ori, year, label, count) for year, count in counts.items()]
+
+        rows = [row for counts in executor.map(fetch, calls) for row in counts]
+    return agencies, rows
+
+
+def create_agency_tables(cur, years):
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS agencies(
+            ori VARCHAR(9) PRIMARY KEY,
+            state VARCHAR(20) NOT NULL,
+            state_id SMALLINT REFERENCES states(id),
+            name VARCHAR(150) NOT NULL,
+            agency_type VARCHAR(50),
+            county VARCHAR(255)
+        )
+    """)
+    cur.execute("CREATE UNIQUE INDEX IF NOT EXISTS agencies_state_idx ON agencies (state, ori)")
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS agency_crime(
+            state VARCHAR(20) NOT NULL,
+            state_id SMALLINT REFERENCES states(id),
+            ori VARCHAR(9) NOT NULL,
+            year INT NOT NULL,
+            crime_type VARCHAR(20) NOT NULL,
+            crime_counts FLOAT NOT NULL,
+            PRIMARY KEY (state, crime_type, year, ori)
+        ) PARTITION BY LIST (year)
+    """)
+    create_year_partitions(cur, "agency_crime", years)
+    index_state_key(cur, "agencies")
+    index_state_key(cur, "agency_crime")
+    # Computed at ingestion so state totals never scan the agency rows
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS agency_crime_rollups(
+            state VARCHAR(20) NOT NULL,
+            state_id SMALLINT REFERENCES states(id),
+            year INT NOT NULL,
+            crime_type VARCHAR(20) NOT NULL,
+            agencies INT NOT NULL,
+            crime_counts FLOAT NOT NULL,
+            PRIMARY KEY (state, crime_type, year)
+        )
+    """)
+    index_state_key(cur, "agency_crime_rollups")
+
+
+def insert_agency_crime_data(conn, agencies, rows):
+    years = sorted({row[2] for row in rows})
+    try:
+        cur = conn.cursor()
+        create_agency_tables(cur, years)
+        cur.execute("""
+            CREATE TEMP TABLE agency_stage(
+                state VARCHAR(20) NOT NULL,
+                state_id SMALLINT,
+                ori VARCHAR(9) NOT NULL,
+                year INT NOT NULL,
+                crime_type VARCHAR(20) NOT NULL,
+                crime_counts FLOAT NOT NULL
+            ) ON COMMIT DROP
+        """)
+        execute_values(cur, """
+            INSERT INTO agencies (state, state_id, ori, name, agency_type, county) VALUES %s
+            ON CONFLICT (ori) DO UPDATE SET state = EXCLUDED.state, state_id = EXCLUDED.state_id, name = EXCLUDED.name,
+                agency_type = EXCLUDED.agency_type, county = EXCLUDED.county
+        """, [(state, STATE_IDS.get(state), *agency) for state, *agency in agencies])
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows((state, STATE_IDS.get(state), *row) for state, *row in rows)
+        buffer.seek(0)
+        cur.copy_expert("COPY agency_stage (state, state_id, ori, year, crime_type, crime_counts) FROM STDIN WITH (FORMAT csv)", buffer)
+        cur.execute("""
+            INSERT INTO agency_crime (state, state_id, ori, year, crime_type, crime_counts)
+            SELECT state, state_id, ori, year, crime_type, crime_counts FROM agency_stage
+            ON CONFLICT (state, crime_type, year, ori) DO UPDATE SET crime_counts = EXCLUDED.crime_counts
+            WHERE agency_crime.crime_counts IS DISTINCT FROM EXCLUDED.crime_counts
+        """)
+        # Rebuilt from everything stored for the loaded years, not just this batch
+        cur.execute("DELETE FROM agency_crime_rollups WHERE year = ANY(%s)", (years,))
+        cur.execute("""
+            INSERT INTO agency_crime_rollups (state, state_id, year, crime_type, agencies, crime_counts)
+            SELECT state, state_id, year, crime_type, COUNT(*), SUM(crime_counts)
+            FROM agency_crime
+            WHERE year = ANY(%s)
+            GROUP BY state, state_id, year, crime_type
+        """, (years,))
+        bump_data_version(cur, "agency_crime")
+        conn.commit()
+    except Error as error:
+        print("Error with inserting agency crime data", error)
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
@@ -0,0 +1,115 @@
+import os
+import dotenv
+import sys 
+
+dotenv.load_dotenv()
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from db import connection_scope
+import upstream
+from cache import bump_data_version
+from helper import STATE_IDS
+from ingestion.states import index_state_key
+
+
+def get_health_data(state):
+    hello = "hello"
+    url = "https://api.americashealthrankings.org/graphql"
+    query = f"""
+    query MeasuresSearch {{
+        measures_A(
+            where: {{ 
+                name: {{ contains: "Diabetes" }}
+                source: {{ name: {{ contains: "Behavioral Risk Factor Surveillance System" }} }}
+            }}
+        ) {{
+            measureId
+            name
+            source {{ name }}
+            data(where: {{ 
+                state: {{ in: ["{state}"] }}
+                dateLabel: {{ in: ["2020", "2021", "2022", "2023", "2024"] }}
+            }}) {{
+                dateLabel
+                rank
+                state
+                value
+            }}
+        }}
+    }}
+    """
+    headers = {
+        "Content-Type": "application/json",
+        "X-Api-Key": f"{os.getenv('HEALTH_DATA_API_KEY')}"
+    }
+
+    response = upstream.post(url, json={"query": query}, headers=headers)
+    return response.json()["data"]["measures_A"][1]
+
+def get_health_data(state, name):
+    url = "https://api.americashealthrankings.org/graphql"
+    query = f"""
+    query MeasuresSearch {{
+        measures_A(
+            where: {{ 
+                name: {{ contains: "{name}" }}
+            }}
+        ) {{
+            measureId
+            name
+            source {{ name }}
+            data(where: {{ 
+                state: {{ in: ["{state}"] }}
+                dateLabel: {{ in: ["2020", "2021", "2022", "2023", "2024"] }}
+            }}) {{
+                dateLabel
+                rank
+                state
+                value
+            }}
+        }}
+    }}
+    """
+    headers = {
+        "Content-Type": "application/json",
+        "X-Api-Key": f"{os.getenv('HEALTH_DATA_API_KEY')}"
+    }
+    response = upstream.post(url, json={"query": query}, headers=headers)
+    return response.json()['data']['measures_A']
+
+def find_health_data(data, name):
+    for item in data:
+        if item["name"] == name:
+            return item
+    return None
+
+def find_measureid_data(data, measureid):
+    for item in data:
+        if item["measureId"] == measureid:
+            return item
+    return None
+
+def insert_health_data(conn, data, name):
+    cur = conn.cursor()
+        # Create table if not exists
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS HealthData(
+            state VARCHAR(20) NOT NULL,
+            state_id SMALLINT REFERENCES states(id),
+            year INT NOT NULL,
+            rank INT NOT NULL,
+            name VARCHAR(20) NOT NULL,
+            value FLOAT NOT NULL,
+            PRIMARY KEY (state, year, name)
+        )
+    """)
+    index_state_key(cur, "HealthData")
+    for item in data:
+        if item["value"] is not None:
+            cur.execute("""
+                INSERT INTO HealthData (state, state_id, year, rank, name, value)
+                VALUES (%s, %s, %s, %s, %s, %s)
+                ON CONFLICT (state, year, name) DO UPDATE SET rank = EXCLUDED.rank, value = EXCLUDED.value
+            """, (item["state"], STATE_IDS.get(item["state"]), int(item["dateLabel"]), item["rank"], name, item["value"]))
+    bump_data_version(cur, "health")
+    conn.commit()
+    cur.close()
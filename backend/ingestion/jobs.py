@@ -0,0 +1,199 @@
+import os
+import sys
+from datetime import date
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from db import connection_scope
+from helper import STATES
+from ingestion import acs, census, cpi, crime, federal_spending, health, legislation, legislators, states
+from services.get_state_census import get_us_census_data
+
+APP_UTILS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "app", "utils")
+
+CRIME_START_YEAR = 2021
+CRIME_END_YEAR = 2024
+# Stored crime_type label -> FBI CDE offense code; homicide is stored as counts, the rest as rates
+CRIME_TYPES = {
+    "Homicide": "HOM",
+    "Assault": "ASS",
+    "Burglary": "BUR",
+}
+CENSUS_YEARS = range(2021, 2024)
+# ACS variables kept in census_metrics. Any profile (DP), subject (S) or
+# detailed (B, C) table variable can be listed; no schema change is needed.
+ACS_VARIABLES = [
+    "DP03_0119PE",  # Families below the poverty level, %
+    "DP02_0067PE",  # High school graduate or higher, %
+    "DP02_0068PE",  # Bachelor's degree or higher, %
+    "DP03_0063E",   # Mean household income
+    "DP03_0062E",   # Median household income
+    "DP03_0097PE",  # With private health insurance, %
+    "DP03_0098PE",  # With public coverage, %
+    "DP03_0009PE",  # Unemployment rate, %
+    "DP04_0089E",   # Median value of owner-occupied units
+    "DP04_0134E",   # Median gross rent
+    "DP05_0001E",   # Total population
+    "DP05_0018E",   # Median age
+]
+CPI_START_YEAR = 2015
+# Stored HealthData name -> America's Health Rankings measure name
+HEALTH_MEASURES = {
+    "Diabetes": "Diabetes",
+    "AIDS": "HIV",
+    "Heart Diseases": "Cardiovascular Diseases",
+    "Cancer": "Cancer",
+    "Suicide": "Suicide",
+    "Depression": "Depression",
+    "Drug Deaths": "Drug Deaths",
+    "Smoking": "Smoking",
+}
+
+
+class Job:
+    def __init__(self, name, run, deps=(), description=""):
+        self.name = name
+        self.run = run
+        self.deps = tuple(deps)
+        self.description = description
+
+
+def run_crime(conn):
+    rows = 0
+    for state, full_state in STATES.items():
+        for crime_type, code in CRIME_TYPES.items():
+            if crime_type == "Homicide":
+                counts = crime.get_state_murder_counts(state, full_state, CRIME_START_YEAR, CRIME_END_YEAR)
+            else:
+                counts = crime.get_state_crime_rates(state, full_state, CRIME_START_YEAR, CRIME_END_YEAR, code)
+            crime.insert_crime_data(conn, full_state, counts, crime_type)
+            rows += len(counts)
+    for crime_type, code in CRIME_TYPES.items():
+        if crime_type == "Homicide":
+            continue
+        counts = crime.get_us_crime_rates(CRIME_START_YEAR, CRIME_END_YEAR, code)
+        crime.insert_crime_data(conn, "United States", counts, crime_type)
+        rows += len(counts)
+    return rows
+
+
+def run_agency_crime(conn):
+    agencies, rows = crime.fetch_agency_crime(STATES, CRIME_TYPES, CRIME_START_YEAR, CRIME_END_YEAR)
+    crime.insert_agency_crime_data(conn, agencies, rows)
+    return len(rows)
+
+
+def run_census(conn):
+    rows = 0
+    for year in CENSUS_YEARS:
+        data = census.organize_response_data(census.get_state_census_response(year))
+        data.update(census.organize_response_data(census.get_us_census_response(year)))
+        census.insert_state_census_data(conn, data, year)
+        rows += len(data)
+    return rows
+
+
+def run_census_metrics(conn):
+    rows = acs.fetch_acs(ACS_VARIABLES, CENSUS_YEARS)
+    acs.insert_acs_data(conn, rows)
+    return len(rows)
+
+
+def run_county_census(conn):
+    rows = acs.fetch_acs_counties(ACS_VARIABLES, CENSUS_YEARS)
+    acs.insert_county_data(conn, rows)
+    return len(rows)
+
+
+def run_us_census_json(conn):
+    rows = get_us_census_data(conn)
+    census.write_us_census_json(rows, os.path.join(APP_UTILS_DIR, "us_census_data.json"))
+    return len(rows)
+
+
+def run_cpi(conn):
+    rows = cpi.fetch_cpi_series(CPI_START_YEAR, date.today().year)
+    cpi.insert_cpi_data(conn, rows)
+    return len(rows)
+
+
+def run_health(conn):
+    rows = 0
+    for state in STATES:
+        for name, measure in HEALTH_MEASURES.items():
+            data = health.find_health_data(health.get_health_data(state, measure), measure)
+            if data is None:
+                print(f"No {measure} measure found for {state}")
+                continue
+            health.insert_health_data(conn, data["data"], name)
+            rows += sum(1 for item in data["data"] if item["value"] is not None)
+    return rows
+
+
+def run_federal_spending(conn):
+    agencies = federal_spending.get_federal_spending_agencies()
+    budget_functions = federal_spending.get_federal_budget_functions()
+    if agencies is None or budget_functions is None:
+        raise RuntimeError("Failed to fetch federal spending from USAspending")
+    federal_spending.insert_agency_data(conn, agencies)
+    federal_spending.insert_federal_budget_functions(conn, budget_functions)
+    return len(agencies) + len(budget_functions)
+
+
+def run_federal_economic(conn):
+    data = federal_spending.fetch_federal_economic_data()
+    federal_spending.insert_federal_economic_data(conn, data)
+    return len(data)
+
+
+def run_federal_debt(conn):
+    debt = federal_spending.fetch_federal_debt()
+    statements = federal_spending.fetch_treasury_statements()
+    federal_spending.insert_federal_debt(conn, debt)
+    federal_spending.insert_treasury_statements(conn, statements)
+    return len(debt) + len(statements)
+
+
+def run_legislators(conn):
+    report = legislators.sync_roster(conn)
+    return sum(len(changes) for diff in report.values() for changes in diff.values())
+
+
+def run_nominate(conn):
+    report = legislators.attach_nominate_scores(conn)
+    return sum(report["matched"].values())
+
+
+def run_legislation(conn):
+    return legislation.sync_bills(conn)
+
+
+def run_states(conn):
+    return len(states.backfill_state_keys(conn))
+
+
+def with_connection(run):
+    def wrapper():
+        with connection_scope() as conn:
+            return run(conn)
+    return wrapper
+
+
+# Every job writing per-state rows depends on "states": it creates the table
+# their state_id columns reference, and migrates tables from before them
+JOBS = {job.name: job for job in [
+    Job("states", with_connection(run_states), description="State dimension, and state_id keys added to tables that predate it"),
+    Job("crime", with_connection(run_crime), deps=["states"], description="FBI CDE state and national crime rates"),
+    Job("agency_crime", with_connection(run_agency_crime), deps=["states"], description="FBI CDE offense counts per reporting agency"),
+    Job("census", with_connection(run_census), deps=["states"], description="ACS state and national profile variables"),
+    Job("census_metrics", with_connection(run_census_metrics), deps=["states"], description="ACS variables by state and year in long format"),
+    Job("county_census", with_connection(run_county_census), deps=["states"], description="ACS 5-year variables per county"),
+    Job("us_census_json", with_connection(run_us_census_json), deps=["census"], description="National census averages bundled with the frontend"),
+    Job("cpi", with_connection(run_cpi), description="BLS monthly CPI-U series"),
+    Job("health", with_connection(run_health), deps=["states"], description="America's Health Rankings measures per state"),
+    Job("federal_spending", with_connection(run_federal_spending), description="USAspending agency outlays and budget functions"),
+    Job("federal_economic", with_connection(run_federal_economic), description="Economic projections CSV"),
+    Job("federal_debt", with_connection(run_federal_debt), description="Treasury debt outstanding and monthly statements"),
+    Job("legislators", with_connection(run_legislators), deps=["states"], description="Senators and representatives roster"),
+    Job("nominate", with_connection(run_nominate), deps=["legislators"], description="DW-NOMINATE scores matched onto the roster"),
+    Job("legislation", with_connection(run_legislation), description="Congress.gov bills, synced incrementally by update date"),
+]}
@@ -0,0 +1,167 @@
+import os
+import dotenv
+import sys
+from datetime import datetime, timedelta, timezone
+from psycopg2 import Error
+from psycopg2.extras import execute_values
+
+dotenv.load_dotenv()
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from db import connection_scope
+from cache import bump_data_version
+import upstream
+
+PAGE_SIZE = 250
+# Rows re-read on each step through bills that share one updateDate, so that
+# up to this many of them being updated mid-sync does not skip the rest
+TIE_OVERLAP = 25
+# Re-read a little before the watermark so bills updated during the last sync are not missed
+SYNC_OVERLAP = timedelta(hours=1)
+# Set to re-read every bill instead of resuming from the watermark
+FULL_SYNC = os.getenv("LEGISLATION_FULL_SYNC", "0") != "0"
+
+# Ordered from most to least advanced; the first matching phrase wins
+ACTION_STATUSES = [
+    ("became_law", ("became public law", "signed by president")),
+    ("vetoed", ("vetoed",)),
+    ("to_president", ("presented to president",)),
+    ("passed_both", ("resolving differences", "cleared for white house")),
+    ("passed_senate", ("passed senate", "passed/agreed to in senate")),
+    ("passed_house", ("passed house", "on passage passed", "passed/agreed to in house")),
+    ("reported", ("reported by", "placed on the union calendar", "placed on senate legislative calendar")),
+    ("in_committee", ("referred to",)),
+    ("introduced", ("introduced",)),
+]
+
+
+def classify_action(text):
+    lowered = (text or "").lower()
+    for status, phrases in ACTION_STATUSES:
+        if any(phrase in lowered for phrase in phrases):
+            return status
+    return "other"
+
+
+def create_bills_table(cur):
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS bills(
+            congress INT NOT NULL,
+            bill_type VARCHAR(10) NOT NULL,
+            number VARCHAR(10) NOT NULL,
+            title TEXT NOT NULL,
+            origin_chamber VARCHAR(10),
+            latest_action_date DATE,
+            latest_action_text TEXT,
+            action_status VARCHAR(20) NOT NULL,
+            update_date TIMESTAMPTZ NOT NULL,
+            search_vector tsvector GENERATED ALWAYS AS (
+                setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+                setweight(to_tsvector('english', coalesce(latest_action_text, '')), 'B')
+            ) STORED,
+            PRIMARY KEY (congress, bill_type, number)
+        )
+    """)
+    cur.execute("CREATE INDEX IF NOT EXISTS bills_search_idx ON bills USING GIN (search_vector)")
+    cur.execute("CREATE INDEX IF NOT EXISTS bills_action_date_idx ON bills (latest_action_date DESC, congress DESC, bill_type DESC, number DESC)")
+    cur.execute("CREATE INDEX IF NOT EXISTS bills_update_date_idx ON bills (update_date)")
+
+
+def get_sync_watermark(conn):
+    cur = conn.cursor()
+    try:
+        cur.execute("SELECT MAX(update_date) FROM bills")
+        return cur.fetchone()[0]
+    except Error:
+        conn.rollback()
+        return None
+    finally:
+        cur.close()
+
+
+def parse_update_date(value):
+    # "2024-05-01T12:34:56Z", or a bare date for some older bills
+    parsed = datetime.fromisoformat(value)
+    return parsed if parsed.tzinfo is not None else parsed.replace(tzinfo=timezone.utc)
+
+
+def fetch_bills_since(since=None):
+    # Pages by the last updateDate seen rather than by offset alone: a bill
+    # updated while the sync runs moves to the end of the updateDate order,
+    # which would shift every later offset and skip whatever slid back a page.
+    # Moved bills are simply met again further on. The offset only advances
+    # through a page of bills that all share one updateDate, and overlaps by
+    # TIE_OVERLAP rows there; re-read bills are no-op upserts.
+    url = f"{os.getenv('CONGRESS_API_URL')}{os.getenv('CONGRESS_API_KEY')}"
+    cursor = None if since is None else since - SYNC_OVERLAP
+    offset = 0
+    while True:
+        # requests encodes the space itself; a literal "+" would be sent as %2B
+        parameters = {"limit": PAGE_SIZE, "offset": offset, "sort": "updateDate asc", "format": "json"}
+        if cursor is not None:
+            # update_date comes back in the session time zone; the API wants UTC
+            parameters["fromDateTime"] = cursor.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+        response = upstream.get(url, params=parameters)
+        response.raise_for_status()
+        bills = response.json().get("bills", [])
+        yield bills
+        if len(bills) < PAGE_SIZE:
+            return
+        last = parse_update_date(bills[-1]["updateDate"])
+        if cursor is not None and last <= cursor:
+            offset += PAGE_SIZE - TIE_OVERLAP
+        else:
+            # fromDateTime is inclusive, so bills at exactly this time are read again
+            cursor, offset = last, 0
+
+
+def upsert_bills(conn, bills):
+    rows = []
+    for item in bills:
+        latest = item.get("latestAction") or {}
+        rows.append((
+            int(item["congress"]),
+            item["type"],
+            str(item["number"]),
+            item["title"],
+            item.get("originChamber"),
+            latest.get("actionDate"),
+            latest.get("text"),
+            classify_action(latest.get("text")),
+            # The field fromDateTime filters on, so the watermark matches it
+            item["updateDate"],
+        ))
+    if not rows:
+        return 0
+    try:
+        cur = conn.cursor()
+        create_bills_table(cur)
+        execute_values(cur, """
+            INSERT INTO bills (congress, bill_type, number, title, origin_chamber, latest_action_date, latest_action_text, action_status, update_date)
+            VALUES %s
+            ON CONFLICT (congress, bill_type, number) DO UPDATE SET
+                title = EXCLUDED.title,
+                origin_chamber = EXCLUDED.origin_chamber,
+                latest_action_date = EXCLUDED.latest_action_date,
+                latest_action_text = EXCLUDED.latest_action_text,
+                action_status = EXCLUDED.action_status,
+                update_date = EXCLUDED.update_date
+            WHERE bills.update_date IS DISTINCT FROM EXCLUDED.update_date
+        """, rows, page_size=PAGE_SIZE)
+        bump_data_version(cur, "bills")
+        conn.commit()
+    except Error as error:
+        print("Error with upserting bills", error)
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+    return len(rows)
+
+
+def sync_bills(conn, full=FULL_SYNC):
+    # Incremental by default: only bills updated since the newest one we hold
+    since = None if full else get_sync_watermark(conn)
+    total = 0
+    for page in fetch_bills_since(since):
+        total += upsert_bills(conn, page)
+    return total
@@ -0,0 +1,297 @@
+import psycopg2
+from psycopg2 import Error
+from psycopg2.extras import execute_values
+import pandas as pd
+import hashlib
+import io
+import os
+import re
+import unicodedata
+import dotenv
+import sys
+dotenv.load_dotenv()
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from db import connection_scope
+from cache import bump_data_version
+from ingestion.states import index_state_key
+
+LEGISLATOR_DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "legislator_data")
+
+# Columns a roster refresh keeps in sync; a row is rewritten only when their hash changes
+ROSTER_COLUMNS = ["name", "state", "district", "party", "gender", "url", "address", "phone"]
+ROSTER_TABLES = {"sen": "Senators", "rep": "Representatives"}
+
+
+def create_roster_tables(cur):
+    # Readers select these columns by name (see queries.py), so the sync
+    # columns can be appended without disturbing them
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS Senators(
+            id SERIAL PRIMARY KEY,
+            name VARCHAR(100) NOT NULL,
+            state VARCHAR(2),
+            state_id SMALLINT REFERENCES states(id),
+            party VARCHAR(20),
+            gender VARCHAR(1),
+            url VARCHAR(255),
+            address VARCHAR(255),
+            phone VARCHAR(15),
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE(name, state)  -- Prevent duplicate senators
+        )
+    """)
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS Representatives(
+            id SERIAL PRIMARY KEY,
+            name VARCHAR(100) NOT NULL,
+            state VARCHAR(2),
+            state_id SMALLINT REFERENCES states(id),
+            district INT,
+            party VARCHAR(20),
+            gender VARCHAR(1),
+            url VARCHAR(255),
+            address VARCHAR(255),
+            phone VARCHAR(15),
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE(name, state, district)  -- Prevent duplicate representatives
+        )
+    """)
+    for table in ROSTER_TABLES.values():
+        cur.execute(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS nominate_score FLOAT")
+        cur.execute(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS bioguide_id VARCHAR(10)")
+        cur.execute(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS content_hash CHAR(32)")
+        cur.execute(f"CREATE UNIQUE INDEX IF NOT EXISTS {table.lower()}_bioguide_idx ON {table} (bioguide_id)")
+        index_state_key(cur, table)
+
+
+def read_roster(path):
+    df = pd.read_csv(path, dtype=str, keep_default_na=False)
+    df = df[df["type"].isin(ROSTER_TABLES)].rename(columns={"full_name": "name"})
+    df = df[["bioguide_id", "type"] + ROSTER_COLUMNS].copy()
+    df["name"] = df["name"].replace("", "Unknown")
+    df["party"] = df["party"].replace("", "Unknown")
+    df["gender"] = df["gender"].replace("", "U")
+    # Senators have no district; the CSV writes representatives' districts as floats
+    df["district"] = df["district"].where(df["type"] == "rep", "").str.replace(r"\.0$", "", regex=True)
+    df["content_hash"] = [
+        hashlib.md5("\x1f".join(values).encode()).hexdigest()
+        for values in df[ROSTER_COLUMNS].itertuples(index=False)
+    ]
+    return df
+
+
+def stage_roster(cur, roster):
+    cur.execute("""
+        CREATE TEMP TABLE roster_stage(
+            bioguide_id VARCHAR(10) PRIMARY KEY,
+            type VARCHAR(3) NOT NULL,
+            name VARCHAR(100) NOT NULL,
+            state VARCHAR(2),
+            district INT,
+            party VARCHAR(20),
+            gender VARCHAR(1),
+            url VARCHAR(255),
+            address VARCHAR(255),
+            phone VARCHAR(15),
+            content_hash CHAR(32) NOT NULL
+        ) ON COMMIT DROP
+    """)
+    buffer = io.StringIO()
+    roster.to_csv(buffer, index=False, header=False)
+    buffer.seek(0)
+    cur.copy_expert(
+        f"COPY roster_stage (bioguide_id, type, {', '.join(ROSTER_COLUMNS)}, content_hash) FROM STDIN WITH (FORMAT csv)",
+        buffer,
+    )
+
+
+def apply_roster_diff(cur, member_type, table):
+    columns = [column for column in ROSTER_COLUMNS if table == "Representatives" or column != "district"]
+    natural_key = " AND ".join(f"t.{column} = s.{column}" for column in ("name", "state", "district") if column in columns)
+    # Rows written before bioguide_id was tracked are adopted by their natural key,
+    # keeping their id and nominate_score
+    cur.execute(f"""
+        UPDATE {table} t SET bioguide_id = s.bioguide_id
+        FROM roster_stage s
+        WHERE t.bioguide_id IS NULL AND s.type = %s AND {natural_key}
+          AND NOT EXISTS (SELECT 1 FROM {table} o WHERE o.bioguide_id = s.bioguide_id)
+    """, (member_type,))
+    cur.execute(f"""
+        DELETE FROM {table} t
+        WHERE t.bioguide_id IS NULL
+           OR NOT EXISTS (SELECT 1 FROM roster_stage s WHERE s.type = %s AND s.bioguide_id = t.bioguide_id)
+        RETURNING name
+    """, (member_type,))
+    deleted = [row[0] for row in cur.fetchall()]
+    cur.execute(f"""
+        UPDATE {table} t SET {", ".join(f"{column} = s.{column}" for column in columns)}, content_hash = s.content_hash,
+            state_id = (SELECT id FROM states WHERE code = s.state)
+        FROM roster_stage s
+        WHERE s.type = %s AND s.bioguide_id = t.bioguide_id AND t.content_hash IS DISTINCT FROM s.content_hash
+        RETURNING t.name
+    """, (member_type,))
+    updated = [row[0] for row in cur.fetchall()]
+    cur.execute(f"""
+        INSERT INTO {table} ({", ".join(columns)}, bioguide_id, content_hash, state_id)
+        SELECT {", ".join(f"s.{column}" for column in columns)}, s.bioguide_id, s.content_hash,
+            (SELECT id FROM states WHERE code = s.state)
+        FROM roster_stage s
+        WHERE s.type = %s AND NOT EXISTS (SELECT 1 FROM {table} t WHERE t.bioguide_id = s.bioguide_id)
+        RETURNING name
+    """, (member_type,))
+    inserted = [row[0] for row in cur.fetchall()]
+    return {"inserted": inserted, "updated": updated, "deleted": deleted}
+
+
+def sync_roster(conn, path=None):
+    # Stages the whole CSV and applies only the differences, in one transaction
+    roster = read_roster(path or os.path.join(LEGISLATOR_DATA_DIR, "legislators-current.csv"))
+    try:
+        cur = conn.cursor()
+        create_roster_tables(cur)
+        stage_roster(cur, roster)
+        report = {table: apply_roster_diff(cur, member_type, table) for member_type, table in ROSTER_TABLES.items()}
+        if any(changes for diff in report.values() for changes in diff.values()):
+            bump_data_version(cur, "legislators")
+        conn.commit()
+    except Error as error:
+        print("Error with syncing legislator roster", error)
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+    for table, diff in report.items():
+        print(f"{table}: {len(diff['inserted'])} inserted, {len(diff['updated'])} updated, {len(diff['deleted'])} deleted")
+    return report
+
+
+NAME_SUFFIXES = {"jr", "sr", "ii", "iii", "iv", "v"}
+
+
+def name_tokens(name):
+    # "Henry C. \"Hank\" Johnson, Jr." -> ["henry", "c", "johnson"]
+    name = re.sub(r'"[^"]*"', " ", name)
+    folded = unicodedata.normalize("NFKD", name).encode("ascii", "ignore").decode().lower()
+    return [token for token in re.split(r"[^a-z]+", folded) if token and token not in NAME_SUFFIXES]
+
+
+def roster_surname_keys(name):
+    # Compound surnames ("Wasserman Schultz", "De La Cruz") are not marked in the
+    # roster, so every trailing run of up to three tokens is a candidate key
+    tokens = name_tokens(name)
+    return ["".join(tokens[-size:]) for size in range(1, min(3, len(tokens) - 1) + 1)] or ["".join(tokens)]
+
+
+def first_name_score(roster_first, given_names):
+    if not roster_first or not given_names:
+        return 0
+    if roster_first in given_names:
+        return 2
+    if any(given.startswith(roster_first) or roster_first.startswith(given) for given in given_names):
+        return 1
+    return 0
+
+
+def load_nominate_members(path):
+    members = pd.read_csv(path)
+    members = members[members["chamber"].isin(["House", "Senate"]) & members["nominate_dim1"].notna()].copy()
+    surname, _, given = members["bioname"].str.partition(",").values.T
+    members["surname_key"] = ["".join(name_tokens(value)) for value in surname]
+    members["given_names"] = [name_tokens(value) for value in given]
+    # Voteview numbers at-large seats 1 and the roster numbers them 0; senators have no district
+    house = members["chamber"] == "House"
+    seats = members[house].groupby("state_abbrev")["district_code"].transform("max")
+    members["district_key"] = 0
+    members.loc[house, "district_key"] = members.loc[house, "district_code"].where(seats > 1, 0).astype(int)
+    members["sitting"] = members["died"].isna()
+    return members
+
+
+def load_roster(conn):
+    cur = conn.cursor()
+    try:
+        cur.execute("""
+            SELECT id, name, state, 0 AS district, 'Senate' AS chamber FROM Senators
+            UNION ALL
+            SELECT id, name, state, COALESCE(district, 0), 'House' FROM Representatives
+        """)
+        roster = pd.DataFrame(cur.fetchall(), columns=["id", "name", "state", "district", "chamber"])
+    finally:
+        cur.close()
+    roster["district_key"] = roster["district"].astype(int)
+    roster["roster_first"] = [(name_tokens(name) or [""])[0] for name in roster["name"]]
+    roster["surname_key"] = [roster_surname_keys(name) for name in roster["name"]]
+    return roster
+
+
+def match_nominate_scores(roster, members):
+    # Hash join on (surname, state, district) over every candidate surname key,
+    # then score each pair so the best candidate per roster row wins
+    candidates = roster.explode("surname_key").merge(
+        members,
+        left_on=["chamber", "surname_key", "state", "district_key"],
+        right_on=["chamber", "surname_key", "state_abbrev", "district_key"],
+        suffixes=("", "_member"),
+    )
+    candidates["score"] = (
+        4
+        + candidates["surname_key"].str.len() / 100
+        + [first_name_score(first, given) for first, given in zip(candidates["roster_first"], candidates["given_names"])]
+        + candidates["sitting"].astype(int)
+    )
+    candidates = candidates.sort_values(["chamber", "id", "score"], ascending=[True, True, False])
+    ranked = candidates.groupby(["chamber", "id"])["score"]
+    candidates["runner_up"] = ranked.shift(-1).where(ranked.cumcount() == 0)
+    best = candidates[ranked.cumcount() == 0]
+    ambiguous = best[best["score"] == best["runner_up"]]
+    matched = best[best["score"] != best["runner_up"]].drop_duplicates("icpsr", keep=False)
+
+    matched_keys = set(zip(matched["chamber"], matched["id"]))
+    unmatched_roster = roster[[(chamber, id_) not in matched_keys for chamber, id_ in zip(roster["chamber"], roster["id"])]]
+    unmatched_members = members[~members["icpsr"].isin(matched["icpsr"]) & members["sitting"]]
+    report = {
+        "matched": {chamber: int((matched["chamber"] == chamber).sum()) for chamber in ("Senate", "House")},
+        "ambiguous": ambiguous[["chamber", "name", "state", "district"]].to_dict("records"),
+        "unmatched_roster": unmatched_roster[["chamber", "name", "state", "district"]].to_dict("records"),
+        "unmatched_members": unmatched_members[["chamber", "bioname", "state_abbrev", "district_code"]].to_dict("records"),
+    }
+    return matched[["chamber", "id", "nominate_dim1"]], report
+
+
+def update_nominate_scores(conn, matched):
+    rows = [(chamber, int(id_), float(score)) for chamber, id_, score in matched.itertuples(index=False)]
+    try:
+        cur = conn.cursor()
+        for table in ("Senators", "Representatives"):
+            cur.execute(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS nominate_score FLOAT")
+        if rows:
+            # One statement updates both chambers: the Senate update runs as a data-modifying CTE
+            execute_values(cur, """
+                WITH scores (chamber, id, nominate_score) AS (VALUES %s),
+                senate AS (
+                    UPDATE Senators SET nominate_score = scores.nominate_score
+                    FROM scores WHERE scores.chamber = 'Senate' AND Senators.id = scores.id
+                )
+                UPDATE Representatives SET nominate_score = scores.nominate_score
+                FROM scores WHERE scores.chamber = 'House' AND Representatives.id = scores.id
+            """, rows, template="(%s, %s::int, %s::float8)", page_size=len(rows))
+        bump_data_version(cur, "legislators")
+        conn.commit()
+    except Error as error:
+        print("Error with updating nominate scores", error)
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+    return len(rows)
+
+
+def attach_nominate_scores(conn):
+    members = load_nominate_members(os.path.join(LEGISLATOR_DATA_DIR, "HS119_members.csv"))
+    matched, report = match_nominate_scores(load_roster(conn), members)
+    update_nominate_scores(conn, matched)
+    print(f"Nominate scores matched: {report['matched']['Senate']} senators, {report['matched']['House']} representatives")
+    for label, key in (("Ambiguous", "ambiguous"), ("No Voteview member for", "unmatched_roster"), ("No roster row for", "unmatched_members")):
+        for row in report[key]:
+            print(f"{label}: {row}")
+    return report
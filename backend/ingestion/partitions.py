@@ -0,0 +1,4 @@
+def create_year_partitions(cur, table, years):
+    # For tables declared PARTITION BY LIST (year): one table_<year> partition per year
+    for year in sorted({int(year) for year in years}):
+        cur.execute(f"CREATE TABLE IF NOT EXISTS {table}_{year} PARTITION OF {table} FOR VALUES IN ({year})")
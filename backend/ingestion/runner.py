@@ -0,0 +1,94 @@
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+
+class JobResult:
+    def __init__(self, name, status, seconds=0.0, rows=None, error=None):
+        self.name = name
+        self.status = status
+        self.seconds = seconds
+        self.rows = rows
+        self.error = error
+
+
+def resolve(jobs, selected, with_deps=False):
+    # Returns the jobs to run; dependencies outside the selection are only
+    # pulled in when asked for, otherwise they are assumed to be fresh
+    unknown = [name for name in selected if name not in jobs]
+    if unknown:
+        raise KeyError(f"Unknown job(s): {', '.join(unknown)}")
+    names = set(selected)
+    if with_deps:
+        stack = list(selected)
+        while stack:
+            for dep in jobs[stack.pop()].deps:
+                if dep not in names:
+                    names.add(dep)
+                    stack.append(dep)
+    return names
+
+
+def plan_waves(jobs, names):
+    # Group jobs into waves whose members only depend on earlier waves
+    remaining = set(names)
+    done = set()
+    waves = []
+    while remaining:
+        wave = sorted(name for name in remaining if all(dep in done or dep not in names for dep in jobs[name].deps))
+        if not wave:
+            raise ValueError(f"Dependency cycle between jobs: {', '.join(sorted(remaining))}")
+        waves.append(wave)
+        done.update(wave)
+        remaining.difference_update(wave)
+    return waves
+
+
+def _timed(job):
+    start = time.perf_counter()
+    rows = job.run()
+    return rows, time.perf_counter() - start
+
+
+def run_jobs(jobs, names, workers=4):
+    # Start every job as soon as its dependencies have succeeded instead of
+    # waiting for a whole wave to finish
+    plan_waves(jobs, names)
+    results = {}
+    pending = set(names)
+    running = {}
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        while pending or running:
+            for name in sorted(pending):
+                deps = [dep for dep in jobs[name].deps if dep in names]
+                if any(dep in results and results[dep].status != "ok" for dep in deps):
+                    results[name] = JobResult(name, "skipped", error="dependency failed")
+                    pending.discard(name)
+                elif all(dep in results for dep in deps):
+                    print(f"[start] {name}")
+                    running[executor.submit(_timed, jobs[name])] = name
+                    pending.discard(name)
+            if not running:
+                continue
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                name = running.pop(future)
+                try:
+                    rows, seconds = future.result()
+                    results[name] = JobResult(name, "ok", seconds, rows)
+                    print(f"[done]  {name}: {rows} rows in {seconds:.1f}s")
+                except Exception as e:
+                    traceback.print_exc()
+                    results[name] = JobResult(name, "failed", error=str(e))
+                    print(f"[fail]  {name}: {e}")
+    return results
+
+
+def format_report(results, wall_seconds):
+    lines = [f"{'job':<20} {'status':<8} {'seconds':>8} {'rows':>8}"]
+    for name in sorted(results):
+        result = results[name]
+        rows = "" if result.rows is None else str(result.rows)
+        lines.append(f"{name:<20} {result.status:<8} {result.seconds:>8.1f} {rows:>8}")
+    lines.append(f"wall clock: {wall_seconds:.1f}s")
+    return "\n".join(lines)
@@ -0,0 +1,89 @@
+import os
+import sys
+from psycopg2.extras import execute_values
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from helper import STATE_ROWS
+
+# Every table holding per-state rows, as table -> (state column, the states
+# column it holds, columns of the state_id index). Each index leads with
+# state_id and follows the table's usual per-state filters.
+STATE_KEYED_TABLES = {
+    "CrimeData": ("state", "name", ("state_id", "crime_type", "year")),
+    "StateCensus": ("state", "name", ("state_id", "year")),
+    "HealthData": ("state", "code", ("state_id", "name", "year")),
+    "Senators": ("state", "code", ("state_id",)),
+    "Representatives": ("state", "code", ("state_id", "district")),
+    "census_metrics": ("geo", "name", ("state_id", "variable", "year")),
+    "counties": ("state", "name", ("state_id", "county_fips")),
+    "county_metrics": ("state", "name", ("state_id", "county_fips", "year", "variable")),
+    "county_metric_rollups": ("state", "name", ("state_id", "year", "variable")),
+    "agencies": ("state", "name", ("state_id", "ori")),
+    "agency_crime": ("state", "name", ("state_id", "crime_type", "year", "ori")),
+    "agency_crime_rollups": ("state", "name", ("state_id", "crime_type", "year")),
+}
+
+
+def create_states_table(cur):
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS states(
+            id SMALLINT PRIMARY KEY,
+            code CHAR(2) NOT NULL UNIQUE,
+            fips CHAR(2) NOT NULL UNIQUE,
+            name VARCHAR(30) NOT NULL UNIQUE
+        )
+    """)
+    # Rows never change once written, so existing ones are left unlocked for
+    # ingestion jobs running alongside
+    execute_values(cur, "INSERT INTO states (id, code, fips, name) VALUES %s ON CONFLICT DO NOTHING", STATE_ROWS)
+
+
+def index_state_key(cur, table):
+    # For tables created with their state_id column: indexes it the first time
+    # round. Afterwards this is a catalog lookup, so writers take no lock.
+    _, _, index = STATE_KEYED_TABLES[table]
+    name = f"{table.lower()}_state_id_idx"
+    cur.execute("SELECT to_regclass(%s)", (name,))
+    if cur.fetchone()[0] is None:
+        cur.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({', '.join(index)})")
+
+
+def add_state_key(cur, table):
+    # One-off migration of a table that predates the states dimension: adds
+    # the state_id reference, fills it in and indexes it. ALTER TABLE locks
+    # out readers, so it only runs when the column is missing; ingestion then
+    # writes state_id with every row.
+    column, key, _ = STATE_KEYED_TABLES[table]
+    cur.execute("""
+        SELECT 1 FROM information_schema.columns
+        WHERE table_schema = current_schema() AND table_name = %s AND column_name = 'state_id'
+    """, (table.lower(),))
+    if cur.fetchone() is None:
+        cur.execute(f"ALTER TABLE {table} ADD COLUMN state_id SMALLINT REFERENCES states(id)")
+        cur.execute(f"""
+            UPDATE {table} t SET state_id = s.id FROM states s
+            WHERE s.{key} = t.{column}
+        """)
+    index_state_key(cur, table)
+
+
+def backfill_state_keys(conn):
+    # Run by the "states" job, which every per-state job depends on, so the
+    # migration happens once and never alongside their writes. Tables that
+    # have not been created yet are created with their key.
+    cur = conn.cursor()
+    try:
+        create_states_table(cur)
+        tables = []
+        for table in STATE_KEYED_TABLES:
+            cur.execute("SELECT to_regclass(%s)", (table.lower(),))
+            if cur.fetchone()[0] is not None:
+                add_state_key(cur, table)
+                tables.append(table)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+    return tables
@@ -0,0 +1,102 @@
+import json
+import os
+import select
+import threading
+
+import psycopg2
+from psycopg2 import errors
+from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
+
+import cache
+import db
+
+RECONNECT_SECONDS = float(os.getenv("CACHE_LISTEN_RECONNECT", "5"))
+# How often the listener wakes up without a notification to check for shutdown
+POLL_SECONDS = 5.0
+
+_listener = None
+# channel -> (evict, clear) for per-process caches invalidated by other
+# notifications: evict(payload) on each one, clear() on every (re)connect
+_subscribers = {}
+_connected = threading.Event()
+
+
+def subscribe(channel, evict, clear):
+    _subscribers[channel] = (evict, clear)
+
+
+def is_connected():
+    # Caches that rely on notifications alone must not serve entries while
+    # this is False: a write made meanwhile would go unheard
+    return _connected.is_set()
+
+
+class InvalidationListener(threading.Thread):
+    # Holds one dedicated connection (outside the pool) subscribed to the
+    # channel ingestion notifies on, and applies each bump to this process's
+    # caches. While disconnected, lookups fall back to reading data_versions.
+    def __init__(self):
+        super().__init__(name="cache-invalidation", daemon=True)
+        self._stopping = threading.Event()
+
+    def stop(self):
+        self._stopping.set()
+
+    def run(self):
+        while not self._stopping.is_set():
+            try:
+                self._listen()
+            except Exception as e:
+                print("Cache invalidation listener disconnected", e)
+            cache.clear_local_versions()
+            self._stopping.wait(RECONNECT_SECONDS)
+
+    def _listen(self):
+        conn = psycopg2.connect(**db.DB_CONFIG, keepalives=1, keepalives_idle=30, keepalives_interval=10, keepalives_count=3)
+        try:
+            conn.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
+            cur = conn.cursor()
+            cur.execute(f"LISTEN {cache.NOTIFY_CHANNEL}")
+            for channel in _subscribers:
+                cur.execute(f"LISTEN {channel}")
+            # Snapshot after LISTEN so a bump committed in between is not lost
+            try:
+                cur.execute("SELECT dataset, version FROM data_versions")
+                versions = dict(cur.fetchall())
+            except errors.UndefinedTable:
+                versions = {}
+            cache.set_local_versions(versions)
+            for _, clear in _subscribers.values():
+                clear()
+            _connected.set()
+            while not self._stopping.is_set():
+                if select.select([conn], [], [], POLL_SECONDS) == ([], [], []):
+                    continue
+                conn.poll()
+                while conn.notifies:
+                    notify = conn.notifies.pop(0)
+                    if notify.channel in _subscribers:
+                        _subscribers[notify.channel][0](notify.payload)
+                        continue
+                    payload = json.loads(notify.payload)
+                    cache.apply_data_version(payload["dataset"], payload["version"])
+        finally:
+            _connected.clear()
+            conn.close()
+
+
+def start_listener():
+    global _listener
+    if _listener is None or not _listener.is_alive():
+        _listener = InvalidationListener()
+        _listener.start()
+    return _listener
+
+
+def stop_listener():
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+        _connected.clear()
+        cache.clear_local_versions()
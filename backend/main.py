@@ -1,11 +1,28 @@
-import uvicorn
-from fastapi import FastAPI
-from api import get_crime_data, get_census_data, get_gov_spending, get_health_data, get_legislation_data, get_user_interests, get_legislators
+import os
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Response
+from api import get_crime_data, get_census_data, get_gov_spending, get_health_data, get_legislation_data, get_user_interests, get_legislators, get_feed, get_correlations, get_exports
 
 from fastapi.middleware.cors import CORSMiddleware
+from metrics import MetricsMiddleware, render_metrics
+from timing import ServerTimingMiddleware, TimedJSONResponse
+from schemas import openapi_components
+import invalidation
+
 
+@asynccontextmanager
+async def lifespan(app):
+    # Runs in each worker, after the fork, so every process gets its own listener thread
+    listen = os.getenv("CACHE_LISTEN", "1") != "0"
+    if listen:
+        invalidation.start_listener()
+    yield
+    if listen:
+        invalidation.stop_listener()
 
-app = FastAPI()
+
+app = FastAPI(default_response_class=TimedJSONResponse, lifespan=lifespan)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["http://localhost:3000"],
@@ -13,6 +30,8 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(ServerTimingMiddleware)
 # Register your routers with prefixes and tags
 app.include_router(get_crime_data.app)
 app.include_router(get_legislators.app)
@@ -21,13 +40,36 @@ app.include_router(get_gov_spending.app)
 app.include_router(get_health_data.app)
 app.include_router(get_legislation_data.app)
 app.include_router(get_user_interests.app)
+app.include_router(get_feed.app)
+app.include_router(get_correlations.app)
+app.include_router(get_exports.app)
+
+
+def openapi():
+    # Response bodies are msgspec types, which FastAPI does not know about; each
+    # route carries its own schema and the shared definitions are added here
+    if app.openapi_schema is None:
+        schema = FastAPI.openapi(app)
+        schema.setdefault("components", {}).setdefault("schemas", {}).update(openapi_components())
+        app.openapi_schema = schema
+    return app.openapi_schema
+
+
+app.openapi = openapi
 
 # Optional: Add a root endpoint
 @app.get("/")
 async def root():
     return {"message": "Real Estate API is running!", "docs": "/docs"}
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
 
+# Single-process development server; production runs under gunicorn (gunicorn.conf.py)
 if __name__ == "__main__":
+    import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8001)
     
\ No newline at end of file
@@ -0,0 +1,116 @@
+import functools
+import os
+import time
+
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess
+
+import timing
+
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Request latency by route template",
+    ["method", "route", "status"],
+)
+DB_QUERY_DURATION = Histogram(
+    "db_query_duration_seconds",
+    "Time spent in service functions that query Postgres",
+    ["function"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+)
+DB_POOL_WAIT = Histogram(
+    "db_pool_checkout_wait_seconds",
+    "Time spent waiting for a pooled connection",
+    ["pool"],
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0),
+)
+# livesum adds up the live workers' values when running under gunicorn
+DB_POOL_IN_USE = Gauge("db_pool_connections_in_use", "Pooled connections currently checked out", ["pool"], multiprocess_mode="livesum")
+DB_READ_ROUTING = Counter(
+    "db_read_routing_total",
+    "Read-intent checkouts by the pool that served them; primary means no replica was usable",
+    ["pool"],
+)
+UPSTREAM_LATENCY = Histogram(
+    "upstream_request_duration_seconds",
+    "Latency of calls to upstream HTTP APIs",
+    ["host"],
+)
+UPSTREAM_ERRORS = Counter(
+    "upstream_request_errors_total",
+    "Failed calls to upstream HTTP APIs",
+    ["host", "reason"],
+)
+CACHE_REQUESTS = Counter(
+    "cache_requests_total",
+    "In-process cache lookups",
+    ["cache", "result"],
+)
+CACHE_EVICTIONS = Counter(
+    "cache_evictions_total",
+    "Cache entries dropped because ingestion changed a dataset they depend on",
+    ["cache", "dataset"],
+)
+SINGLEFLIGHT_CALLS = Counter(
+    "singleflight_calls_total",
+    "Calls into a single-flight group; waiters were coalesced onto a leader's computation",
+    ["group", "role"],
+)
+
+
+def timed_query(func):
+    # Records the duration of a service function under its module-qualified name
+    label = f"{func.__module__.rsplit('.', 1)[-1]}.{func.__name__}"
+    histogram = DB_QUERY_DURATION.labels(label)
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            histogram.observe(elapsed)
+            timing.record("sql", elapsed, label)
+    return wrapper
+
+
+def record_cache(cache, hit):
+    CACHE_REQUESTS.labels(cache, "hit" if hit else "miss").inc()
+
+
+class MetricsMiddleware:
+    # Plain ASGI middleware; the router stores the matched route in the scope,
+    # so the template is available once the response has been produced
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            template = getattr(route, "path", None) or "unmatched"
+            REQUEST_LATENCY.labels(scope["method"], template, str(status["code"])).observe(time.perf_counter() - start)
+
+
+def render_metrics():
+    # With several workers each one writes its samples under PROMETHEUS_MULTIPROC_DIR,
+    # and whichever worker serves the scrape aggregates all of them
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(), CONTENT_TYPE_LATEST
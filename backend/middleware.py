@@ -1,7 +1,7 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 import jwt
-import requests
+import upstream
 from typing import Optional
 import os 
 import dotenv
@@ -9,7 +9,7 @@ import dotenv
 dotenv.load_dotenv()
 
 def get_cognito_public_keys():
-    response = requests.get(os.getenv("AWS_SIGNING_KEY_URL"))
+    response = upstream.get(os.getenv("AWS_SIGNING_KEY_URL"))
     return response.json()
 
 def verify_token(credentials: HTTPAuthorizationCredentials = Depends(HTTPBearer())):
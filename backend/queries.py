@@ -0,0 +1,343 @@
+import threading
+import weakref
+from datetime import date
+from typing import NamedTuple, Optional, Union
+
+# Named read queries. Each is PREPAREd once per connection, so repeated calls
+# skip parsing and planning, and its rows come back as the record type listed
+# with it. Columns are spelled out: a record's fields are its SELECT list, and
+# tuple-shaped API responses keep the column order they had under SELECT *.
+# The annotations double as the response schema (see schemas.py). Per-state
+# queries take the state's id (helper.STATE_IDS) and filter on state_id.
+
+
+class CrimeRecord(NamedTuple):
+    id: int
+    state: str
+    crime_type: str
+    crime_counts: float
+    year: int
+
+
+class AgencyCrimeRecord(NamedTuple):
+    ori: str
+    name: str
+    agency_type: Optional[str]
+    county: Optional[str]
+    crime_counts: float
+
+
+class AgencyCrimeRollupRecord(NamedTuple):
+    crime_type: str
+    year: int
+    agencies: int
+    crime_counts: float
+
+
+class CrimeTrendRecord(NamedTuple):
+    crime_type: str
+    state: str
+    year: int
+    value: float
+    yoy_pct: Optional[float]
+    cagr_pct: Optional[float]
+    national_ratio: Optional[float]
+    z_score: Optional[float]
+
+
+class CensusRecord(NamedTuple):
+    state: str
+    year: int
+    poverty_rate: float
+    educational: float
+    income_mean: float
+    income_median: float
+
+
+class CensusIncomeRecord(NamedTuple):
+    state: str
+    year: int
+    income_mean: float
+    income_median: float
+
+
+class CensusMetricRecord(NamedTuple):
+    state: str
+    year: int
+    values: list[Optional[float]]
+
+
+class CountyMetricRecord(NamedTuple):
+    county_fips: str
+    county: str
+    values: list[Optional[float]]
+
+
+class CountyRollupRecord(NamedTuple):
+    year: int
+    variable: str
+    counties: int
+    min: float
+    max: float
+    mean: float
+    median: float
+    total: float
+
+
+class HealthRecord(NamedTuple):
+    state: str
+    year: int
+    rank: int
+    name: str
+    value: float
+
+
+class HealthSummaryRecord(NamedTuple):
+    name: str
+    year: int
+    mean: float
+    min: float
+    max: float
+    states: int
+
+
+class LegislatorRecord(NamedTuple):
+    id: int
+    name: str
+    state: Optional[str]
+    district: Optional[int]
+    party: Optional[str]
+    gender: Optional[str]
+    url: Optional[str]
+    address: Optional[str]
+    phone: Optional[str]
+    nominate_score: Optional[float]
+
+
+class LegislatorIndexRecord(NamedTuple):
+    id: int
+    name: str
+    state: Optional[str]
+    district: Optional[int]
+    party: Optional[str]
+    role: str
+    nominate_score: Optional[float]
+
+
+# Rows of services/get_legislation_data.search_bills. Its filters, ranking and
+# keyset vary per request, so that query is built there rather than prepared
+# here; it selects BILL_SEARCH_COLUMNS followed by the rank.
+class BillSearchRecord(NamedTuple):
+    congress: int
+    bill_type: str
+    number: str
+    title: str
+    origin_chamber: Optional[str]
+    latest_action_date: Optional[date]
+    latest_action_text: Optional[str]
+    action_status: str
+    # ts_rank_cd for a text search, otherwise the latest action date
+    rank: Union[float, date]
+
+
+BILL_SEARCH_COLUMNS = ", ".join(BillSearchRecord._fields[:-1])
+
+
+class AgencyRecord(NamedTuple):
+    name: str
+    amount: Optional[float]
+    percent_budget: Optional[float]
+
+
+class BudgetFunctionRecord(NamedTuple):
+    name: str
+    amount: Optional[float]
+    percent_budget: Optional[float]
+    description: Optional[str]
+
+
+class EconomicRecord(NamedTuple):
+    date: int
+    pce_price_index: Optional[float]
+    gdp: Optional[float]
+    wages_and_salaries: Optional[float]
+
+
+class TreasuryStatementRecord(NamedTuple):
+    date: date
+    receipts: Optional[int]
+    outlays: Optional[int]
+    deficit_surplus: Optional[int]
+
+
+class DebtRecord(NamedTuple):
+    date: int
+    debt_outstanding_amt: Optional[float]
+
+
+class CPIRecord(NamedTuple):
+    year: int
+    month: int
+    value: float
+
+
+_SENATOR_COLUMNS = "id, name, state, NULL::int AS district, party, gender, url, address, phone, nominate_score"
+_REPRESENTATIVE_COLUMNS = "id, name, state, district, party, gender, url, address, phone, nominate_score"
+
+# name -> (record, SQL with $n parameters)
+QUERIES = {
+    "crime_by_state_type": (CrimeRecord, """
+        SELECT id, state, crime_type, crime_counts, year FROM CrimeData
+        WHERE state_id = $1 AND crime_type = $2 ORDER BY year ASC
+    """),
+    "crime_by_state": (CrimeRecord, """
+        SELECT id, state, crime_type, crime_counts, year FROM CrimeData
+        WHERE state_id = $1 ORDER BY year ASC
+    """),
+    # One pass over CrimeData: per-series windows for YoY and CAGR since the
+    # first year, per crime/year windows for the cross-state z-score. $1 is
+    # the national row's id.
+    "crime_trends": (CrimeTrendRecord, """
+        WITH state_series AS (
+            SELECT state, crime_type, year, crime_counts AS value FROM CrimeData WHERE state_id <> $1
+        ),
+        national AS (
+            SELECT crime_type, year, crime_counts AS value FROM CrimeData WHERE state_id = $1
+        )
+        SELECT s.crime_type, s.state, s.year, s.value,
+               (s.value / NULLIF(LAG(s.value) OVER series, 0) - 1) * 100 AS yoy_pct,
+               (power(s.value / NULLIF(FIRST_VALUE(s.value) OVER series, 0),
+                      1.0 / NULLIF(s.year - FIRST_VALUE(s.year) OVER series, 0)) - 1) * 100 AS cagr_pct,
+               s.value / NULLIF(n.value, 0) AS national_ratio,
+               (s.value - AVG(s.value) OVER peers) / NULLIF(STDDEV_POP(s.value) OVER peers, 0) AS z_score
+        FROM state_series s
+        LEFT JOIN national n ON n.crime_type = s.crime_type AND n.year = s.year
+        WINDOW series AS (PARTITION BY s.state, s.crime_type ORDER BY s.year),
+               peers AS (PARTITION BY s.crime_type, s.year)
+        ORDER BY s.crime_type, s.state, s.year
+    """),
+    # One page of an agency drill-down, after the $4 ORI (NULL for the first page)
+    "agency_crime_page": (AgencyCrimeRecord, """
+        SELECT c.ori, a.name, a.agency_type, a.county, c.crime_counts
+        FROM agency_crime c JOIN agencies a ON a.ori = c.ori
+        WHERE c.state_id = $1 AND c.crime_type = $2 AND c.year = $3 AND ($4::text IS NULL OR c.ori > $4)
+        ORDER BY c.ori
+        LIMIT $5
+    """),
+    "agency_crime_rollups": (AgencyCrimeRollupRecord, """
+        SELECT crime_type, year, agencies, crime_counts FROM agency_crime_rollups
+        WHERE state_id = $1 ORDER BY crime_type, year
+    """),
+    "census_by_state": (CensusRecord, """
+        SELECT state, year, poverty_rate, educational, income_mean, income_median FROM StateCensus
+        WHERE state_id = $1
+    """),
+    "census_incomes": (CensusIncomeRecord, """
+        SELECT state, year, income_mean, income_median FROM StateCensus ORDER BY state, year
+    """),
+    # census_metrics pivoted to one row per state and year, with values in the
+    # order of the $1 variables; a variable missing for that row is NULL
+    "census_metrics": (CensusMetricRecord, """
+        WITH requested AS (
+            SELECT variable, ord FROM unnest($1::text[]) WITH ORDINALITY AS r(variable, ord)
+        ),
+        found AS (
+            SELECT geo, year, variable, value FROM census_metrics
+            WHERE variable = ANY($1) AND ($2::smallint IS NULL OR state_id = $2)
+              AND ($3::int IS NULL OR year >= $3) AND ($4::int IS NULL OR year <= $4)
+        )
+        SELECT g.geo, g.year, array_agg(f.value ORDER BY r.ord)
+        FROM (SELECT DISTINCT geo, year FROM found) g
+        CROSS JOIN requested r
+        LEFT JOIN found f ON f.geo = g.geo AND f.year = g.year AND f.variable = r.variable
+        GROUP BY g.geo, g.year
+        ORDER BY g.geo, g.year
+    """),
+    # One page of a state's counties in FIPS order, after the $4 FIPS code (NULL
+    # for the first page), with the $2 variables pivoted as in census_metrics
+    "county_metrics_page": (CountyMetricRecord, """
+        WITH requested AS (
+            SELECT variable, ord FROM unnest($2::text[]) WITH ORDINALITY AS r(variable, ord)
+        ),
+        page AS (
+            SELECT county_fips, name FROM counties
+            WHERE state_id = $1 AND ($4::text IS NULL OR county_fips > $4)
+            ORDER BY county_fips
+            LIMIT $5
+        )
+        SELECT p.county_fips, p.name, array_agg(m.value ORDER BY r.ord)
+        FROM page p
+        CROSS JOIN requested r
+        LEFT JOIN county_metrics m ON m.state_id = $1 AND m.county_fips = p.county_fips AND m.year = $3 AND m.variable = r.variable
+        GROUP BY p.county_fips, p.name
+        ORDER BY p.county_fips
+    """),
+    "county_rollups": (CountyRollupRecord, """
+        SELECT year, variable, counties, min, max, mean, median, total FROM county_metric_rollups
+        WHERE state_id = $1 AND variable = ANY($2::text[]) ORDER BY year, variable
+    """),
+    "health_by_state_measure": (HealthRecord, """
+        SELECT state, year, rank, name, value FROM HealthData WHERE state_id = $1 AND name = $2
+    """),
+    # Spread of each measure across states per year
+    "health_summary": (HealthSummaryRecord, """
+        SELECT name, year, AVG(value), MIN(value), MAX(value), COUNT(*)
+        FROM HealthData
+        GROUP BY name, year
+        ORDER BY name, year
+    """),
+    "senators": (LegislatorRecord, f"SELECT {_SENATOR_COLUMNS} FROM Senators"),
+    "representatives": (LegislatorRecord, f"SELECT {_REPRESENTATIVE_COLUMNS} FROM Representatives"),
+    "senators_by_state": (LegislatorRecord, f"SELECT {_SENATOR_COLUMNS} FROM Senators WHERE state_id = $1 ORDER BY id"),
+    "representatives_by_district": (LegislatorRecord, f"SELECT {_REPRESENTATIVE_COLUMNS} FROM Representatives WHERE state_id = $1 AND district = $2 ORDER BY id"),
+    "legislator_index": (LegislatorIndexRecord, """
+        SELECT id, name, state, NULL::int AS district, party, 'Senator' AS role, nominate_score FROM Senators
+        UNION ALL
+        SELECT id, name, state, district, party, 'Representative' AS role, nominate_score FROM Representatives
+    """),
+    "agency_data": (AgencyRecord, """
+        SELECT name, amount, percent_budget FROM agency_data WHERE percent_budget > 0 ORDER BY percent_budget DESC
+    """),
+    "budget_functions": (BudgetFunctionRecord, """
+        SELECT name, amount, percent_budget, description FROM federal_budget_functions ORDER BY percent_budget DESC
+    """),
+    "federal_economic_data": (EconomicRecord, "SELECT date, pce_price_index, gdp, wages_and_salaries FROM federal_economic_data"),
+    "treasury_statements": (TreasuryStatementRecord, "SELECT date, receipts, outlays, deficit_surplus FROM treasury_statements"),
+    "federal_debt": (DebtRecord, "SELECT date, debt_outstanding_amt FROM federal_debt"),
+    # NULL bounds are open; the casts give the parameters a type on their own
+    "cpi_series": (CPIRecord, """
+        SELECT year, month, value FROM CPIData
+        WHERE series_id = $1 AND ($2::int IS NULL OR year >= $2) AND ($3::int IS NULL OR year <= $3)
+        ORDER BY year, month
+    """),
+}
+
+# Statement names prepared on each connection. Entries go away with the
+# connection object, which is exactly when its session's statements do.
+_prepared = weakref.WeakKeyDictionary()
+_prepared_lock = threading.Lock()
+
+
+def _execute(cur, conn, name, params):
+    record, sql = QUERIES[name]
+    with _prepared_lock:
+        prepared = _prepared.setdefault(conn, set())
+    if name not in prepared:
+        cur.execute(f"PREPARE {name} AS {sql}")
+        # PREPARE is not undone by a rollback, so the name stays valid for the session
+        prepared.add(name)
+    if params:
+        cur.execute(f"EXECUTE {name} ({', '.join(['%s'] * len(params))})", params)
+    else:
+        cur.execute(f"EXECUTE {name}")
+    return record
+
+
+def fetch_all(conn, name, params=()):
+    cur = conn.cursor()
+    try:
+        record = _execute(cur, conn, name, params)
+        return list(map(record._make, cur.fetchall()))
+    finally:
+        cur.close()
+
@@ -0,0 +1,285 @@
+from typing import Optional, Union
+
+import msgspec
+from fastapi.responses import JSONResponse
+
+from queries import (
+    AgencyCrimeRecord,
+    AgencyCrimeRollupRecord,
+    AgencyRecord,
+    BudgetFunctionRecord,
+    CensusMetricRecord,
+    CensusRecord,
+    CountyMetricRecord,
+    CountyRollupRecord,
+    CrimeRecord,
+    DebtRecord,
+    EconomicRecord,
+    HealthRecord,
+    TreasuryStatementRecord,
+)
+from timing import phase
+
+# Response bodies. Endpoints return a StructResponse, which msgspec encodes
+# straight to bytes: FastAPI's jsonable_encoder pass is skipped, and nothing is
+# validated on the way out. Row endpoints return the queries.py records, which
+# encode as JSON arrays in column order, the shape the frontend has always read.
+# Fields that some responses leave out are UNSET rather than null.
+
+UNSET = msgspec.UNSET
+Unset = msgspec.UnsetType
+
+REF_TEMPLATE = "#/components/schemas/{name}"
+
+
+class CrimeTrendPoint(msgspec.Struct, gc=False):
+    year: int
+    value: float
+    yoy_pct: Optional[float]
+    cagr_pct: Optional[float]
+    national_ratio: Optional[float]
+    z_score: Optional[float]
+
+
+class RealIncomePoint(msgspec.Struct, gc=False):
+    state: str
+    year: int
+    income_mean: float
+    income_median: float
+    real_income_mean: Optional[float]
+    real_income_median: Optional[float]
+
+
+class RealIncome(msgspec.Struct):
+    base_year: Optional[int]
+    data: list[RealIncomePoint]
+
+
+class InflationPoint(msgspec.Struct, gc=False):
+    year: int
+    month: int
+    value: float
+    yoy: Optional[float]
+    deflator: float
+
+
+class CensusMetrics(msgspec.Struct):
+    variables: list[str]
+    rows: list[CensusMetricRecord]
+
+
+class CountyMetricsPage(msgspec.Struct):
+    state: str
+    year: int
+    variables: list[str]
+    rows: list[CountyMetricRecord]
+    next_cursor: Optional[str]
+
+
+class AgencyCrimePage(msgspec.Struct):
+    state: str
+    crime_type: str
+    year: int
+    rows: list[AgencyCrimeRecord]
+    next_cursor: Optional[str]
+
+
+class AgencySpending(msgspec.Struct):
+    agency_data: list[AgencyRecord]
+    budget_functions_data: list[BudgetFunctionRecord]
+
+
+class FederalEconomicData(msgspec.Struct):
+    economic_data: list[EconomicRecord]
+
+
+class FederalDebt(msgspec.Struct):
+    federal_debt: list[DebtRecord]
+    treasury_statements: list[TreasuryStatementRecord]
+
+
+class FederalFpl(msgspec.Struct):
+    fpl: Union[float, None, Unset] = UNSET
+    error: Union[str, Unset] = UNSET
+
+
+class RecentBill(msgspec.Struct, gc=False):
+    bill_id: str
+    title: str
+    date: Optional[str]
+    action: Optional[str]
+    chamber: Optional[str]
+
+
+class Bill(msgspec.Struct, gc=False):
+    bill_id: str
+    congress: int
+    type: str
+    number: str
+    title: str
+    chamber: Optional[str]
+    date: Optional[str]
+    action: Optional[str]
+    status: Optional[str]
+    rank: Union[float, Unset] = UNSET
+
+
+class BillSearchPage(msgspec.Struct):
+    results: list[Bill]
+    next_cursor: Optional[str]
+
+
+class Legislator(msgspec.Struct, gc=False):
+    id: int
+    name: str
+    state: Optional[str]
+    party: Optional[str]
+    gender: Optional[str]
+    url: Optional[str]
+    address: Optional[str]
+    phone: Optional[str]
+    role: str = msgspec.field(name="Role")
+    nominate_score: Optional[float] = msgspec.field(name="Nominate_Score")
+
+
+class Legislators(msgspec.Struct):
+    legislators: Union[list[Legislator], Unset] = UNSET
+    error: Union[str, Unset] = UNSET
+
+
+class LegislatorMatch(msgspec.Struct, gc=False):
+    id: int
+    name: str
+    state: Optional[str]
+    district: Optional[int]
+    party: Optional[str]
+    role: str = msgspec.field(name="Role")
+    nominate_score: Optional[float] = msgspec.field(name="Nominate_Score")
+
+
+class LegislatorMatches(msgspec.Struct):
+    legislators: list[LegislatorMatch]
+
+
+class SavedInterests(msgspec.Struct):
+    status: str
+    message: str
+
+
+class InterestList(msgspec.Struct):
+    interests: list[str]
+    message: Union[str, Unset] = UNSET
+
+
+class HealthSummaryPoint(msgspec.Struct, gc=False):
+    name: str
+    year: int
+    mean: float
+    min: float
+    max: float
+    states: int
+
+
+class HealthSummaryBundle(msgspec.Struct):
+    summary: list[HealthSummaryPoint]
+
+
+class NationalCrimeBundle(msgspec.Struct):
+    national: list[CrimeRecord]
+
+
+class NationalCensusBundle(msgspec.Struct):
+    national: list[CensusRecord]
+
+
+class LegislationBundle(msgspec.Struct):
+    bills: list[RecentBill]
+
+
+class TaxesBundle(msgspec.Struct):
+    fpl: dict[int, Optional[float]]
+
+
+class FeedBundles(msgspec.Struct):
+    # Only the bundles for the user's interests are present
+    crime: Union[NationalCrimeBundle, Unset] = UNSET
+    health: Union[HealthSummaryBundle, Unset] = UNSET
+    state_stats: Union[NationalCensusBundle, Unset] = UNSET
+    federal_spending: Union[AgencySpending, Unset] = UNSET
+    federal_debt: Union[FederalDebt, Unset] = UNSET
+    federal_economic: Union[FederalEconomicData, Unset] = UNSET
+    legislation: Union[LegislationBundle, Unset] = UNSET
+    taxes: Union[TaxesBundle, Unset] = UNSET
+
+
+class Feed(msgspec.Struct):
+    interests: list[str]
+    bundles: FeedBundles
+    unknown_interests: list[str]
+
+
+class CorrelationMatrix(msgspec.Struct):
+    year: Optional[int]
+    metrics: list[str]
+    n: list[list[int]]
+    r: list[list[Optional[float]]]
+
+
+class CorrelationPoint(msgspec.Struct, gc=False):
+    state: str
+    year: int
+    x: float
+    y: float
+
+
+class MetricCorrelation(msgspec.Struct):
+    x: str
+    y: str
+    year: Optional[int]
+    n: int
+    r: Optional[float]
+    r_squared: Optional[float]
+    slope: Optional[float]
+    intercept: Optional[float]
+    points: list[CorrelationPoint]
+
+
+CrimeRows = list[CrimeRecord]
+CensusRows = list[CensusRecord]
+HealthRows = list[HealthRecord]
+CrimeTrends = dict[str, dict[str, list[CrimeTrendPoint]]]
+CountyRollups = list[CountyRollupRecord]
+AgencyCrimeRollups = list[AgencyCrimeRollupRecord]
+InflationSeries = list[InflationPoint]
+AnnualInflation = dict[int, float]
+
+# psycopg2 returns float8 as float but Postgres numeric as Decimal: SUM or AVG
+# over integer or numeric columns, or arithmetic with a numeric literal such as
+# 1.0. Write any that reach a response as numbers, not strings.
+_encoder = msgspec.json.Encoder(decimal_format="number")
+
+
+class StructResponse(JSONResponse):
+    # A JSONResponse subclass so OpenAPI treats the body as JSON without a default schema
+    def render(self, content):
+        with phase("serialize"):
+            return _encoder.encode(content)
+
+
+_response_types = []
+
+
+def returns(response_type):
+    # Route keyword arguments: the response class, and the 200 body schema for
+    # OpenAPI. The types it references are published by openapi_components().
+    _response_types.append(response_type)
+    (schema,), _ = msgspec.json.schema_components([response_type], ref_template=REF_TEMPLATE)
+    return {
+        "response_class": StructResponse,
+        "responses": {200: {"content": {"application/json": {"schema": schema}}}},
+    }
+
+
+def openapi_components():
+    _, components = msgspec.json.schema_components(_response_types, ref_template=REF_TEMPLATE)
+    return components
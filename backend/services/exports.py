@@ -0,0 +1,144 @@
+import csv
+import io
+import json
+import os
+import sys
+import uuid
+from contextlib import closing
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from db import connection_scope, READ
+
+# Rows fetched per round trip from the server-side cursor; one batch is the
+# most an export ever holds in memory, and each batch becomes one chunk
+EXPORT_ITERSIZE = int(os.getenv("EXPORT_ITERSIZE", "5000"))
+
+# dataset -> (table, columns, ordering). Only these are exportable, and the
+# ordering follows each table's key so Postgres can stream from the index
+EXPORTS = {
+    "crime": ("CrimeData", ("state", "year", "crime_type", "crime_counts"), ("state", "year", "crime_type")),
+    "census": ("StateCensus", ("state", "year", "poverty_rate", "educational", "income_mean", "income_median"), ("state", "year")),
+    "health": ("HealthData", ("state", "year", "name", "rank", "value"), ("state", "year", "name")),
+    "county_census": ("county_metrics", ("state", "county_fips", "year", "variable", "value"), ("state", "county_fips", "year", "variable")),
+    "agency_crime": ("agency_crime", ("state", "crime_type", "year", "ori", "crime_counts"), ("state", "crime_type", "year", "ori")),
+    "treasury_statements": ("treasury_statements", ("date", "receipts", "outlays", "deficit_surplus"), ("date",)),
+}
+
+FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+
+def validate_export(dataset, fmt):
+    # Checked before the response starts; once streaming, the status is already sent
+    if dataset not in EXPORTS:
+        raise ValueError(f"Unknown dataset: {dataset}. Expected one of {', '.join(EXPORTS)}")
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format: {fmt}. Expected one of {', '.join(FORMATS)}")
+    if fmt == "parquet":
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise ValueError("Parquet export requires pyarrow to be installed")
+    return FORMATS[fmt]
+
+
+def _iter_batches(dataset):
+    # Yields the cursor description, then lists of rows. The pooled connection
+    # is held only while the generator runs and is returned when it finishes
+    # or is closed early (a client disconnecting mid-download).
+    table, columns, ordering = EXPORTS[dataset]
+    with connection_scope(READ) as conn:
+        cur = conn.cursor(name=f"export_{dataset}_{uuid.uuid4().hex[:8]}")
+        cur.itersize = EXPORT_ITERSIZE
+        try:
+            cur.execute(f"SELECT {', '.join(columns)} FROM {table} ORDER BY {', '.join(ordering)}")
+            batch = cur.fetchmany(EXPORT_ITERSIZE)
+            yield cur.description
+            while batch:
+                yield batch
+                batch = cur.fetchmany(EXPORT_ITERSIZE)
+        finally:
+            cur.close()
+            # Named cursors live in a transaction; end it before the connection goes back
+            conn.rollback()
+
+
+def _ndjson_chunks(dataset):
+    # One encoder for the whole stream; json.dumps with default= builds a new one per call
+    encode = json.JSONEncoder(default=str).encode
+    with closing(_iter_batches(dataset)) as batches:
+        columns = [column.name for column in next(batches)]
+        for batch in batches:
+            yield "".join(encode(dict(zip(columns, row))) + "\n" for row in batch).encode()
+
+
+def _csv_chunks(dataset):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    with closing(_iter_batches(dataset)) as batches:
+        writer.writerow([column.name for column in next(batches)])
+        yield buffer.getvalue().encode()
+        for batch in batches:
+            buffer.seek(0)
+            buffer.truncate()
+            writer.writerows(batch)
+            yield buffer.getvalue().encode()
+
+
+class _ChunkSink(io.RawIOBase):
+    # Write-only file the Parquet writer appends to; whatever it has written
+    # since the last drain is handed out as the next chunk
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self):
+        chunk = b"".join(self._chunks)
+        self._chunks = []
+        return chunk
+
+
+def _arrow_schema(description):
+    import pyarrow as pa
+    # Postgres type OIDs of the exported columns; anything else is written as text
+    types = {
+        16: pa.bool_(), 20: pa.int64(), 21: pa.int16(), 23: pa.int32(),
+        700: pa.float32(), 701: pa.float64(), 1700: pa.float64(),
+        1082: pa.date32(), 1114: pa.timestamp("us"), 1184: pa.timestamp("us", tz="UTC"),
+    }
+    return pa.schema([(column.name, types.get(column.type_code, pa.string())) for column in description])
+
+
+def _parquet_chunks(dataset):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    with closing(_iter_batches(dataset)) as batches:
+        schema = _arrow_schema(next(batches))
+        sink = _ChunkSink()
+        writer = pq.ParquetWriter(sink, schema)
+        # One row group per batch; the footer is written on close
+        for batch in batches:
+            columns = list(zip(*batch))
+            writer.write_table(pa.Table.from_arrays([pa.array(values, type=field.type) for values, field in zip(columns, schema)], schema=schema))
+            yield sink.drain()
+        writer.close()
+        yield sink.drain()
+
+
+def stream_export(dataset, fmt):
+    validate_export(dataset, fmt)
+    return {"ndjson": _ndjson_chunks, "csv": _csv_chunks, "parquet": _parquet_chunks}[fmt](dataset)
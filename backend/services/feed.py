@@ -0,0 +1,120 @@
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from db import connection_scope
+from cache import VersionedCache, get_data_versions
+from schemas import (
+    AgencySpending,
+    FederalDebt,
+    FederalEconomicData,
+    FeedBundles,
+    HealthSummaryBundle,
+    HealthSummaryPoint,
+    LegislationBundle,
+    NationalCensusBundle,
+    NationalCrimeBundle,
+    TaxesBundle,
+)
+from services.get_federal_spending import get_agency_data, get_budget_functions, get_federal_debt, get_federal_economic_data, get_federal_fpl, get_treasury_statements
+from services.get_health_data import get_health_summary
+from services.get_legislation_data import get_recent_legislation
+from services.get_state_census import get_us_census_data
+from services.get_state_crime import get_all_state_crime
+
+# Bundles backed by upstream APIs rather than ingested tables are refreshed on a clock
+LEGISLATION_TTL = int(os.getenv("FEED_LEGISLATION_TTL", "600"))
+FPL_TTL = int(os.getenv("FEED_FPL_TTL", "86400"))
+
+_bundle_cache = VersionedCache("feed_bundles", ())
+
+# Interest names the frontend saves -> bundle keys
+INTEREST_ALIASES = {
+    "state stats": "state_stats",
+    "legislation": "legislation",
+    "federal spending": "federal_spending",
+    "spending": "federal_spending",
+    "federal debt": "federal_debt",
+    "crime": "crime",
+    "health": "health",
+    "taxes": "taxes",
+    "federal economics": "federal_economic",
+    "federal economic": "federal_economic",
+}
+
+
+def build_crime_bundle(conn):
+    return NationalCrimeBundle(national=get_all_state_crime(conn, "United States"))
+
+
+def build_health_bundle(conn):
+    return HealthSummaryBundle(summary=[HealthSummaryPoint(*row) for row in get_health_summary(conn)])
+
+
+def build_state_stats_bundle(conn):
+    return NationalCensusBundle(national=get_us_census_data(conn))
+
+
+def build_federal_spending_bundle(conn):
+    return AgencySpending(agency_data=get_agency_data(conn)[:10], budget_functions_data=get_budget_functions(conn))
+
+
+def build_federal_debt_bundle(conn):
+    return FederalDebt(federal_debt=get_federal_debt(conn), treasury_statements=get_treasury_statements(conn))
+
+
+def build_federal_economic_bundle(conn):
+    return FederalEconomicData(economic_data=get_federal_economic_data(conn))
+
+
+def build_legislation_bundle(conn):
+    return LegislationBundle(bills=get_recent_legislation())
+
+
+def build_taxes_bundle(conn):
+    return TaxesBundle(fpl={size: get_federal_fpl(size) for size in range(1, 9)})
+
+
+# bundle key -> (builder, datasets whose ingestion invalidates it, clock TTL for upstream-backed bundles)
+BUNDLES = {
+    "crime": (build_crime_bundle, ("crime",), None),
+    "health": (build_health_bundle, ("health",), None),
+    "state_stats": (build_state_stats_bundle, ("census",), None),
+    "federal_spending": (build_federal_spending_bundle, ("spending",), None),
+    "federal_debt": (build_federal_debt_bundle, ("debt", "treasury"), None),
+    "federal_economic": (build_federal_economic_bundle, ("economic",), None),
+    "legislation": (build_legislation_bundle, (), LEGISLATION_TTL),
+    "taxes": (build_taxes_bundle, (), FPL_TTL),
+}
+
+
+def resolve_interests(interests):
+    keys, unknown = [], []
+    for interest in interests or []:
+        key = INTEREST_ALIASES.get(interest.strip().lower().replace("_", " "))
+        if key is None:
+            unknown.append(interest)
+        elif key not in keys:
+            keys.append(key)
+    return keys, unknown
+
+
+def get_feed(conn, interests):
+    keys, unknown = resolve_interests(interests)
+    # One round trip for the versions of every dataset the requested bundles depend on
+    datasets = sorted({dataset for key in keys for dataset in BUNDLES[key][1]})
+    versions = dict(zip(datasets, get_data_versions(conn, datasets))) if datasets else {}
+    now = time.time()
+
+    bundles = {}
+    for key in keys:
+        builder, bundle_datasets, ttl = BUNDLES[key]
+        version = tuple(versions[dataset] for dataset in bundle_datasets) if ttl is None else int(now // ttl)
+        bundles[key] = _bundle_cache.get_or_build(key, version, lambda: builder(conn), bundle_datasets)
+    return {"bundles": FeedBundles(**bundles), "unknown_interests": unknown}
+
+
+def precompute_bundles():
+    with connection_scope() as conn:
+        return get_feed(conn, list(BUNDLES))
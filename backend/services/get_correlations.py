@@ -0,0 +1,151 @@
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from db import connection_scope
+from metrics import timed_query
+from cache import VersionedCache, get_data_versions
+from helper import NATIONAL, STATE_IDS, STATE_NAMES_BY_ID
+from schemas import CorrelationMatrix, CorrelationPoint, MetricCorrelation
+
+# NumPy is imported inside the functions that need it, as in get_cpi_data
+
+CENSUS_METRICS = ("poverty_rate", "educational", "income_mean", "income_median")
+
+_correlation_cache = VersionedCache("correlations", ("crime", "census", "health"))
+
+
+@timed_query
+def _query_observations(conn):
+    # Every dataset as long (state_id, year, metric, value) rows; metric names
+    # are prefixed with their source so health and crime measures cannot collide
+    cur = conn.cursor()
+    try:
+        cur.execute(f"""
+            SELECT state_id, year, 'census.' || metric, value
+            FROM StateCensus,
+                 LATERAL (VALUES {", ".join(f"('{name}', {name})" for name in CENSUS_METRICS)}) AS m(metric, value)
+            WHERE state_id <> %(national)s
+            UNION ALL
+            SELECT state_id, year, 'health.' || name, value FROM HealthData WHERE state_id IS NOT NULL
+            UNION ALL
+            SELECT state_id, year, 'crime.' || crime_type, crime_counts FROM CrimeData WHERE state_id <> %(national)s
+        """, {"national": STATE_IDS[NATIONAL]})
+        return cur.fetchall()
+    finally:
+        cur.close()
+
+
+def _build_cube(conn):
+    import numpy as np
+    rows = _query_observations(conn)
+    # Every dataset keys its rows by state_id, so they line up without any name mapping
+    state_ids = sorted({row[0] for row in rows}, key=STATE_NAMES_BY_ID.get)
+    states = [STATE_NAMES_BY_ID[id] for id in state_ids]
+    years = sorted({row[1] for row in rows})
+    metrics = sorted({row[2] for row in rows})
+    state_index = {id: i for i, id in enumerate(state_ids)}
+    year_index = {year: i for i, year in enumerate(years)}
+    metric_index = {metric: i for i, metric in enumerate(metrics)}
+
+    cube = np.full((len(states), len(years), len(metrics)), np.nan)
+    if rows:
+        s = np.fromiter((state_index[row[0]] for row in rows), dtype=np.int64, count=len(rows))
+        y = np.fromiter((year_index[row[1]] for row in rows), dtype=np.int64, count=len(rows))
+        m = np.fromiter((metric_index[row[2]] for row in rows), dtype=np.int64, count=len(rows))
+        cube[s, y, m] = np.fromiter((row[3] for row in rows), dtype=np.float64, count=len(rows))
+    return {"states": states, "years": years, "metrics": metrics, "cube": cube}
+
+
+def compute_pairwise_stats(observations):
+    # observations is (n_obs, n_metrics) with NaN for missing values. Every
+    # metric pair uses the observations where both are present, so the sums
+    # are masked matrix products rather than a loop over pairs.
+    import numpy as np
+    valid = (~np.isnan(observations)).astype(np.float64)
+    values = np.where(valid > 0, observations, 0.0)
+    n = valid.T @ valid
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # sum_x[i, j]: sum of metric i over observations where i and j are both present
+        sum_x = values.T @ valid
+        sum_xx = (values ** 2).T @ valid
+        sum_xy = values.T @ values
+        mean_x = sum_x / n
+        mean_y = sum_x.T / n
+        cov = sum_xy / n - mean_x * mean_y
+        var_x = sum_xx / n - mean_x ** 2
+        var_y = sum_xx.T / n - mean_y ** 2
+        r = cov / np.sqrt(var_x * var_y)
+        # Least squares fit of metric j on metric i
+        slope = cov / var_x
+        intercept = mean_y - slope * mean_x
+    # Fewer than three paired observations or a constant series has no meaningful fit
+    undefined = (n < 3) | (var_x <= 0) | (var_y <= 0)
+    for matrix in (r, slope, intercept):
+        matrix[undefined] = np.nan
+    return {"n": n.astype(np.int64), "r": np.clip(r, -1.0, 1.0), "slope": slope, "intercept": intercept}
+
+
+def _to_json(matrix):
+    import numpy as np
+    return [[None if np.isnan(value) else round(float(value), 6) for value in row] for row in matrix]
+
+
+def _observations(data, year):
+    cube = data["cube"]
+    if year is None:
+        return cube.reshape(-1, cube.shape[2])
+    if year not in data["years"]:
+        raise ValueError(f"No data for year {year}")
+    return cube[:, data["years"].index(year), :]
+
+
+def _get_stats(conn, year):
+    # Statistics are derived from the cached cube, so a new year or pair never touches the tables
+    versions = get_data_versions(conn, _correlation_cache.datasets)
+    data = _correlation_cache.get_or_build("cube", versions, lambda: _build_cube(conn))
+    stats = _correlation_cache.get_or_build(("stats", year), versions, lambda: compute_pairwise_stats(_observations(data, year)))
+    return data, stats
+
+
+def get_correlation_matrix(conn, year=None):
+    data, stats = _get_stats(conn, year)
+    return CorrelationMatrix(
+        year=year,
+        metrics=data["metrics"],
+        n=stats["n"].tolist(),
+        r=_to_json(stats["r"]),
+    )
+
+
+def get_metric_correlation(conn, x, y, year=None):
+    import numpy as np
+    data, stats = _get_stats(conn, year)
+    for metric in (x, y):
+        if metric not in data["metrics"]:
+            raise ValueError(f"Unknown metric: {metric}")
+    i, j = data["metrics"].index(x), data["metrics"].index(y)
+    r = stats["r"][i, j]
+
+    points = []
+    years = data["years"] if year is None else [year]
+    for point_year in years:
+        layer = data["cube"][:, data["years"].index(point_year), :]
+        both = np.flatnonzero(~np.isnan(layer[:, i]) & ~np.isnan(layer[:, j]))
+        for s in both.tolist():
+            points.append(CorrelationPoint(state=data["states"][s], year=point_year, x=float(layer[s, i]), y=float(layer[s, j])))
+
+    def clean(value):
+        return None if np.isnan(value) else round(float(value), 6)
+
+    return MetricCorrelation(
+        x=x,
+        y=y,
+        year=year,
+        n=int(stats["n"][i, j]),
+        r=clean(r),
+        r_squared=clean(r * r),
+        slope=clean(stats["slope"][i, j]),
+        intercept=clean(stats["intercept"][i, j]),
+        points=points,
+    )
@@ -0,0 +1,151 @@
+import os
+import sys
+from psycopg2 import Error
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from db import connection_scope
+from metrics import timed_query
+from cache import VersionedCache
+from queries import fetch_all
+from schemas import InflationPoint, RealIncome, RealIncomePoint
+
+# NumPy is imported inside the functions that need it so that loading the API
+# does not pay for it until the first inflation request
+
+CPI_SERIES_ID = "CUUR0000SA0"
+
+_real_income_cache = VersionedCache("real_income", ("census", "cpi"))
+
+
+def _dense_monthly(rows):
+    import numpy as np
+    # Lay the series out on a contiguous month grid so that gaps stay NaN and
+    # lagged comparisons are plain array offsets
+    years = np.fromiter((row.year for row in rows), dtype=np.int64, count=len(rows))
+    months = np.fromiter((row.month for row in rows), dtype=np.int64, count=len(rows))
+    values = np.fromiter((row.value for row in rows), dtype=np.float64, count=len(rows))
+    first_year = int(years.min())
+    n_years = int(years.max()) - first_year + 1
+    dense = np.full(n_years * 12, np.nan)
+    dense[(years - first_year) * 12 + (months - 1)] = values
+    return first_year, dense
+
+
+def compute_inflation(monthly_values, periods=12, base_index=-1):
+    import numpy as np
+    values = np.asarray(monthly_values, dtype=np.float64)
+    yoy = np.full(values.shape, np.nan)
+    yoy[periods:] = (values[periods:] / values[:-periods] - 1.0) * 100
+    # Multiplying a nominal amount by its period's deflator expresses it in base-period prices
+    deflators = values[base_index] / values
+    return yoy, deflators
+
+
+@timed_query
+def get_cpi_series(conn, start_year=None, end_year=None, series_id=CPI_SERIES_ID):
+    try:
+        result = fetch_all(conn, "cpi_series", (series_id, start_year, end_year))
+    except Error as error:
+        print("Error with getting CPI data", error)
+        conn.rollback()
+        result = []
+    return result
+
+
+def get_inflation(conn, start_year=None, end_year=None):
+    import numpy as np
+    # Monthly CPI with its year-over-year change and the deflator to the
+    # latest month in the range. The year before is read too, so the first
+    # year's changes have something to compare against.
+    rows = get_cpi_series(conn, None if start_year is None else start_year - 1, end_year)
+    if not rows:
+        return []
+    first_year, dense = _dense_monthly(rows)
+    observed = np.flatnonzero(~np.isnan(dense))
+    yoy, deflators = compute_inflation(dense, base_index=int(observed[-1]))
+    if start_year is not None:
+        observed = observed[observed >= (start_year - first_year) * 12]
+    return [
+        InflationPoint(
+            year=first_year + int(i) // 12,
+            month=int(i) % 12 + 1,
+            value=value,
+            yoy=None if np.isnan(change) else change,
+            deflator=deflator,
+        )
+        for i, value, change, deflator in zip(observed, dense[observed].tolist(), yoy[observed].tolist(), deflators[observed].tolist())
+    ]
+
+
+def get_annual_inflation(conn, start_year=None, end_year=None):
+    import numpy as np
+    # Average year-over-year inflation per calendar year
+    rows = get_cpi_series(conn, None if start_year is None else start_year - 1, end_year)
+    if not rows:
+        return {}
+    first_year, dense = _dense_monthly(rows)
+    yoy, _ = compute_inflation(dense)
+    by_year = yoy.reshape(-1, 12)
+    counts = np.sum(~np.isnan(by_year), axis=1)
+    sums = np.nansum(by_year, axis=1)
+    result = {}
+    for offset in np.flatnonzero(counts):
+        year = first_year + int(offset)
+        if start_year is None or year >= start_year:
+            result[year] = float(sums[offset] / counts[offset])
+    return result
+
+
+def _annual_cpi(conn):
+    import numpy as np
+    rows = get_cpi_series(conn)
+    if not rows:
+        return None, None, None
+    first_year, dense = _dense_monthly(rows)
+    by_year = dense.reshape(-1, 12)
+    counts = np.sum(~np.isnan(by_year), axis=1)
+    annual = np.full(by_year.shape[0], np.nan)
+    annual[counts > 0] = np.nansum(by_year[counts > 0], axis=1) / counts[counts > 0]
+    return first_year, annual, counts
+
+
+def _compute_real_income(conn, base_year):
+    import numpy as np
+    first_year, annual, counts = _annual_cpi(conn)
+    rows = fetch_all(conn, "census_incomes")
+    if annual is None or not rows:
+        return RealIncome(base_year=base_year, data=[])
+
+    if base_year is None:
+        # Default to the most recent year with a complete set of monthly readings
+        complete = np.flatnonzero(counts == 12)
+        base_offset = int(complete[-1]) if len(complete) else int(np.flatnonzero(counts)[-1])
+        base_year = first_year + base_offset
+    base_offset = base_year - first_year
+    if base_offset < 0 or base_offset >= len(annual) or np.isnan(annual[base_offset]):
+        raise ValueError(f"No CPI data for base year {base_year}")
+
+    years = np.fromiter((row.year for row in rows), dtype=np.int64, count=len(rows))
+    incomes = np.array([(row.income_mean, row.income_median) for row in rows], dtype=np.float64)
+    offsets = years - first_year
+    in_range = (offsets >= 0) & (offsets < len(annual))
+    deflators = np.full(len(rows), np.nan)
+    deflators[in_range] = annual[base_offset] / annual[offsets[in_range]]
+    real = incomes * deflators[:, None]
+
+    data = []
+    for row, (real_mean, real_median) in zip(rows, real.tolist()):
+        data.append(RealIncomePoint(
+            state=row.state,
+            year=row.year,
+            income_mean=row.income_mean,
+            income_median=row.income_median,
+            real_income_mean=None if np.isnan(real_mean) else real_mean,
+            real_income_median=None if np.isnan(real_median) else real_median,
+        ))
+    return RealIncome(base_year=base_year, data=data)
+
+
+def get_real_income(conn, base_year=None):
+    return _real_income_cache.get_or_compute(conn, base_year, lambda: _compute_real_income(conn, base_year))
+
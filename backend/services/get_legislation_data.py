@@ -1,31 +1,145 @@
-import requests
 import os
+import base64
+import json
 import dotenv
 import sys 
+import time
+from datetime import date
 
 dotenv.load_dotenv()
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from db import connection_scope
+from metrics import timed_query
+from cache import VersionedCache
+from queries import BILL_SEARCH_COLUMNS, BillSearchRecord
+from schemas import UNSET, Bill, BillSearchPage, RecentBill
+import upstream
 
-def get_recent_legislation():
+# The Congress API list changes a few times a day; bursts within this window share one call
+RECENT_LEGISLATION_TTL = int(os.getenv("RECENT_LEGISLATION_TTL", "300"))
+SEARCH_MAX_LIMIT = 100
+
+_recent_cache = VersionedCache("recent_legislation", ())
+
+def _fetch_recent_legislation():
     try:
         url = f"{os.getenv('CONGRESS_API_URL')}{os.getenv('CONGRESS_API_KEY')}"
         parameters = {
             "limit": 10
         }
-        response = requests.get(url, params=parameters).json()['bills']
+        response = upstream.get(url, params=parameters).json()['bills']
         result = []
         for item in response:
-            curr = {}
-            curr['bill_id'] = item['number']
-            curr['title'] = item['title']
-            curr['date'] = item['latestAction']['actionDate']
-            curr['action'] = item['latestAction']['text']
-            curr['chamber'] = item['originChamber']
-            result.append(curr)
+            result.append(RecentBill(
+                bill_id=item['number'],
+                title=item['title'],
+                date=item['latestAction']['actionDate'],
+                action=item['latestAction']['text'],
+                chamber=item['originChamber'],
+            ))
         return result
     except Exception as e:
         raise Exception("Failed to fetch recent legislation: " + str(e))
 
+
+def get_recent_legislation():
+    return _recent_cache.get_or_build(None, int(time.time() // RECENT_LEGISLATION_TTL), _fetch_recent_legislation)
+
+
+async def get_recent_legislation_async():
+    return await _recent_cache.get_or_build_async(None, int(time.time() // RECENT_LEGISLATION_TTL), _fetch_recent_legislation)
+
+def encode_cursor(values):
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        return json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except ValueError:
+        raise ValueError("Invalid cursor")
+
+
+def _bill_result(row, rank=UNSET):
+    return Bill(
+        bill_id=f"{row.bill_type}{row.number}",
+        congress=row.congress,
+        type=row.bill_type,
+        number=row.number,
+        title=row.title,
+        chamber=row.origin_chamber,
+        date=row.latest_action_date.isoformat() if row.latest_action_date else None,
+        action=row.latest_action_text,
+        status=row.action_status,
+        rank=rank,
+    )
+
+
+@timed_query
+def search_bills(conn, q=None, chamber=None, date_from=None, date_to=None, status=None, cursor=None, limit=20):
+    # Ranked full-text search when q is given, otherwise newest action first;
+    # both orders end in the primary key so the keyset cursor is unambiguous
+    limit = max(1, min(limit, SEARCH_MAX_LIMIT))
+    filters = []
+    params = []
+    if chamber:
+        filters.append("origin_chamber = %s")
+        params.append(chamber.capitalize())
+    if date_from:
+        filters.append("latest_action_date >= %s")
+        params.append(date_from)
+    if date_to:
+        filters.append("latest_action_date <= %s")
+        params.append(date_to)
+    if status:
+        filters.append("action_status = %s")
+        params.append(status)
+
+    if q:
+        filters.append("search_vector @@ websearch_to_tsquery('english', %s)")
+        rank = "ts_rank_cd(search_vector, websearch_to_tsquery('english', %s))::float8"
+        params = [q] + params + [q]
+    else:
+        # Undated bills sort last instead of breaking the row comparison with NULL
+        rank = "coalesce(latest_action_date, DATE '0001-01-01')"
+    query = f"SELECT {BILL_SEARCH_COLUMNS}, {rank} AS rank FROM bills"
+    if filters:
+        query += f" WHERE {' AND '.join(filters)}"
+
+    keyset = ""
+    if cursor:
+        after = decode_cursor(cursor)
+        if not isinstance(after, list) or len(after) != 4:
+            raise ValueError("Invalid cursor")
+        if not q:
+            try:
+                after[0] = date.fromisoformat(after[0])
+            except (TypeError, ValueError):
+                raise ValueError("Invalid cursor")
+        keyset = "WHERE (rank, congress, bill_type, number) < (%s, %s, %s, %s)"
+        params += after
+
+    cur = conn.cursor()
+    try:
+        cur.execute(f"""
+            SELECT {BILL_SEARCH_COLUMNS}, rank FROM ({query}) matched
+            {keyset}
+            ORDER BY rank DESC, congress DESC, bill_type DESC, number DESC
+            LIMIT %s
+        """, params + [limit + 1])
+        rows = list(map(BillSearchRecord._make, cur.fetchall()))
+    finally:
+        cur.close()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        last_rank = last.rank.isoformat() if isinstance(last.rank, date) else last.rank
+        next_cursor = encode_cursor([last_rank, last.congress, last.bill_type, last.number])
+    # The relevance rank is only meaningful for text searches
+    results = [_bill_result(row, row.rank if q else UNSET) for row in rows]
+    return BillSearchPage(results=results, next_cursor=next_cursor)
+
 # if __name__ == "__main__":
 #     print(get_current_legislation())
@@ -1,164 +1,91 @@
-
-import requests
-import json
 import os
+import re
 import sys
-from dotenv import load_dotenv
-import psycopg2
 from psycopg2 import Error
-import matplotlib.pyplot as plt
-import json
-import pandas as pd
-from datetime import datetime
+
 # Add parent directory to path to import db module
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from db import connection_scope
+from metrics import timed_query
+from queries import fetch_all
+from schemas import CensusMetrics, CountyMetricsPage
+from helper import NATIONAL, STATE_IDS
 
-load_dotenv()
-
-def get_state_census_response(year: int):
-
-    url = f"https://api.census.gov/data/{year}/acs/acs1/profile?get=NAME,DP03_0119PE,DP02_0067PE,DP03_0063E,DP03_0062E,DP03_0097PE,DP03_0098PE&for=state:*"
-    
-    response = requests.get(url)
-    
-    return response
-    # cur = conn.cursor()
-def get_us_census_response(year: int):
-    url = f"https://api.census.gov/data/{year}/acs/acs1/profile?get=NAME,DP03_0119PE,DP02_0067PE,DP03_0063E,DP03_0062E,DP03_0097PE,DP03_0098PE&for=us:*"
-    response = requests.get(url)
-    return response
-
-# Get consumer price index data
-def get_CPI_response():
-    # Set the headers and data for the API request
-    headers = {'Content-type': 'application/json'}
-    data = json.dumps({
-    "seriesid": ['CUUR0000SA0'],
-    "startyear": "2020",
-    "endyear": "2024"
-    })
-
-    # Send the request to the BLS API
-    json_data = requests.post('https://api.bls.gov/publicAPI/v2/timeseries/data/', data=data, headers=headers).json()
-    data_list = []
-    for series in json_data['Results']['series']:
-        seriesId = series['seriesID']
-        for item in series['data']:
-            data_list.append({
-                'Series ID': seriesId,
-                'Year': int(item['year']),
-                'Month': item['period'],
-                'value': float(item['value'])
-            })
-
-    # Create the DataFrame
-    df = pd.DataFrame(data_list)
-    df['Date'] = df['Year'].astype(str) + df['Month']
-    df.index = df['Date'].apply(lambda x: datetime.strptime(x, '%YM%m'))
-    df.sort_index(inplace=True)
-    df_cpi = df[(df['Series ID'] == 'CUUR0000SA0')]
-    # Calculate both YoY and MoM inflation
-    cpi_yoy = df_cpi['value'].pct_change(periods=12) * 100  # Year-over-year
-    result = {}
-    for year in range(2021, 2024):
-        print(f"Average YoY Inflation for {year}: {cpi_yoy[str(year)].mean():.2f}%")
-        result[year] = cpi_yoy[str(year)].mean()
-    return result
+# Variables one pivot request may ask for, the same cap as a Census API call
+MAX_METRIC_VARIABLES = 50
+_VARIABLE_PATTERN = re.compile(r"^[A-Z0-9_]+$")
+COUNTY_PAGE_MAX_LIMIT = 500
+# County cursors are the last FIPS code of the previous page
+_FIPS_PATTERN = re.compile(r"^[0-9]{5}$")
 
-def organize_response_data(response):
-    result = {} 
-    idx = 0
-    for item in response.json():
-        if not idx == 0 and item[0] != 'Puerto Rico':
-            result[item[0]] = item[1:]
-        idx += 1
-    print(result)
-    return result
 
-def insert_state_census_data(conn, data, year: int):
+def _census_rows(conn, state):
     try:
-        
-        cur = conn.cursor()
-        # Create table if not exists
-        cur.execute("""
-            CREATE TABLE IF NOT EXISTS StateCensus(
-                state VARCHAR(20) NOT NULL,
-                year INT NOT NULL,
-                poverty_rate FLOAT NOT NULL,
-                educational FLOAT NOT NULL,
-                income_mean FLOAT NOT NULL,
-                income_median FLOAT NOT NULL,
-                PRIMARY KEY (state, year)
-            )
-        """)
-        #   Loop through state data and insert data into tables for each state
-        for key, value in data.items():
-            cur.execute("INSERT INTO StateCensus(state, poverty_rate, educational, income_mean, income_median, year) VALUES (%s, %s, %s, %s, %s, %s)", (key, value[0], value[1], value[2], value[3], year))
-        conn.commit()
+        result = fetch_all(conn, "census_by_state", (STATE_IDS.get(state),))
     except Error as error:
         print(error)
-    finally:
-        cur.close()
+        conn.rollback()
+        result = []
+    return result
+
+
+@timed_query
+def get_us_census_data(conn):
+    return _census_rows(conn, NATIONAL)
+
+
+@timed_query
+def get_state_census_data(conn, state):
+    return _census_rows(conn, state)
 
-def get_us_census_response(conn):
+
+def _metric_variables(variables):
+    variables = list(dict.fromkeys(variable.strip().upper() for variable in variables if variable.strip()))
+    if not variables:
+        raise ValueError("At least one variable is required")
+    if len(variables) > MAX_METRIC_VARIABLES:
+        raise ValueError(f"At most {MAX_METRIC_VARIABLES} variables can be requested at once")
+    invalid = [variable for variable in variables if not _VARIABLE_PATTERN.match(variable)]
+    if invalid:
+        raise ValueError(f"Invalid ACS variable: {', '.join(invalid)}")
+    return variables
+
+
+@timed_query
+def get_census_metrics(conn, variables, state=None, start_year=None, end_year=None):
+    variables = _metric_variables(variables)
     try:
-        cur = conn.cursor()
-        cur.execute("SELECT * FROM StateCensus WHERE state = 'United States'")
-        result = cur.fetchall()
+        rows = fetch_all(conn, "census_metrics", (variables, None if state is None else STATE_IDS[state], start_year, end_year))
     except Error as error:
         print(error)
-    finally:
-        cur.close()
-        return result
+        conn.rollback()
+        rows = []
+    return CensusMetrics(variables=variables, rows=rows)
 
-def write_us_census_json(rows, out_path: str = "us_census_data.json"):
+
+@timed_query
+def get_county_metrics(conn, state, variables, year, cursor=None, limit=100):
+    variables = _metric_variables(variables)
+    if cursor is not None and not _FIPS_PATTERN.match(cursor):
+        raise ValueError("Invalid cursor")
+    limit = max(1, min(limit, COUNTY_PAGE_MAX_LIMIT))
     try:
-        # Build a dictionary keyed by year (e.g., "2023")
-        by_year = {}
-        for row in rows:
-            # Expected row order from SELECT *: [state, year, poverty_rate, educational, income_mean, income_median]
-            year_key = str(int(row[1]))
-            by_year[year_key] = {
-                "poverty_rate": float(row[2]) if row[2] is not None else None,
-                "educational": float(row[3]) if row[3] is not None else None,
-                "income_mean": float(row[4]) if row[4] is not None else None,
-                "income_median": float(row[5]) if row[5] is not None else None,
-            }
-
-        with open(out_path, "w") as json_file:
-            json.dump(by_year, json_file, indent=4)
-        print(f"US census JSON successfully written to {out_path}")
-    except (IOError, ValueError, json.JSONDecodeError) as e:
-        print(f"Error preparing/writing US census JSON: {e}")
+        rows = fetch_all(conn, "county_metrics_page", (STATE_IDS.get(state), variables, year, cursor, limit + 1))
+    except Error as error:
+        print(error)
+        conn.rollback()
+        rows = []
+    next_cursor = rows[limit - 1].county_fips if len(rows) > limit else None
+    return CountyMetricsPage(state=state, year=year, variables=variables, rows=rows[:limit], next_cursor=next_cursor)
 
 
-def get_state_census_data(conn, state):
+@timed_query
+def get_county_rollups(conn, state, variables):
+    variables = _metric_variables(variables)
     try:
-        cur = conn.cursor()
-        cur.execute("SELECT * FROM StateCensus WHERE state = %s", (state,))
-        result = cur.fetchall()
+        result = fetch_all(conn, "county_rollups", (STATE_IDS.get(state), variables))
     except Error as error:
         print(error)
-    finally:
-        cur.close()
-        return result
-        
-
-# def main():
-    # try:
-    #     # with connection_scope() as conn:
-    #         # response = get_us_census_response(conn)
-    #         # write_us_census_json(response, "us_census_data.json")
-    #         # response = get_state_census_response(2021)
-    #         # organized_data = organize_response_data(response)
-    #         # insert_state_census_data(conn, organized_data, 2021)
-    #         # result = get_state_census_data(conn, 'California')
-    #         # for year in range(2021, 2024):
-    #         #     response = get_us_census_response(year)
-    #         #     insert_us_census_data(conn, response, year)
-    #         # get_CPI_response()
-            
-    # except Error as error:
-    #     print(error)
-
+        conn.rollback()
+        result = []
+    return result
@@ -1,155 +1,82 @@
-import requests
-import json
 import os
-from dotenv import load_dotenv
-import psycopg2
+import re
+import sys
 from psycopg2 import Error
-import matplotlib.pyplot as plt
-import sys 
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from db import connection_scope
-load_dotenv()
-def get_state_murder_counts(state, full_state, start_year, end_year):
-    # Get number of murders in florida
+from metrics import timed_query
+from cache import VersionedCache
+from queries import fetch_all
+from schemas import AgencyCrimePage, CrimeTrendPoint
+from helper import NATIONAL, STATE_IDS
 
-    url = f"https://api.usa.gov/crime/fbi/cde/summarized/state/{state}/HOM?from=01-{start_year}&to=12-{end_year}&API_KEY={os.getenv('FBI_API_KEY')}"
-    response = requests.get(url)
-    data = response.json()
-    temp = data['offenses']['actuals'][full_state]
-    
-    year_total = {year: 0 for year in range(start_year, end_year + 1)}
-    for key, value in temp.items():
-        year_total[int(key[3:])] += value
-    return year_total
+AGENCY_PAGE_MAX_LIMIT = 500
+# Agency cursors are the last ORI of the previous page
+_ORI_PATTERN = re.compile(r"^[A-Z0-9]{1,9}$")
 
-def get_state_crime_rates(state, full_state, start_year, end_year, crime_type):
-    url = f"https://api.usa.gov/crime/fbi/cde/summarized/state/{state}/{crime_type}?from=01-{start_year}&to=12-{end_year}&API_KEY={os.getenv('FBI_API_KEY')}"
-    response = requests.get(url)
-    data = response.json()
-    temp = data['offenses']['rates'][full_state]
-    year_total = {year: 0.0 for year in range(start_year, end_year + 1)}
-    for key, value in temp.items():
-        year_total[int(key[3:])] += round(float(value)/12.0, 2)
-    return year_total
+_trends_cache = VersionedCache("crime_trends", ("crime",))
 
-def get_us_crime_rates(start_year, end_year, crime_type):
-    # Can get any state and pull national assault counts from api request
-    url = f"https://api.usa.gov/crime/fbi/cde/summarized/state/FL/{crime_type}?from=01-{start_year}&to=12-{end_year}&API_KEY={os.getenv('FBI_API_KEY')}"
-    response = requests.get(url)
-    data = response.json()
-    temp = data['offenses']['rates']['United States']
-    year_total = {year: 0.0 for year in range(start_year, end_year + 1)}
-    for key, value in temp.items():
-        year_total[int(key[3:])] += round(float(value)/12.0, 2)
-    return year_total
 
+@timed_query
+def get_crime_data(conn, state, crime_type):
+    return fetch_all(conn, "crime_by_state_type", (STATE_IDS.get(state), crime_type))
+
+@timed_query
+def get_all_state_crime(conn, state):
+    return fetch_all(conn, "crime_by_state", (STATE_IDS.get(state),))
 
-def insert_crime_data(conn, state, crime_counts, crime_type):
+@timed_query
+def get_agency_crime(conn, state, crime_type, year, cursor=None, limit=100):
+    if cursor is not None and not _ORI_PATTERN.match(cursor):
+        raise ValueError("Invalid cursor")
+    limit = max(1, min(limit, AGENCY_PAGE_MAX_LIMIT))
     try:
-        cur = conn.cursor()
-        cur.execute("""
-            CREATE TABLE IF NOT EXISTS CrimeData(
-                id SERIAL PRIMARY KEY,
-                state VARCHAR(20) NOT NULL,
-                crime_type VARCHAR(20) NOT NULL,
-                crime_counts FLOAT NOT NULL,
-                year INT NOT NULL,
-                UNIQUE(state, year, crime_type)  -- Prevent duplicate state and year
-            )
-        """)
-        for key, value in crime_counts.items():
-            
-            cur.execute("""
-                INSERT INTO CrimeData (state, crime_type, crime_counts, year)
-                VALUES (%s, %s, %s, %s)
-            """, (state, crime_type, value, key))
-        conn.commit()
+        rows = fetch_all(conn, "agency_crime_page", (STATE_IDS.get(state), crime_type, year, cursor, limit + 1))
     except Error as error:
         print(error)
+        conn.rollback()
+        rows = []
+    next_cursor = rows[limit - 1].ori if len(rows) > limit else None
+    return AgencyCrimePage(state=state, crime_type=crime_type, year=year, rows=rows[:limit], next_cursor=next_cursor)
 
+@timed_query
+def get_agency_crime_rollups(conn, state):
+    try:
+        result = fetch_all(conn, "agency_crime_rollups", (STATE_IDS.get(state),))
+    except Error as error:
+        print(error)
+        conn.rollback()
+        result = []
+    return result
 
-def get_crime_data(conn, state, crime_type):
-    cur = conn.cursor()
-    cur.execute("SELECT * FROM CrimeData WHERE state = %s AND crime_type = %s ORDER BY year ASC", (state, crime_type))
-    return cur.fetchall()
+@timed_query
+def _query_crime_trends(conn):
+    return fetch_all(conn, "crime_trends", (STATE_IDS[NATIONAL],))
 
-def get_all_state_crime(conn, state):
-    cur = conn.cursor()
-    cur.execute("SELECT * FROM CrimeData WHERE state = %s ORDER BY year ASC", (state,))
-    return cur.fetchall()
 
+def _round(value, digits=4):
+    return None if value is None else round(value, digits)
 
 
-def main():
+def _build_crime_trends(conn):
+    trends = {}
+    for row in _query_crime_trends(conn):
+        trends.setdefault(row.crime_type, {}).setdefault(row.state, []).append(CrimeTrendPoint(
+            year=row.year,
+            value=row.value,
+            yoy_pct=_round(row.yoy_pct),
+            cagr_pct=_round(row.cagr_pct),
+            national_ratio=_round(row.national_ratio),
+            z_score=_round(row.z_score),
+        ))
+    return trends
 
-    try:
-        states = {
-            'AL': 'Alabama',
-            'AK': 'Alaska',
-            'AZ': 'Arizona',
-            'AR': 'Arkansas',
-            'CA': 'California',
-            'CO': 'Colorado',
-            'CT': 'Connecticut',
-            'DE': 'Delaware',
-            'FL': 'Florida',
-            'GA': 'Georgia',
-            'HI': 'Hawaii',
-            'ID': 'Idaho',
-            'IL': 'Illinois',
-            'IN': 'Indiana',
-            'IA': 'Iowa',
-            'KS': 'Kansas',
-            'KY': 'Kentucky',
-            'LA': 'Louisiana',
-            'ME': 'Maine',
-            'MD': 'Maryland',
-            'MA': 'Massachusetts',
-            'MI': 'Michigan',
-            'MN': 'Minnesota',
-            'MS': 'Mississippi',
-            'MO': 'Missouri',
-            'MT': 'Montana',
-            'NE': 'Nebraska',
-            'NV': 'Nevada',
-            'NH': 'New Hampshire',
-            'NJ': 'New Jersey',
-            'NM': 'New Mexico',
-            'NY': 'New York',
-            'NC': 'North Carolina',
-            'ND': 'North Dakota',
-            'OH': 'Ohio',
-            'OK': 'Oklahoma',
-            'OR': 'Oregon',
-            'PA': 'Pennsylvania',
-            'RI': 'Rhode Island',
-            'SC': 'South Carolina',
-            'SD': 'South Dakota',
-            'TN': 'Tennessee',
-            'TX': 'Texas',
-            'UT': 'Utah',
-            'VT': 'Vermont',
-            'VA': 'Virginia',
-            'WA': 'Washington',
-            'WV': 'West Virginia',
-            'WI': 'Wisconsin',
-            'WY': 'Wyoming',
-        }
-        # with connection_scope() as conn:
-            # for key, value in states.items():
-            #     state = key
-            #     full_state = value
-            #     homicide_counts = get_state_crime_rates(state, full_state, 2021, 2024, crime_type)
-            #     insert_crime_data(conn, full_state, homicide_counts, crime_type)
-            # print(get_crime_data(conn, 'United States', 'BUR'))
-            # us_crime_rates = get_us_crime_rates(2021, 2024, 'BUR')
-            # insert_crime_data(conn, 'United States', us_crime_rates, 'BUR')
-                        
-           
-    except Error as error:
-        print(error)
 
-# if __name__ == "__main__":
-    
-#     main()
+def get_crime_trends(conn, state=None, crime_type=None):
+    trends = _trends_cache.get_or_compute(conn, None, lambda: _build_crime_trends(conn))
+    if crime_type is not None:
+        trends = {crime_type: trends[crime_type]} if crime_type in trends else {}
+    if state is not None:
+        trends = {name: {state: series[state]} for name, series in trends.items() if state in series}
+    return trends
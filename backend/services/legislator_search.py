@@ -0,0 +1,184 @@
+import os
+import re
+import sys
+import threading
+import time
+import unicodedata
+from bisect import bisect_left
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from db import connection_scope
+from cache import get_data_versions, local_data_versions
+from metrics import timed_query
+from queries import fetch_all
+from schemas import LegislatorMatch
+
+# How often, at most, a search checks whether legislator ingestion has run since the last build
+REFRESH_SECONDS = float(os.getenv("LEGISLATOR_INDEX_REFRESH", "30"))
+MIN_SIMILARITY = 0.3
+MAX_LIMIT = 50
+
+PARTY_ALIASES = {
+    "d": "Democrat",
+    "dem": "Democrat",
+    "democrat": "Democrat",
+    "democratic": "Democrat",
+    "r": "Republican",
+    "rep": "Republican",
+    "republican": "Republican",
+    "i": "Independent",
+    "ind": "Independent",
+    "independent": "Independent",
+}
+CHAMBERS = {"senate": "Senator", "house": "Representative"}
+
+
+def normalize_name(name):
+    # Folds accents and punctuation so "Ben Ray Luján" matches "lujan"
+    folded = unicodedata.normalize("NFKD", name).encode("ascii", "ignore").decode()
+    return re.sub(r"[^a-z0-9 ]+", " ", folded.lower()).split()
+
+
+def trigrams(word):
+    padded = f"  {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+@timed_query
+def load_legislators(conn):
+    return fetch_all(conn, "legislator_index")
+
+
+class LegislatorIndex:
+    def __init__(self, rows):
+        self.entries = [LegislatorMatch(*row) for row in rows]
+        self.entries.sort(key=lambda entry: entry.name)
+        self._tokens = []
+        # trigram -> [(position, token number)], so a typo is scored against the closest single name part
+        self._trigrams = {}
+        self._gram_counts = {}
+        for position, entry in enumerate(self.entries):
+            for number, token in enumerate(normalize_name(entry.name)):
+                self._tokens.append((token, position))
+                grams = trigrams(token)
+                self._gram_counts[(position, number)] = len(grams)
+                for gram in grams:
+                    self._trigrams.setdefault(gram, []).append((position, number))
+        # Sorted (token, position) pairs turn a prefix lookup into one bisect
+        self._tokens.sort()
+
+    def _prefix_matches(self, prefix):
+        matches = set()
+        start = bisect_left(self._tokens, (prefix,))
+        for token, position in self._tokens[start:]:
+            if not token.startswith(prefix):
+                break
+            matches.add(position)
+        return matches
+
+    def _score(self, query):
+        words = normalize_name(query)
+        if not words:
+            return None
+        # Every query word must prefix some name token; a typo falls back to trigram similarity
+        prefix_hits = self._prefix_matches(words[0])
+        for word in words[1:]:
+            prefix_hits &= self._prefix_matches(word)
+        scores = {position: 1.0 + 1.0 / len(self.entries[position].name) for position in prefix_hits}
+
+        # Fuzzy score: mean over query words of the best word-level trigram similarity
+        fuzzy = {}
+        for word in words:
+            query_grams = trigrams(word)
+            shared = {}
+            for gram in query_grams:
+                for key in self._trigrams.get(gram, ()):
+                    shared[key] = shared.get(key, 0) + 1
+            best = {}
+            for (position, number), count in shared.items():
+                similarity = count / (len(query_grams) + self._gram_counts[(position, number)] - count)
+                if similarity > best.get(position, 0.0):
+                    best[position] = similarity
+            for position, similarity in best.items():
+                fuzzy[position] = fuzzy.get(position, 0.0) + similarity / len(words)
+        for position, similarity in fuzzy.items():
+            if position not in scores and similarity >= MIN_SIMILARITY:
+                scores[position] = similarity
+        return scores
+
+    def search(self, q=None, party=None, state=None, chamber=None, min_nominate=None, max_nominate=None, limit=10):
+        if party is not None:
+            party = PARTY_ALIASES.get(party.lower(), party)
+        if state is not None:
+            state = state.upper()
+        role = CHAMBERS.get(chamber.lower()) if chamber else None
+        if chamber and role is None:
+            raise ValueError(f"Unknown chamber: {chamber}")
+
+        if q:
+            scores = self._score(q)
+            if scores is None:
+                return []
+            candidates = sorted(scores, key=lambda position: (-scores[position], position))
+        else:
+            candidates = range(len(self.entries))
+
+        results = []
+        for position in candidates:
+            entry = self.entries[position]
+            if party is not None and entry.party != party:
+                continue
+            if state is not None and entry.state != state:
+                continue
+            if role is not None and entry.role != role:
+                continue
+            if min_nominate is not None or max_nominate is not None:
+                score = entry.nominate_score
+                if score is None:
+                    continue
+                if min_nominate is not None and score < min_nominate:
+                    continue
+                if max_nominate is not None and score > max_nominate:
+                    continue
+            results.append(entry)
+            if len(results) >= min(limit, MAX_LIMIT):
+                break
+        return results
+
+
+_index = None
+_index_version = None
+_checked_at = 0.0
+_index_lock = threading.Lock()
+
+
+def _index_is_current():
+    if _index is None:
+        return False
+    # With the invalidation listener running the version is known locally and free to check
+    local = local_data_versions(("legislators",))
+    if local is not None:
+        return local == _index_version
+    return time.monotonic() - _checked_at < REFRESH_SECONDS
+
+
+def get_legislator_index():
+    # Keystroke traffic reuses the built index; without a listener only one
+    # request per REFRESH_SECONDS touches the database to compare versions
+    global _index, _index_version, _checked_at
+    if _index_is_current():
+        return _index
+    with _index_lock:
+        if _index_is_current():
+            return _index
+        with connection_scope() as conn:
+            version = get_data_versions(conn, ("legislators",))
+            if _index is None or version != _index_version:
+                _index = LegislatorIndex(load_legislators(conn))
+                _index_version = version
+        _checked_at = time.monotonic()
+        return _index
+
+
+def search_legislators(q=None, party=None, state=None, chamber=None, min_nominate=None, max_nominate=None, limit=10):
+    return get_legislator_index().search(q, party, state, chamber, min_nominate, max_nominate, limit)
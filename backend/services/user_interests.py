@@ -1,45 +1,177 @@
-import requests
-import json
 import os
-from dotenv import load_dotenv
-import psycopg2
 from psycopg2 import Error
-import matplotlib.pyplot as plt
+from psycopg2.extras import execute_values
 import sys
-import hashlib 
+import atexit
+import functools
+import hashlib
+import threading
+import time
+from collections import OrderedDict
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from db import connection_scope
-load_dotenv()
+from metrics import record_cache, timed_query
+import invalidation
 
+# Every committed save notifies this channel with the hashed user ID, and each
+# process's listener evicts that user. Entries are only served while the
+# listener is connected; the TTL is a backstop.
+NOTIFY_CHANNEL = "user_interests"
+CACHE_TTL = float(os.getenv("USER_INTERESTS_CACHE_TTL", "300"))
+CACHE_MAX_ENTRIES = int(os.getenv("USER_INTERESTS_CACHE_SIZE", "10000"))
+# Window for saves made with coalesce=True, which are buffered for this many
+# milliseconds and flushed as one upsert. Lossy: the save is acknowledged
+# before it is written, so a worker that crashes or is killed in the window
+# drops it. 0 turns coalescing off and every save is written straight away.
+COALESCE_MS = float(os.getenv("USER_INTERESTS_COALESCE_MS", "0"))
+
+# hashed user ID -> (expiry, interests)
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+# Bumped on every eviction so a read that raced a save does not cache what it read
+_generation = 0
+_pending = {}
+_pending_lock = threading.Lock()
+# Held while a batch is written so an older batch can never commit after a newer one
+_flush_lock = threading.Lock()
+_flush_timer = None
+_table_ready = False
+
+
+@functools.lru_cache(maxsize=CACHE_MAX_ENTRIES)
 def hash_user_id(user_id):
     """Hash user ID using SHA-256 for privacy"""
     return hashlib.sha256(user_id.encode()).hexdigest()
 
-def save_user_interests(conn, user_id, interests):
+
+def _ensure_table(cur):
+    global _table_ready
+    if not _table_ready:
+        cur.execute("CREATE TABLE IF NOT EXISTS user_interests (user_id VARCHAR(255) PRIMARY KEY, interests TEXT[])")
+        _table_ready = True
+
+
+def _cache_get(key):
+    if not invalidation.is_connected():
+        return False, None
+    with _cache_lock:
+        entry = _cache.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            return False, None
+        _cache.move_to_end(key)
+        return True, entry[1]
+
+
+def _cache_put(key, interests, generation):
+    with _cache_lock:
+        if generation != _generation or not invalidation.is_connected():
+            return
+        _cache[key] = (time.monotonic() + CACHE_TTL, interests)
+        _cache.move_to_end(key)
+        while len(_cache) > CACHE_MAX_ENTRIES:
+            _cache.popitem(last=False)
+
+
+def _evict(key):
+    global _generation
+    with _cache_lock:
+        _generation += 1
+        _cache.pop(key, None)
+
+
+def _clear():
+    global _generation
+    with _cache_lock:
+        _generation += 1
+        _cache.clear()
+
+
+invalidation.subscribe(NOTIFY_CHANNEL, _evict, _clear)
+
+
+def invalidate_user_interests(user_id):
+    _evict(hash_user_id(user_id))
+
+
+def _upsert(conn, rows):
+    global _table_ready
     try:
-        hashed_user_id = hash_user_id(user_id)
         cur = conn.cursor()
-        cur.execute("CREATE TABLE IF NOT EXISTS user_interests (user_id VARCHAR(255) PRIMARY KEY, interests TEXT[])")
+        _ensure_table(cur)
+        rows = [(hash_user_id(user_id), interests) for user_id, interests in rows]
         # Use UPSERT to handle existing users
-        cur.execute("INSERT INTO user_interests (user_id, interests) VALUES (%s, %s) ON CONFLICT (user_id) DO UPDATE SET interests = %s", 
-                   (hashed_user_id, interests, interests))
+        execute_values(cur, "INSERT INTO user_interests (user_id, interests) VALUES %s ON CONFLICT (user_id) DO UPDATE SET interests = EXCLUDED.interests", rows)
+        # Delivered to every process's listener once the upsert commits
+        execute_values(cur, "SELECT pg_notify(c, k) FROM (VALUES %s) AS v(c, k)", [(NOTIFY_CHANNEL, key) for key, _ in rows])
         conn.commit()
+        return True
     except Error as error:
         print("Error with inserting user interests", error)
+        conn.rollback()
+        # The CREATE TABLE may have been rolled back with the failed write
+        _table_ready = False
+        return False
     finally:
         cur.close()
 
-def fetch_user_interests(conn, user_id):
+
+def flush_pending_interests():
+    global _flush_timer
+    with _flush_lock:
+        with _pending_lock:
+            batch = list(_pending.items())
+            _pending.clear()
+            _flush_timer = None
+        if not batch:
+            return
+        with connection_scope() as conn:
+            _upsert(conn, batch)
+
+
+atexit.register(flush_pending_interests)
+
+
+@timed_query
+def save_user_interests(conn, user_id, interests, coalesce=False):
+    global _flush_timer
+    # This process's entry goes now; the notification reaches the others on commit
+    invalidate_user_interests(user_id)
+    if coalesce and COALESCE_MS > 0:
+        # Rapid successive saves from onboarding collapse into the latest value
+        # per user. Reads see the previous value until the batch is flushed.
+        with _pending_lock:
+            _pending[user_id] = interests
+            if _flush_timer is None:
+                _flush_timer = threading.Timer(COALESCE_MS / 1000, flush_pending_interests)
+                _flush_timer.daemon = True
+                _flush_timer.start()
+        return
+    _upsert(conn, [(user_id, interests)])
+
+@timed_query
+def fetch_user_interests(conn, user_id, fresh=False):
+    # fresh=True skips the cache, for callers that must see a save made a
+    # moment ago even before its notification has been delivered
+    hashed_user_id = hash_user_id(user_id)
+    if not fresh:
+        found, interests = _cache_get(hashed_user_id)
+        record_cache("user_interests", found)
+        if found:
+            return interests
+    generation = _generation
     try:
-        hashed_user_id = hash_user_id(user_id)
         cur = conn.cursor()
         cur.execute("SELECT interests FROM user_interests WHERE user_id = %s", (hashed_user_id,))
         result = cur.fetchone()
-        return result[0] if result else None
+        if result is None:
+            # Not cached: the user's first save must show up on the next read
+            return None
+        _cache_put(hashed_user_id, result[0], generation)
+        return result[0]
     except Error as error:
         print("Error with getting user interests", error)
+        conn.rollback()
         return None
     finally:
         cur.close()
-
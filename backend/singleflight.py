@@ -0,0 +1,56 @@
+import asyncio
+import contextvars
+import threading
+from concurrent.futures import Future
+
+from metrics import SINGLEFLIGHT_CALLS
+
+
+# Concurrent callers asking for the same key share one in-flight computation.
+# The shared result is a concurrent.futures.Future, so a caller in a worker
+# thread blocks on it while an async handler awaits it without blocking the loop.
+class SingleFlight:
+    def __init__(self, name):
+        self.name = name
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def _join(self, key):
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                SINGLEFLIGHT_CALLS.labels(self.name, "waiter").inc()
+                return future, False
+            future = Future()
+            # A running future cannot be cancelled, so one waiter going away
+            # (e.g. a disconnected client) does not cancel it for the others
+            future.set_running_or_notify_cancel()
+            self._calls[key] = future
+            SINGLEFLIGHT_CALLS.labels(self.name, "leader").inc()
+            return future, True
+
+    def _resolve(self, key, future, compute):
+        try:
+            result = compute()
+        except BaseException as e:
+            future.set_exception(e)
+        else:
+            future.set_result(result)
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+
+    def do(self, key, compute):
+        future, leader = self._join(key)
+        if leader:
+            self._resolve(key, future, compute)
+        return future.result()
+
+    async def do_async(self, key, compute):
+        # compute is synchronous; the leader runs it in the default executor,
+        # carrying its context so Server-Timing phases are still recorded
+        future, leader = self._join(key)
+        if leader:
+            context = contextvars.copy_context()
+            asyncio.get_running_loop().run_in_executor(None, context.run, self._resolve, key, future, compute)
+        return await asyncio.wrap_future(future)
@@ -0,0 +1,130 @@
+import os
+import random
+import re
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from fastapi.responses import JSONResponse
+
+
+SERVER_TIMING_ENABLED = os.getenv("SERVER_TIMING", "1") != "0"
+# Profiling is off unless a token is configured (for X-Profile) or a sample rate
+# is set, and needs pyinstrument. Its strict async mode samples only the
+# profiled request's own context: time the event loop spends on concurrent
+# requests is one <out-of-context> frame instead of their stacks. Work the
+# request waits for on other threads (a sync endpoint's threadpool,
+# run_in_executor) is not sampled either and shows up as the await on it.
+PROFILE_TOKEN = os.getenv("PROFILE_TOKEN")
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "profiles"))
+
+_phases: ContextVar[list | None] = ContextVar("server_timing_phases", default=None)
+_profiler_missing_reported = False
+
+
+def record(name, seconds, desc=None):
+    phases = _phases.get()
+    if phases is not None:
+        phases.append((name, desc, seconds))
+
+
+@contextmanager
+def phase(name, desc=None):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, time.perf_counter() - start, desc)
+
+
+class TimedJSONResponse(JSONResponse):
+    def render(self, content):
+        with phase("serialize"):
+            return super().render(content)
+
+
+def format_server_timing(phases, total):
+    totals = {}
+    for name, desc, seconds in phases:
+        totals[(name, desc)] = totals.get((name, desc), 0.0) + seconds
+    entries = []
+    for (name, desc), seconds in totals.items():
+        entry = f"{name};dur={seconds * 1000:.1f}"
+        if desc:
+            entry += f';desc="{desc}"'
+        entries.append(entry)
+    entries.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(entries)
+
+
+def _new_profiler():
+    global _profiler_missing_reported
+    try:
+        from pyinstrument import Profiler
+    except ImportError:
+        if not _profiler_missing_reported:
+            print("Request profiling requires pyinstrument to be installed")
+            _profiler_missing_reported = True
+        return None
+    return Profiler(async_mode="strict")
+
+
+def _should_profile(scope):
+    if PROFILE_TOKEN:
+        for key, value in scope.get("headers", []):
+            if key == b"x-profile" and value.decode() == PROFILE_TOKEN:
+                return True
+    return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+
+def _profile_path(scope):
+    route = getattr(scope.get("route"), "path", None) or scope["path"]
+    slug = re.sub(r"[^A-Za-z0-9]+", "_", route).strip("_") or "root"
+    return os.path.join(PROFILE_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}_{scope['method']}_{slug}_{os.getpid()}_{uuid.uuid4().hex[:8]}.pyisession")
+
+
+class ServerTimingMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        phases = []
+        token = _phases.set(phases)
+        profiler = None
+        profile_path = None
+        if _should_profile(scope):
+            profiler = _new_profiler()
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal profile_path
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                if SERVER_TIMING_ENABLED:
+                    headers.append((b"server-timing", format_server_timing(phases, time.perf_counter() - start).encode()))
+                if profiler is not None:
+                    profile_path = _profile_path(scope)
+                    headers.append((b"x-profile-file", os.path.basename(profile_path).encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            if profiler is None:
+                await self.app(scope, receive, send_wrapper)
+            else:
+                # View with: pyinstrument --load <file>
+                profiler.start()
+                try:
+                    await self.app(scope, receive, send_wrapper)
+                finally:
+                    session = profiler.stop()
+                    os.makedirs(PROFILE_DIR, exist_ok=True)
+                    session.save(profile_path or _profile_path(scope))
+        finally:
+            _phases.reset(token)
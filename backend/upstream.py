@@ -0,0 +1,127 @@
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+import requests
+
+from metrics import UPSTREAM_ERRORS, UPSTREAM_LATENCY
+import timing
+
+# Answers worth trying again: throttling and transient server errors
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+def _new_session():
+    session = requests.Session()
+    if os.getenv("UPSTREAM_CASSETTE_MODE"):
+        # Record or replay upstream traffic instead of (or on top of) the network
+        from cassette import mount_from_env
+        mount_from_env(session)
+    return session
+
+
+# One pooled session for every outbound call so keep-alive connections are reused
+_session = _new_session()
+
+
+def reset_session():
+    # A forked worker must not reuse keep-alive sockets opened by its parent
+    global _session
+    _session = _new_session()
+
+
+@contextmanager
+def track(host):
+    # Times a call made through a client library that does not go through the session
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception as e:
+        UPSTREAM_ERRORS.labels(host, type(e).__name__).inc()
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        UPSTREAM_LATENCY.labels(host).observe(elapsed)
+        timing.record("upstream", elapsed, host)
+
+
+def request(method, url, **kwargs):
+    host = urlsplit(url).hostname or "unknown"
+    with track(host):
+        response = _session.request(method, url, **kwargs)
+    if response.status_code >= 400:
+        UPSTREAM_ERRORS.labels(host, str(response.status_code)).inc()
+    return response
+
+
+def get(url, **kwargs):
+    return request("GET", url, **kwargs)
+
+
+def post(url, **kwargs):
+    return request("POST", url, **kwargs)
+
+
+class RateLimiter:
+    # Token bucket shared by every thread calling one API: holds up to burst
+    # requests and refills at rate requests per second
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+def _retry_after(response):
+    # Seconds to wait from a Retry-After header, given either as seconds or as an HTTP date
+    value = response.headers.get("Retry-After")
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def get_with_retry(url, limiter=None, retries=4, backoff=1.0, **kwargs):
+    # For batch ingestion: waits for the limiter before every attempt, and
+    # retries throttled, failed and unreachable requests with exponential
+    # backoff, or as long as the server's Retry-After asks. The last response
+    # or error is returned or raised as is.
+    for attempt in range(retries + 1):
+        if limiter is not None:
+            limiter.acquire()
+        delay = None
+        try:
+            response = get(url, **kwargs)
+        except (requests.ConnectionError, requests.Timeout):
+            if attempt == retries:
+                raise
+        else:
+            if response.status_code not in RETRY_STATUSES or attempt == retries:
+                return response
+            delay = _retry_after(response)
+        if delay is None:
+            delay = backoff * 2 ** attempt * random.uniform(0.5, 1.0)
+        time.sleep(delay)